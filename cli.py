@@ -5,6 +5,8 @@ import os
 import subprocess
 import sys
 
+from engine.event_types import EVENT_TYPES
+
 
 @click.group()
 def cli():
@@ -34,6 +36,50 @@ def execute_mission_cmd(mission_id):
     click.echo(f"Executed {len(steps)} steps for mission {mission_id}")
 
 
+@cli.group()
+def events():
+    """Event storage maintenance (retention and rollups)."""
+    pass
+
+
+@events.command("prune")
+@click.option("--dry-run", is_flag=True, help="Only count the events that would be removed")
+def events_prune(dry_run):
+    """Remove events past their type's retention."""
+    from engine.config import supabase
+    from engine.event_store import prune_events
+
+    if not supabase:
+        click.echo("Supabase not configured")
+        return
+
+    pruned = prune_events(dry_run=dry_run)
+    verb = "Would prune" if dry_run else "Pruned"
+    for event_type, count in sorted(pruned.items()):
+        click.echo(f"  {event_type:20s} {count}")
+    click.echo(f"{verb} {sum(pruned.values())} events")
+
+
+@events.command("backfill")
+@click.option("--since", required=True, type=click.DateTime(formats=["%Y-%m-%d"]), help="First day to roll up (UTC)")
+@click.option("--until", default=None, type=click.DateTime(formats=["%Y-%m-%d"]), help="Day to stop before (UTC, default now)")
+def events_backfill(since, until):
+    """Write hourly event rollups for a past range."""
+    from engine.config import supabase
+    from engine.event_store import backfill_rollups
+    from datetime import timezone
+
+    if not supabase:
+        click.echo("Supabase not configured")
+        return
+
+    written = backfill_rollups(
+        since.replace(tzinfo=timezone.utc),
+        until.replace(tzinfo=timezone.utc) if until else None,
+    )
+    click.echo(f"Wrote {written} hourly rollup rows")
+
+
 @cli.group()
 def wr():
     """War Room task management."""
@@ -151,6 +197,7 @@ def wr_tasks(project, stale):
 def wr_start(task_id):
     """Set task to in_progress."""
     from engine.config import supabase
+    from engine.events import emit
     from datetime import datetime, timezone
 
     if not supabase:
@@ -161,9 +208,11 @@ def wr_start(task_id):
     supabase.table("tasks").update(
         {"status": "in_progress", "updated_at": now}
     ).eq("id", task_id).execute()
-    supabase.table("events").insert(
-        {"type": "user_request", "message": f"Task #{task_id} started (in_progress)"}
-    ).execute()
+    emit("user_request", {
+        "message": f"Task #{task_id} started (in_progress)",
+        "task_id": task_id,
+        "agent": "sensei",
+    }, sync=True)
     click.echo(click.style(f"Task #{task_id} → in_progress", fg="blue"))
 
 
@@ -172,6 +221,7 @@ def wr_start(task_id):
 def wr_done(task_id):
     """Set task to review."""
     from engine.config import supabase
+    from engine.events import emit
     from datetime import datetime, timezone
 
     if not supabase:
@@ -182,9 +232,11 @@ def wr_done(task_id):
     supabase.table("tasks").update(
         {"status": "review", "updated_at": now}
     ).eq("id", task_id).execute()
-    supabase.table("events").insert(
-        {"type": "user_request", "message": f"Task #{task_id} done (moved to review)"}
-    ).execute()
+    emit("user_request", {
+        "message": f"Task #{task_id} done (moved to review)",
+        "task_id": task_id,
+        "agent": "sensei",
+    }, sync=True)
     click.echo(click.style(f"Task #{task_id} → review", fg="magenta"))
 
 
@@ -193,6 +245,7 @@ def wr_done(task_id):
 def wr_approve(task_id):
     """Set task to done."""
     from engine.config import supabase
+    from engine.events import emit
     from datetime import datetime, timezone
 
     if not supabase:
@@ -203,9 +256,11 @@ def wr_approve(task_id):
     supabase.table("tasks").update(
         {"status": "done", "completed_at": now, "updated_at": now}
     ).eq("id", task_id).execute()
-    supabase.table("events").insert(
-        {"type": "user_request", "message": f"Task #{task_id} approved (done)"}
-    ).execute()
+    emit("user_request", {
+        "message": f"Task #{task_id} approved (done)",
+        "task_id": task_id,
+        "agent": "sensei",
+    }, sync=True)
     click.echo(click.style(f"Task #{task_id} → done", fg="green"))
 
 
@@ -251,17 +306,18 @@ def wr_propose(title, project, council, domain, risk):
 
 @wr.command("event")
 @click.argument("message")
-def wr_event(message):
+@click.option("--type", "event_type", default="user_request", type=click.Choice(EVENT_TYPES), help="Event type")
+@click.option("--agent", default="sensei", help="Agent the event is attributed to")
+def wr_event(message, event_type, agent):
     """Log a manual event."""
     from engine.config import supabase
+    from engine.events import emit
 
     if not supabase:
         click.echo("Supabase not configured")
         return
 
-    supabase.table("events").insert(
-        {"type": "user_request", "message": message}
-    ).execute()
+    emit(event_type, {"message": message, "agent": agent}, sync=True)
     click.echo(click.style(f"Event logged: {message}", fg="green"))
 
 
@@ -4,13 +4,23 @@ import os
 
 # Supabase client
 # In production, initialized from env vars. For testing, this gets mocked.
+# Wrapped once here so every engine call is timed and attributed (see engine.db).
+# The client is built on first use, not at import: None when unconfigured,
+# otherwise a LazyClient that is truthy without connecting.
 _supabase_url = os.getenv("SUPABASE_URL", "")
 _supabase_key = os.getenv("SUPABASE_KEY", "")
 
+
+def _create_supabase():
+    from supabase import create_client
+    from engine.db import InstrumentedClient
+    return InstrumentedClient(create_client(_supabase_url, _supabase_key))
+
+
 supabase = None
 if _supabase_url and _supabase_key:
-    from supabase import create_client
-    supabase = create_client(_supabase_url, _supabase_key)
+    from engine.db import LazyClient
+    supabase = LazyClient(_create_supabase)
 
 
 # Moonshot client placeholder
@@ -22,6 +32,13 @@ CHEAP_MODEL = os.getenv("CHEAP_MODEL", "claude-haiku-4-5-20251001")       # prop
 WORKER_MODEL = os.getenv("WORKER_MODEL", "claude-sonnet-4-5-20250929")    # default execution
 ORCHESTRATOR_MODEL = os.getenv("ORCHESTRATOR_MODEL", "claude-opus-4-6")   # complex multi-domain
 
+# System prompt budget (estimated tokens) for skill + memories, per model tier
+PROMPT_BUDGETS = {
+    CHEAP_MODEL: int(os.getenv("PROMPT_BUDGET_CHEAP", "2000")),
+    WORKER_MODEL: int(os.getenv("PROMPT_BUDGET_WORKER", "6000")),
+    ORCHESTRATOR_MODEL: int(os.getenv("PROMPT_BUDGET_ORCHESTRATOR", "12000")),
+}
+
 # Default timeout for steps in minutes
 DEFAULT_TIMEOUT_MINUTES = 30
 
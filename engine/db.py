@@ -0,0 +1,267 @@
+"""Shogunate Engine instrumented Supabase client.
+
+Thin wrapper around the supabase-py client that times every
+``.execute()`` and records table, operation, latency, row count and
+payload size, attributed to the engine function that issued the call.
+Installed once in engine.config so every module gets it for free.
+
+engine.config holds it behind a LazyClient, so importing the engine (or
+running a CLI command that never touches Supabase) does not import
+supabase-py or build its HTTP client.
+
+Tests can declare how many round trips a code path may make:
+
+    with RoundTripBudget(2):
+        run_pending()
+"""
+
+import json
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import ContextDecorator
+from dataclasses import dataclass
+from typing import Callable
+
+from engine import metrics
+
+CALL_LOG_SIZE = 1000
+_QUERY_OPERATIONS = ("select", "insert", "update", "upsert", "delete")
+
+
+@dataclass(frozen=True, slots=True)
+class CallRecord:
+    """One Supabase round trip."""
+
+    table: str
+    operation: str
+    caller: str
+    seconds: float
+    rows: int
+    request_bytes: int
+    response_bytes: int
+
+
+class RoundTripBudgetExceeded(AssertionError):
+    """Raised when a RoundTripBudget block makes more calls than declared."""
+
+
+# ---------------------------------------------------------------------------
+# Call log
+# ---------------------------------------------------------------------------
+
+_log: deque[CallRecord] = deque(maxlen=CALL_LOG_SIZE)
+_log_lock = threading.Lock()
+_local = threading.local()
+
+
+def recent_calls() -> list[CallRecord]:
+    """Return the most recent calls, oldest first."""
+    with _log_lock:
+        return list(_log)
+
+
+def clear_calls() -> None:
+    """Forget all recorded calls."""
+    with _log_lock:
+        _log.clear()
+
+
+def summarize(calls: list[CallRecord] | None = None) -> dict[str, dict]:
+    """Aggregate calls per caller: {caller: {calls, seconds, rows, bytes}}."""
+    summary: dict[str, dict] = {}
+    for call in recent_calls() if calls is None else calls:
+        entry = summary.setdefault(call.caller, {"calls": 0, "seconds": 0.0, "rows": 0, "bytes": 0})
+        entry["calls"] += 1
+        entry["seconds"] += call.seconds
+        entry["rows"] += call.rows
+        entry["bytes"] += call.request_bytes + call.response_bytes
+    return summary
+
+
+def _active_budgets() -> list["RoundTripBudget"]:
+    if not hasattr(_local, "budgets"):
+        _local.budgets = []
+    return _local.budgets
+
+
+def _record(record: CallRecord) -> None:
+    with _log_lock:
+        _log.append(record)
+    for budget in _active_budgets():
+        budget.calls.append(record)
+    metrics.observe_supabase_call(record.table, record.operation, record.seconds)
+
+
+class RoundTripBudget(ContextDecorator):
+    """Fail if the wrapped block makes more than ``limit`` Supabase calls.
+
+    Only calls on the current thread count. Use ``caller`` to restrict
+    the budget to calls attributed to one engine function.
+    """
+
+    def __init__(self, limit: int, caller: str | None = None):
+        self.limit = limit
+        self.caller = caller
+        self.calls: list[CallRecord] = []
+
+    @property
+    def used(self) -> int:
+        if self.caller is None:
+            return len(self.calls)
+        return sum(1 for c in self.calls if c.caller == self.caller)
+
+    def __enter__(self) -> "RoundTripBudget":
+        self.calls = []
+        _active_budgets().append(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        _active_budgets().remove(self)
+        if exc_type is None and self.used > self.limit:
+            detail = ", ".join(f"{c.caller}:{c.operation} {c.table}" for c in self.calls)
+            scope = f" for {self.caller}" if self.caller else ""
+            raise RoundTripBudgetExceeded(
+                f"{self.used} Supabase round trips{scope}, budget was {self.limit}: {detail}"
+            )
+        return False
+
+
+# ---------------------------------------------------------------------------
+# Wrapper
+# ---------------------------------------------------------------------------
+
+
+def _caller() -> str:
+    """Name the first engine (or CLI) function on the stack outside this module."""
+    frame = sys._getframe(2)
+    fallback = None
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if module != __name__:
+            if module.startswith("engine.") or module == "cli":
+                return f"{module}.{frame.f_code.co_name}"
+            if fallback is None:
+                fallback = f"{module}.{frame.f_code.co_name}"
+        frame = frame.f_back
+    return fallback or "unknown"
+
+
+def _size(payload) -> int:
+    if payload is None:
+        return 0
+    try:
+        return len(json.dumps(payload, default=str))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _row_count(result) -> int:
+    data = getattr(result, "data", None)
+    if isinstance(data, list):
+        return len(data)
+    return 1 if data else 0
+
+
+class _InstrumentedQuery:
+    """Proxy for a postgrest request builder that records on execute()."""
+
+    def __init__(self, builder, table: str, operation: str | None = None, payload=None):
+        self._builder = builder
+        self._table = table
+        self._operation = operation
+        self._payload = payload
+
+    def _wrap(self, value, name: str | None = None, args: tuple = ()):
+        if not hasattr(value, "execute"):
+            return value
+        operation, payload = self._operation, self._payload
+        if operation is None and name in _QUERY_OPERATIONS:
+            operation = name
+            if name != "select" and args:
+                payload = args[0]
+        return _InstrumentedQuery(value, self._table, operation, payload)
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._builder, name)
+        if not callable(attr):
+            return self._wrap(attr)
+
+        def call(*args, **kwargs):
+            return self._wrap(attr(*args, **kwargs), name, args)
+
+        return call
+
+    def execute(self):
+        start = time.perf_counter()
+        result = None
+        try:
+            result = self._builder.execute()
+            return result
+        finally:
+            _record(CallRecord(
+                table=self._table,
+                operation=self._operation or "select",
+                caller=_caller(),
+                seconds=time.perf_counter() - start,
+                rows=_row_count(result),
+                request_bytes=_size(self._payload),
+                response_bytes=_size(getattr(result, "data", None)),
+            ))
+
+
+class InstrumentedClient:
+    """Drop-in wrapper for a supabase-py Client."""
+
+    def __init__(self, client):
+        self._client = client
+
+    def __bool__(self) -> bool:
+        return bool(self._client)
+
+    def table(self, name: str) -> _InstrumentedQuery:
+        return _InstrumentedQuery(self._client.table(name), name)
+
+    def rpc(self, fn: str, params: dict | None = None, **kwargs) -> _InstrumentedQuery:
+        return _InstrumentedQuery(
+            self._client.rpc(fn, params or {}, **kwargs), fn, "rpc", params,
+        )
+
+    def __getattr__(self, name: str):
+        return getattr(self._client, name)
+
+
+class LazyClient:
+    """Client proxy that builds the real client on first use.
+
+    Truthy as soon as it exists (i.e. Supabase is configured), so
+    ``if not supabase`` guards work without building anything. The first
+    attribute access calls factory() under a lock, so concurrent first
+    calls (poll cycle, event writer, realtime thread) share one client.
+    """
+
+    def __init__(self, factory: Callable[[], object]):
+        self._factory = factory
+        self._client = None
+        self._lock = threading.Lock()
+
+    def __bool__(self) -> bool:
+        return True
+
+    @property
+    def built(self) -> bool:
+        return self._client is not None
+
+    def get(self):
+        """The real client, built on first call."""
+        client = self._client
+        if client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._factory()
+                client = self._client
+        return client
+
+    def __getattr__(self, name: str):
+        return getattr(self.get(), name)
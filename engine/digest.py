@@ -0,0 +1,113 @@
+"""Shogunate Engine output digests.
+
+Long step outputs are mostly preamble; the errors, diffs, decisions and
+the closing summary are what memory extraction needs. digest() splits an
+output into segments, scores them by salience and position, and keeps
+the best ones, in their original order, within a character budget.
+"""
+
+import os
+import re
+
+DIGEST_CHARS = int(os.getenv("MEMORY_DIGEST_CHARS", "3000"))
+MAX_SEGMENT_CHARS = 600
+GAP_MARKER = "\n[...]\n"
+
+_ERROR_RE = re.compile(r"\b(error|exception|traceback|failed|failure|fatal|panic|warning)\b", re.IGNORECASE)
+_DECISION_RE = re.compile(
+    r"\b(decided|decision|chose|because|instead|trade-?off|root cause|fixed|resolved|learned|lesson|workaround)\b",
+    re.IGNORECASE,
+)
+_SUMMARY_RE = re.compile(
+    r"^\s*(#+\s*|\*\*)?(summary|conclusion|result|outcome|done|completed|next steps|tl;?dr)\b",
+    re.IGNORECASE | re.MULTILINE,
+)
+_DIFF_LINE_RE = re.compile(r"^(diff --git|@@ |\+\+\+ |--- |[+-](?![+-]))", re.MULTILINE)
+
+
+def segment(output: str) -> list[str]:
+    """Split output into paragraph-sized segments of at most MAX_SEGMENT_CHARS."""
+    segments = []
+    for block in re.split(r"\n\s*\n", output):
+        block = block.strip("\n")
+        if not block.strip():
+            continue
+        if len(block) <= MAX_SEGMENT_CHARS:
+            segments.append(block)
+            continue
+
+        current = ""
+        for line in block.split("\n"):
+            while len(line) > MAX_SEGMENT_CHARS:
+                if current:
+                    segments.append(current)
+                    current = ""
+                segments.append(line[:MAX_SEGMENT_CHARS])
+                line = line[MAX_SEGMENT_CHARS:]
+            if current and len(current) + 1 + len(line) > MAX_SEGMENT_CHARS:
+                segments.append(current)
+                current = line
+            else:
+                current = f"{current}\n{line}" if current else line
+        if current:
+            segments.append(current)
+    return segments
+
+
+def score(text: str, position: int, total: int) -> float:
+    """Salience of one segment: content signals plus a bias toward the end."""
+    value = 0.0
+    if _ERROR_RE.search(text):
+        value += 3.0
+    if _SUMMARY_RE.search(text):
+        value += 3.0
+    if _DECISION_RE.search(text):
+        value += 2.0
+    if len(_DIFF_LINE_RE.findall(text)) >= 2:
+        value += 2.0
+
+    # Conclusions sit at the tail; the opening frames the task
+    value += 2.0 * position / max(total - 1, 1)
+    if position == total - 1:
+        value += 2.0
+    elif position == 0:
+        value += 1.0
+    return value
+
+
+def digest(output: str, budget: int = DIGEST_CHARS) -> str:
+    """Compact, salience-ranked digest of output within budget characters.
+
+    Outputs that already fit are returned unchanged. Otherwise segments are
+    taken by descending score (later segments win ties) while they fit,
+    and emitted in original order with a gap marker where text was skipped.
+    """
+    if len(output) <= budget:
+        return output
+
+    segments = segment(output)
+    total = len(segments)
+    ranked = sorted(range(total), key=lambda i: (-score(segments[i], i, total), -i))
+
+    chosen: dict[int, str] = {}
+    used = 0
+    for i in ranked:
+        cost = len(segments[i]) + len(GAP_MARKER)
+        if used + cost <= budget:
+            chosen[i] = segments[i]
+            used += cost
+        elif not chosen and budget - used > len(GAP_MARKER):
+            # Even the most salient segment is too big: keep its tail
+            chosen[i] = segments[i][-(budget - len(GAP_MARKER)):]
+            used = budget
+
+    parts = []
+    previous = -1
+    for i in sorted(chosen):
+        if i != previous + 1:
+            parts.append(GAP_MARKER.strip("\n"))
+        parts.append(chosen[i])
+        previous = i
+    if previous != total - 1:
+        parts.append(GAP_MARKER.strip("\n"))
+    return "\n".join(parts)
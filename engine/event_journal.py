@@ -0,0 +1,167 @@
+"""Shogunate Engine local event journal.
+
+An append-only JSONL file (~/.warroom/events.jsonl) that every emitted
+event is written to before it is sent to Supabase. Each entry carries a
+journal id, which is also the event's war_room_events row id; once its
+insert succeeds an ack record naming that id is appended. Entries without
+an ack are pending and are replayed in order by
+engine.events.replay_journal(), so a Supabase outage or a dropped buffer
+never loses the audit trail.
+
+An entry Supabase keeps rejecting is dead-lettered instead of blocking
+replay: compaction moves it to events.dead.jsonl next to the journal,
+with the last error, for inspection.
+
+Lines:
+    {"jid": "<hex>", "at": <unix time>, "event": {...}}
+    {"ack": ["<hex>", ...]}
+    {"fail": "<hex>", "error": "..."}
+    {"dead": ["<hex>", ...], "error": "..."}
+
+Appends and compaction take an exclusive flock on the file, so the
+poller, CLI processes and hooks can share one journal. Besides the
+poller's replay, ack() compacts the journal once it grows past
+JOURNAL_COMPACT_BYTES, so hosts that only run CLI commands keep it small.
+"""
+
+import fcntl
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+JOURNAL_FILE = os.path.expanduser(os.getenv("EVENT_JOURNAL_FILE", "~/.warroom/events.jsonl"))
+JOURNAL_COMPACT_BYTES = int(os.getenv("EVENT_JOURNAL_COMPACT_BYTES", str(1 << 20)))
+
+
+class EventJournal:
+    """Append-only journal of emitted events and their acknowledgements."""
+
+    def __init__(self, path: str = JOURNAL_FILE):
+        self.path = path
+        self.dead_path = str(Path(path).with_suffix(".dead.jsonl"))
+        self._lock = threading.Lock()
+        self._compacted_size = 0  # journal size after this instance last compacted it
+
+    @contextmanager
+    def _locked(self, mode: str = "a"):
+        """Open the current journal file with an exclusive flock held.
+
+        Compaction replaces the file by rename, so a writer that opened the
+        old inode before the rename reopens until it holds the live file.
+        """
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            while True:
+                f = open(self.path, mode)
+                try:
+                    fcntl.flock(f, fcntl.LOCK_EX)
+                    if os.fstat(f.fileno()).st_ino == os.stat(self.path).st_ino:
+                        break
+                except FileNotFoundError:
+                    pass
+                f.close()
+            try:
+                yield f
+            finally:
+                f.close()
+
+    def _write(self, records: list[dict]) -> None:
+        with self._locked() as f:
+            f.write("".join(json.dumps(record, default=str) + "\n" for record in records))
+            f.flush()
+
+    def append(self, event: dict) -> str:
+        """Journal one event. Returns its journal id (the hex of event["id"] when set)."""
+        jid = uuid.UUID(event["id"]).hex if event.get("id") else uuid.uuid4().hex
+        self._write([{"jid": jid, "at": time.time(), "event": event}])
+        return jid
+
+    def ack(self, jids: list[str]) -> None:
+        """Mark journaled events as stored in Supabase, compacting a journal that has grown large.
+
+        A journal still large after compaction (many events pending) is
+        compacted again only once it has doubled.
+        """
+        if not jids:
+            return
+        self._write([{"ack": list(jids)}])
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return
+        if size > max(JOURNAL_COMPACT_BYTES, 2 * self._compacted_size):
+            self.compact()
+            self._compacted_size = os.path.getsize(self.path)
+
+    def fail(self, jid: str, error: str) -> None:
+        """Record one failed attempt to store a journaled event."""
+        self._write([{"fail": jid, "error": error}])
+
+    def dead_letter(self, jids: list[str], error: str) -> None:
+        """Stop replaying journaled events; compaction moves them to dead_path."""
+        if jids:
+            self._write([{"dead": list(jids), "error": error}])
+
+    @staticmethod
+    def _parse(lines) -> tuple[list[dict], set[str], dict[str, str]]:
+        """Entries with their attempts and last error, acked jids, and dead jids with their error."""
+        entries, acked, dead = {}, set(), {}
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # torn write from a crash
+            if "ack" in record:
+                acked.update(record["ack"])
+            elif "dead" in record:
+                dead.update(dict.fromkeys(record["dead"], record.get("error", "")))
+            elif "fail" in record:
+                entry = entries.get(record["fail"])
+                if entry is not None:
+                    entry["attempts"] = entry.get("attempts", 0) + 1
+                    entry["error"] = record.get("error", "")
+            elif "jid" in record:
+                entries[record["jid"]] = record
+        return list(entries.values()), acked, dead
+
+    def pending(self, older_than: float = 0.0) -> list[dict]:
+        """Unacknowledged, live entries, oldest first, journaled at least older_than seconds ago.
+
+        Each carries "attempts", the failed attempts to store it so far.
+        """
+        try:
+            with open(self.path) as f:
+                entries, acked, dead = self._parse(f)
+        except FileNotFoundError:
+            return []
+        cutoff = time.time() - older_than
+        return [
+            dict(e, attempts=e.get("attempts", 0))
+            for e in entries
+            if e["jid"] not in acked and e["jid"] not in dead and e.get("at", 0) <= cutoff
+        ]
+
+    def compact(self) -> int:
+        """Rewrite the journal with only pending entries, moving dead ones to dead_path.
+
+        Returns entries kept.
+        """
+        if not os.path.exists(self.path):
+            return 0
+        with self._locked("a+") as f:
+            f.seek(0)
+            entries, acked, dead = self._parse(f)
+            keep = [e for e in entries if e["jid"] not in acked and e["jid"] not in dead]
+            buried = [dict(e, error=dead[e["jid"]]) for e in entries if e["jid"] in dead and e["jid"] not in acked]
+            if buried:
+                with open(self.dead_path, "a") as out:
+                    out.write("".join(json.dumps(e, default=str) + "\n" for e in buried))
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w") as out:
+                out.write("".join(json.dumps(e, default=str) + "\n" for e in keep))
+            os.replace(tmp, self.path)
+        return len(keep)
@@ -0,0 +1,113 @@
+"""Shogunate Engine event storage maintenance.
+
+war_room_events is partitioned by month (war_room_events_YYYY_MM). This
+module keeps that storage in shape through Supabase RPCs:
+
+- ensure_partitions() creates upcoming month partitions ahead of time;
+- rollup_recent_events() writes hourly per-type/per-agent counts into
+  event_rollups_hourly;
+- prune_events() applies the per-type retention in event_retention,
+  dropping whole expired months and deleting the remaining expired rows.
+
+The poller runs rollups hourly and pruning daily; `python cli.py events
+prune|backfill` runs them by hand.
+"""
+
+import os
+from datetime import datetime, timedelta, timezone
+
+from engine.config import supabase
+
+EVENT_PARTITIONS_AHEAD = int(os.getenv("EVENT_PARTITIONS_AHEAD", "2"))  # months
+EVENT_ROLLUP_LOOKBACK_HOURS = int(os.getenv("EVENT_ROLLUP_LOOKBACK_HOURS", "6"))
+
+
+def ensure_partitions(months_ahead: int = EVENT_PARTITIONS_AHEAD, since: datetime | None = None) -> int:
+    """Create missing month partitions from since's month through months_ahead months from now.
+
+    Returns the number of partitions created.
+    """
+    if not supabase:
+        return 0
+
+    params = {"months_ahead": months_ahead}
+    if since is not None:
+        params["since"] = since.isoformat()
+    result = supabase.rpc("ensure_event_partitions", params).execute()
+    return int(result.data or 0)
+
+
+def rollup_events(since: datetime, until: datetime | None = None) -> int:
+    """Write hourly per-type/per-agent event counts for the whole hours in [since, until).
+
+    Safe to re-run over the same hours. Returns the number of rollup rows written.
+    """
+    if not supabase:
+        return 0
+
+    params = {"since": since.isoformat()}
+    if until is not None:
+        params["until"] = until.isoformat()
+    result = supabase.rpc("rollup_events", params).execute()
+    return int(result.data or 0)
+
+
+def _latest_rollup_hour() -> datetime | None:
+    result = (
+        supabase.table("event_rollups_hourly")
+        .select("hour")
+        .order("hour", desc=True)
+        .limit(1)
+        .execute()
+    )
+    if not result.data:
+        return None
+    return datetime.fromisoformat(result.data[0]["hour"].replace("Z", "+00:00"))
+
+
+def rollup_recent_events(lookback_hours: int = EVENT_ROLLUP_LOOKBACK_HOURS) -> int:
+    """Roll up every whole hour since the latest rollup. Runs as a poller maintenance job.
+
+    At least the last lookback_hours are re-counted, so events replayed
+    late from the journal (which keep their original created_at) still
+    reach the rollups. Also creates upcoming partitions.
+    """
+    if not supabase:
+        return 0
+
+    ensure_partitions()
+    since = datetime.now(timezone.utc) - timedelta(hours=lookback_hours)
+    latest = _latest_rollup_hour()
+    if latest is not None and latest < since:
+        since = latest
+    return rollup_events(since)
+
+
+def backfill_rollups(since: datetime, until: datetime | None = None, chunk: timedelta = timedelta(days=1)) -> int:
+    """Roll up [since, until) in chunks, so a long backfill is a series of short RPCs.
+
+    Returns the number of rollup rows written.
+    """
+    until = until or datetime.now(timezone.utc)
+    written = 0
+    start = since
+    while start < until:
+        end = min(start + chunk, until)
+        written += rollup_events(start, end)
+        start = end
+    return written
+
+
+def prune_events(dry_run: bool = False) -> dict[str, int]:
+    """Remove events past their type's retention. Runs as a poller maintenance job.
+
+    Returns {event_type: events removed} (or that would be, with dry_run).
+    """
+    if not supabase:
+        return {}
+
+    result = supabase.rpc("prune_events", {"dry_run": dry_run}).execute()
+    pruned: dict[str, int] = {}
+    for row in result.data or []:
+        pruned[row["event_type"]] = pruned.get(row["event_type"], 0) + int(row["pruned"])
+    return pruned
@@ -0,0 +1,18 @@
+"""Shogunate Engine event types.
+
+The known war_room_events.event_type values, kept in step with
+Event['type'] in lib/types.ts. Kept apart from engine.events so the CLI
+can offer them as choices without importing the emitter.
+"""
+
+from typing import Literal, get_args
+
+EventType = Literal[
+    "proposal_created", "proposal_approved", "proposal_rejected",
+    "mission_started", "mission_completed", "mission_failed",
+    "step_started", "step_completed", "step_failed", "step_stale",
+    "council_reviewed",
+    "task_created", "task_updated", "task_started", "task_completed", "task_failed",
+    "heartbeat", "agent_action", "user_request",
+]
+EVENT_TYPES: tuple[str, ...] = get_args(EventType)
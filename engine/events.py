@@ -1,19 +1,346 @@
-"""Shogunate Engine event emitter."""
+"""Shogunate Engine event emitter.
 
+The one write path for war_room_events: the engine, the wr CLI and the
+shell hooks (engine/war-room-api.sh) all write this schema, and the old
+events table survives only as a read-compatible view over it. emit()
+accepts only the event types in EventType (engine.event_types).
+
+Events are buffered: emit() queues the row and a background thread
+batch-inserts queued rows into war_room_events once EVENT_BATCH_SIZE are
+waiting or EVENT_FLUSH_INTERVAL_MS has passed since the first. Events that
+must land before the caller continues use emit(..., sync=True).
+
+The queue holds at most EVENT_QUEUE_SIZE events. When it is full, emit()
+waits up to EVENT_ENQUEUE_TIMEOUT_MS for room and then drops the event,
+counting it in warroom_events_dropped_total. Pending events are flushed
+when the poller stops and at interpreter exit.
+
+Every event is first written through to the local journal
+(engine.event_journal). Events whose insert fails, that are dropped, or
+that are emitted while Supabase is unavailable stay pending there, and
+replay_journal() (a poller maintenance job) sends them in order once
+Supabase is reachable again. The journal id is the row's id and rows are
+upserted with ignore_duplicates, so an event stored twice (an insert
+whose ack was lost, then replayed) is kept once. An event Supabase
+rejects as bad data, or that fails EVENT_REPLAY_MAX_ATTEMPTS times, is
+dead-lettered so it cannot hold up the events behind it.
+
+Payloads are shaped before they are stored as metadata: EVENT_PROJECTIONS
+picks the fields kept per event type, and any field longer than
+EVENT_FIELD_MAX_CHARS is replaced by a <field>_preview and <field>_chars
+pair. Full step output and errors stay on the step row named by step_id.
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
 from datetime import datetime, timezone
+from engine import metrics
 from engine.config import supabase
+from engine.event_journal import EventJournal
+from engine.event_types import EVENT_TYPES, EventType
+
+EVENT_BATCH_SIZE = int(os.getenv("EVENT_BATCH_SIZE", "50"))  # 1 disables buffering
+EVENT_FLUSH_INTERVAL_MS = int(os.getenv("EVENT_FLUSH_INTERVAL_MS", "500"))
+EVENT_QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", "1000"))
+EVENT_ENQUEUE_TIMEOUT_MS = int(os.getenv("EVENT_ENQUEUE_TIMEOUT_MS", "50"))
+EVENT_FIELD_MAX_CHARS = int(os.getenv("EVENT_FIELD_MAX_CHARS", "500"))  # 0 disables caps
+EVENT_REPLAY_GRACE = int(os.getenv("EVENT_REPLAY_GRACE", "60"))  # seconds before an unacked event is replayed
+EVENT_REPLAY_MAX_ATTEMPTS = int(os.getenv("EVENT_REPLAY_MAX_ATTEMPTS", "5"))  # rejected inserts before dead-lettering
+PREVIEW_ELISION = " … "
+
+# Payload fields kept in metadata per event type; other types keep every field.
+EVENT_PROJECTIONS: dict[str, tuple[str, ...]] = {
+    "step_completed": ("step_id", "mission_id", "status", "output"),
+    "step_failed": ("step_id", "mission_id", "status", "error", "output"),
+    "step_stale": ("step_id", "mission_id", "timeout_minutes", "agent"),
+    "heartbeat": ("agent", "new_missions", "step_executed", "stale_detected", "timestamp"),
+}
+
+log = logging.getLogger(__name__)
+
+
+def preview(text: str, limit: int | None = None) -> str:
+    """Head and tail of text within limit characters, elided in the middle."""
+    limit = EVENT_FIELD_MAX_CHARS if limit is None else limit
+    if limit <= 0 or len(text) <= limit:
+        return text
+    keep = max(limit - len(PREVIEW_ELISION), 0)
+    head = keep - keep // 2
+    return text[:head] + PREVIEW_ELISION + text[len(text) - keep // 2:]
+
+
+def shape_payload(event_type: str, payload: dict) -> dict:
+    """Project a payload to its event type's fields and cap large values."""
+    fields = EVENT_PROJECTIONS.get(event_type)
+    shaped = {}
+    for key, value in payload.items():
+        if fields is not None and key not in fields:
+            continue
+        if isinstance(value, str):
+            text = value
+        elif isinstance(value, (dict, list)):
+            text = json.dumps(value, default=str)
+        else:
+            shaped[key] = value
+            continue
+        if EVENT_FIELD_MAX_CHARS <= 0 or len(text) <= EVENT_FIELD_MAX_CHARS:
+            shaped[key] = value
+        else:
+            shaped[f"{key}_preview"] = preview(text)
+            shaped[f"{key}_chars"] = len(text)
+    return shaped
+
+
+_journal = EventJournal()
+
+
+def _write_rows(rows: list[dict]) -> None:
+    """Insert rows into war_room_events, skipping any whose id is already stored."""
+    supabase.table("war_room_events").upsert(
+        rows, on_conflict="id,created_at", ignore_duplicates=True
+    ).execute()
+
+
+def _row(jid: str, event: dict) -> dict:
+    """The event with its journal id as row id (entries journaled before ids were set lack one)."""
+    return event if event.get("id") else dict(event, id=str(uuid.UUID(jid)))
+
+
+def _rejected(error: Exception) -> bool:
+    """True if Supabase refused the row itself (a data or constraint error), so retrying cannot help."""
+    code = str(getattr(error, "code", "") or "")
+    return code[:2] in ("22", "23") or code.startswith("PGRST2")
+
+
+def _insert_events(entries: list[tuple[str, dict]], attempts: dict[str, int] | None = None) -> list[str]:
+    """Bulk insert journaled events; fall back to row-by-row if the batch is rejected.
+
+    In the fallback, a row Supabase rejects as bad data, or whose failed
+    attempts reach EVENT_REPLAY_MAX_ATTEMPTS, is dead-lettered and
+    skipped. Any other failure stops the fallback there, so events are
+    never stored out of order; a failure Supabase answered counts as an
+    attempt, an unreachable Supabase does not.
+
+    Acknowledges stored events and returns the journal ids of the events
+    stored or dead-lettered; the rest stay pending in the journal for replay.
+    """
+    if not supabase or not entries:
+        return []
+
+    attempts = attempts or {}
+    try:
+        _write_rows([_row(jid, event) for jid, event in entries])
+        stored = [jid for jid, _ in entries]
+        _ack(stored)
+        return stored
+    except Exception as e:
+        log.warning(f"Event batch insert failed ({len(entries)} events): {e}")
+
+    stored, dead = [], []
+    for jid, event in entries:
+        try:
+            _write_rows([_row(jid, event)])
+            stored.append(jid)
+            continue
+        except Exception as e:
+            error = e
+        failed = attempts.get(jid, 0) + 1 if getattr(error, "code", None) else 0
+        if _rejected(error) or failed >= EVENT_REPLAY_MAX_ATTEMPTS:
+            log.error(f"{event.get('event_type')} event dead-lettered after {max(failed, 1)} attempts: {error}")
+            metrics.EVENTS_DEAD_LETTERED_TOTAL.inc(event_type=event.get("event_type", ""))
+            _dead_letter(jid, str(error))
+            dead.append(jid)
+            continue
+        if failed:
+            _fail(jid, str(error))
+        log.warning(f"{len(entries) - len(stored) - len(dead)} events kept in journal: {error}")
+        break
+
+    _ack(stored)
+    return stored + dead
+
+
+def _ack(jids: list[str]) -> None:
+    try:
+        _journal.ack(jids)
+    except OSError as e:
+        log.warning(f"Event journal ack failed: {e}")
+
+
+def _fail(jid: str, error: str) -> None:
+    try:
+        _journal.fail(jid, error)
+    except OSError as e:
+        log.warning(f"Event journal write failed: {e}")
 
 
-def emit(event_type: str, payload: dict) -> dict:
+def _dead_letter(jid: str, error: str) -> None:
+    try:
+        _journal.dead_letter([jid], error)
+    except OSError as e:
+        log.warning(f"Event journal write failed: {e}")
+
+
+class EventBuffer:
+    """Bounded queue of events drained by a background writer thread.
+
+    The writer waits for an event, then collects up to batch_size more
+    for at most interval seconds and inserts them in one request.
+    flush() drains the queue synchronously, then waits for any batch the
+    writer has already dequeued, so nothing queued is lost at exit.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = EVENT_BATCH_SIZE,
+        interval: float = EVENT_FLUSH_INTERVAL_MS / 1000,
+        max_size: int = EVENT_QUEUE_SIZE,
+        enqueue_timeout: float = EVENT_ENQUEUE_TIMEOUT_MS / 1000,
+    ):
+        self.batch_size = max(batch_size, 1)
+        self.interval = interval
+        self.enqueue_timeout = enqueue_timeout
+        self._queue: queue.Queue[tuple[str, dict]] = queue.Queue(maxsize=max_size)
+        self._write_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._atexit_registered = False
+
+    def __len__(self) -> int:
+        return self._queue.qsize()
+
+    def put(self, jid: str, event: dict) -> bool:
+        """Queue a journaled event. Returns False if it was dropped because the queue stayed full.
+
+        A dropped event stays pending in the journal and is replayed later.
+        """
+        self._start()
+        try:
+            self._queue.put((jid, event), timeout=self.enqueue_timeout)
+            return True
+        except queue.Full:
+            metrics.EVENTS_DROPPED_TOTAL.inc(event_type=event["event_type"])
+            return False
+
+    def flush(self) -> int:
+        """Insert every queued event now. Returns the number stored or dead-lettered."""
+        stored = 0
+        with self._write_lock:
+            while True:
+                batch = self._take(self.batch_size)
+                if not batch:
+                    break
+                try:
+                    stored += len(_insert_events(batch))
+                finally:
+                    self._done(batch)
+        # A batch the writer dequeued before we took the lock is still in flight
+        self._queue.join()
+        return stored
+
+    def _start(self) -> None:
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="event-writer", daemon=True)
+            self._thread.start()
+            if not self._atexit_registered:
+                atexit.register(self.flush)
+                self._atexit_registered = True
+
+    def _take(self, limit: int, deadline: float | None = None) -> list[tuple[str, dict]]:
+        batch = []
+        while len(batch) < limit:
+            try:
+                if deadline is None:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=max(deadline - time.monotonic(), 0)))
+            except queue.Empty:
+                break
+        return batch
+
+    def _done(self, batch: list[tuple[str, dict]]) -> None:
+        for _ in batch:
+            self._queue.task_done()
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            deadline = time.monotonic() + self.interval
+            with self._write_lock:
+                batch = [first] + self._take(self.batch_size - 1, deadline)
+                try:
+                    _insert_events(batch)
+                except Exception as e:
+                    log.warning(f"Event writer error: {e}")
+                finally:
+                    self._done(batch)
+
+
+_buffer = EventBuffer()
+
+
+def flush_events() -> int:
+    """Insert all buffered events now (e.g. before shutdown)."""
+    return _buffer.flush()
+
+
+def replay_journal(batch_size: int = EVENT_BATCH_SIZE) -> int:
+    """Send pending journaled events to Supabase in order, in batches.
+
+    Only events journaled more than EVENT_REPLAY_GRACE seconds ago are
+    replayed, so events still in flight through the buffer are left alone.
+    Stops at the first batch that cannot be fully handled, keeping the rest
+    in order for the next run, then compacts the journal (moving
+    dead-lettered events out of it). Runs as a poller maintenance job.
+
+    Returns:
+        Number of events stored or dead-lettered
+    """
+    if not supabase:
+        return 0
+
+    entries = _journal.pending(older_than=EVENT_REPLAY_GRACE)
+    pending = [(e["jid"], e["event"]) for e in entries]
+    attempts = {e["jid"]: e["attempts"] for e in entries}
+    replayed = 0
+    for start in range(0, len(pending), max(batch_size, 1)):
+        batch = pending[start:start + max(batch_size, 1)]
+        handled = _insert_events(batch, attempts)
+        replayed += len(handled)
+        if len(handled) < len(batch):
+            break
+
+    _journal.compact()
+    return replayed
+
+
+def emit(event_type: EventType, payload: dict, sync: bool = False) -> dict:
     """Emit an event to the war_room_events table.
 
     Args:
-        event_type: Type of event (e.g., 'step_completed', 'mission_completed')
-        payload: Event data dict
+        event_type: One of EVENT_TYPES (e.g., 'step_completed', 'mission_completed')
+        payload: Event data dict, shaped by shape_payload() into metadata
+        sync: Insert immediately instead of through the buffered writer
 
     Returns:
-        The created event record, or the event dict if Supabase is unavailable.
+        The event row, including the id it is stored under. If Supabase is
+        unavailable or the insert fails, the event stays in the journal for
+        replay.
+
+    Raises:
+        ValueError: event_type is not a known event type
     """
+    if event_type not in EVENT_TYPES:
+        raise ValueError(f"Unknown event type {event_type!r}; expected one of {', '.join(EVENT_TYPES)}")
+
     agent_id = (
         payload.get("agent")
         or payload.get("assigned_to")
@@ -27,16 +354,33 @@ def emit(event_type: str, payload: dict) -> dict:
     )
 
     event = {
+        "id": str(uuid.uuid4()),
         "event_type": event_type,
         "agent_id": agent_id,
         "title": title,
-        "description": description,
-        "metadata": payload,
+        "description": preview(description) if isinstance(description, str) else description,
+        "metadata": shape_payload(event_type, payload),
         "created_at": datetime.now(timezone.utc).isoformat(),
     }
 
-    if supabase:
-        result = supabase.table("war_room_events").insert(event).execute()
-        return result.data[0] if result.data else event
+    try:
+        jid = _journal.append(event)
+    except OSError as e:
+        log.warning(f"Event journal write failed: {e}")
+        jid = None
+
+    if not supabase:
+        return event
+
+    if sync or EVENT_BATCH_SIZE <= 1 or jid is None:
+        if jid:
+            _insert_events([(jid, event)])
+            return event
+        try:
+            _write_rows([event])
+        except Exception as e:
+            log.warning(f"{event_type} event not stored: {e}")
+        return event
 
+    _buffer.put(jid, event)
     return event
@@ -1,18 +1,35 @@
 """Shogunate Engine Step Executor.
 
 Runs individual steps by spawning headless Claude Code sessions
-with the assigned Daimyo's SKILL.md as system prompt.
+with the assigned Daimyo's SKILL.md as system prompt. The system prompt
+(skill sections + memories) is packed into a per-model token budget.
 """
 
+import re
 import subprocess
+import time
 from pathlib import Path
 from datetime import datetime, timezone
 
-from engine.config import supabase, DAIMYO_REGISTRY, WORKER_MODEL, ORCHESTRATOR_MODEL, DEFAULT_TIMEOUT_MINUTES
+from engine import metrics
+from engine.config import (
+    supabase,
+    DAIMYO_REGISTRY,
+    WORKER_MODEL,
+    ORCHESTRATOR_MODEL,
+    DEFAULT_TIMEOUT_MINUTES,
+    PROMPT_BUDGETS,
+)
 from engine.events import emit
-from engine.memory import extract_and_store, get_relevant_memories, format_memories_section
+from engine.memory import queue_extraction, get_relevant_memories, format_memories_section
+from engine.memory_index import tokenize
 from engine.relationships import apply_drift
 
+CHARS_PER_TOKEN = 4
+MEMORY_BUDGET_SHARE = 0.25  # of the prompt budget
+TRUNCATION_MARKER = "\n\n[... truncated to fit the prompt budget]\n"
+_SECTION_RE = re.compile(r"(?m)^(?=#{1,6} )")
+
 
 # ---------------------------------------------------------------------------
 # Internal helpers
@@ -31,6 +48,64 @@ def _load_skill_md(daimyo_id: str) -> str:
     return ""
 
 
+def estimate_tokens(text: str) -> int:
+    """Local token estimate (~4 characters per token), no tokenizer call."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _truncate_to_tokens(text: str, tokens: int) -> str:
+    """Cut text on a line boundary so it plus the marker fits in tokens."""
+    limit = max(0, tokens * CHARS_PER_TOKEN - len(TRUNCATION_MARKER))
+    if len(text) <= limit:
+        return text
+    cut = text.rfind("\n", 0, limit)
+    return text[:cut if cut > 0 else limit] + TRUNCATION_MARKER
+
+
+def _assemble_system_prompt(skill_md: str, memories: list[dict], description: str, model: str) -> str:
+    """Pack SKILL.md sections and memories into the model's prompt budget.
+
+    Memories (already ranked by relevance) get up to MEMORY_BUDGET_SHARE of
+    the budget and are dropped from the least relevant end. The skill's
+    first section is always kept (truncated if it alone is too big); other
+    sections are added by term overlap with the step description and
+    emitted in document order. Within budget the result is exactly
+    skill_md + the memories section.
+    """
+    budget = PROMPT_BUDGETS.get(model, PROMPT_BUDGETS[WORKER_MODEL])
+
+    # 1. Memories within their share
+    memory_budget = int(budget * MEMORY_BUDGET_SHARE)
+    memory_section = format_memories_section(memories)
+    while memories and estimate_tokens(memory_section) > memory_budget:
+        memories = memories[:-1]
+        memory_section = format_memories_section(memories)
+
+    # 2. Skill sections in the rest
+    skill_budget = budget - estimate_tokens(memory_section)
+    sections = [section for section in _SECTION_RE.split(skill_md) if section]
+    if not sections:
+        return memory_section
+
+    used = estimate_tokens(sections[0])
+    if used > skill_budget:
+        return _truncate_to_tokens(sections[0], skill_budget) + memory_section
+
+    query = set(tokenize(description))
+    by_relevance = sorted(
+        range(1, len(sections)),
+        key=lambda i: (-len(query & set(tokenize(sections[i]))), i),
+    )
+    keep = {0}
+    for i in by_relevance:
+        cost = estimate_tokens(sections[i])
+        if used + cost <= skill_budget:
+            keep.add(i)
+            used += cost
+
+    return "".join(sections[i] for i in sorted(keep)) + memory_section
+
+
 def _should_escalate(mission_id: str) -> bool:
     """Check if a mission spans 3+ unique domains, warranting Opus escalation.
 
@@ -88,6 +163,24 @@ def _spawn_claude(
     return result.stdout, result.stderr, result.returncode
 
 
+def _parse_timestamp(value: str | None) -> datetime | None:
+    """Parse a Supabase ISO timestamp, tolerating a trailing Z."""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except (TypeError, ValueError):
+        return None
+
+
+def _observe_queue_wait(step: dict, model: str) -> None:
+    """Record how long the step sat queued before it was claimed."""
+    created = _parse_timestamp(step.get("created_at"))
+    started = _parse_timestamp(step.get("started_at"))
+    if created and started and started >= created:
+        metrics.STEP_QUEUE_WAIT_SECONDS.observe((started - created).total_seconds(), model=model)
+
+
 def _update_linked_task(mission_id: str, task_status: str, now: str) -> None:
     """Update the task linked to a mission's proposal, if any."""
     if not supabase:
@@ -141,7 +234,7 @@ def _check_mission_complete(mission_id: str) -> None:
                 "completed_at": now,
             }).eq("id", mission_id).execute()
 
-            emit("mission_failed", {"mission_id": mission_id})
+            emit("mission_failed", {"mission_id": mission_id}, sync=True)
 
             _update_linked_task(mission_id, "blocked", now)
         else:
@@ -154,7 +247,7 @@ def _check_mission_complete(mission_id: str) -> None:
             emit("mission_completed", {
                 "mission_id": mission_id,
                 "completed_at": now,
-            })
+            }, sync=True)
 
             _update_linked_task(mission_id, "review", now)
 
@@ -230,18 +323,6 @@ def execute_step(step: dict) -> dict:
     timeout = step.get("timeout_minutes", DEFAULT_TIMEOUT_MINUTES)
     description = step["description"]
 
-    # 1. Load skill
-    skill_md = _load_skill_md(daimyo_id)
-
-    # Inject relevant memories into skill prompt
-    try:
-        memories = get_relevant_memories(daimyo_id, description, limit=5)
-        memory_section = format_memories_section(memories)
-        if memory_section:
-            skill_md = skill_md + memory_section
-    except Exception:
-        pass  # Memory injection is best-effort
-
     # Model selection: default Sonnet, escalate to Opus for complex missions
     model = step.get("model") or WORKER_MODEL
     if step.get("escalate"):
@@ -249,11 +330,25 @@ def execute_step(step: dict) -> dict:
     elif _should_escalate(mission_id):
         model = ORCHESTRATOR_MODEL
 
+    # 1. Load skill and pack it with relevant memories into the model's budget
+    skill_md = _load_skill_md(daimyo_id)
+    try:
+        memories = get_relevant_memories(daimyo_id, description, limit=5)
+    except Exception:
+        memories = []  # Memory injection is best-effort
+    try:
+        skill_md = _assemble_system_prompt(skill_md, memories, description, model)
+    except Exception:
+        pass  # Fall back to the raw skill rather than block execution
+
+    _observe_queue_wait(step, model)
+
     # 2-3. Spawn claude and capture output
     status = "completed"
     output = None
     error = None
 
+    spawn_timer = time.monotonic()
     try:
         stdout, stderr, returncode = _spawn_claude(
             skill_md=skill_md,
@@ -268,14 +363,19 @@ def execute_step(step: dict) -> dict:
         else:
             status = "failed"
             error = stderr or f"claude exited with code {returncode}"
+            metrics.CLAUDE_SPAWN_FAILURES_TOTAL.inc(model=model, reason="exit_code")
 
     except subprocess.TimeoutExpired:
         status = "failed"
         error = f"Step timed out after {timeout} minutes"
+        metrics.CLAUDE_SPAWN_FAILURES_TOTAL.inc(model=model, reason="timeout")
 
     except FileNotFoundError:
         status = "failed"
         error = "claude CLI not found — is it installed and on PATH?"
+        metrics.CLAUDE_SPAWN_FAILURES_TOTAL.inc(model=model, reason="not_found")
+
+    metrics.STEP_DURATION_SECONDS.observe(time.monotonic() - spawn_timer, model=model)
 
     # 4. Update step in Supabase
     now = datetime.now(timezone.utc).isoformat()
@@ -309,10 +409,10 @@ def execute_step(step: dict) -> dict:
         "error": error,
     })
 
-    # 5b. Extract memories from successful step output
+    # 5b. Queue successful step output for batched memory extraction
     if status == "completed" and output:
         try:
-            extract_and_store(step, output)
+            queue_extraction(step, output)
         except Exception:
             pass  # Memory extraction is best-effort, never block execution
 
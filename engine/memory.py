@@ -1,66 +1,153 @@
 """Shogunate Engine memory system.
 
 Extracts learnings from step outputs and stores in agent_memory table.
-Retrieves relevant memories for prompt injection.
+Completed steps are batched so one cheap-model call and one bulk insert
+cover several outputs; each output is reduced to a salience digest
+(engine.digest) rather than its first few thousand characters.
+Near-duplicate learnings are merged into the existing memory (more
+occurrences, higher confidence) instead of stored.
+
+Retrieval results are cached per agent until a local write or a realtime
+agent_memory change for that agent (or MEMORY_CACHE_TTL) invalidates them.
+Retrieves relevant memories for prompt injection from the local SQLite
+FTS5 mirror in engine.memory_index, which keeps working offline.
+Confidence decays with time since a memory was last seen, and
+archive_stale_memories() retires memories whose decayed confidence falls
+below MEMORY_ARCHIVE_BELOW.
 """
 
+import atexit
+import os
 import subprocess
 import json
+import threading
+import time
 from datetime import datetime, timezone
 
+from engine import metrics, realtime
 from engine.config import supabase, CHEAP_MODEL
+from engine.digest import digest
+from engine.memory_index import HALF_LIFE_DAYS, get_index, hamming, simhash
 
 
-def extract_and_store(step: dict, output: str) -> list[dict]:
-    """Extract learnings from step output and store in agent_memory.
+EXTRACTION_BATCH_SIZE = int(os.getenv("MEMORY_BATCH_SIZE", "5"))
+EXTRACTION_BATCH_WINDOW = int(os.getenv("MEMORY_BATCH_WINDOW", "60"))  # seconds
+MAX_MEMORIES_PER_STEP = 3
+DUPLICATE_BITS = int(os.getenv("MEMORY_DUPLICATE_BITS", "6"))  # SimHash Hamming distance
+MERGE_CONFIDENCE_BUMP = 0.05
+MEMORY_CACHE_TTL = int(os.getenv("MEMORY_CACHE_TTL", "300"))  # seconds
+ARCHIVE_BELOW = float(os.getenv("MEMORY_ARCHIVE_BELOW", "0.1"))  # effective confidence floor
+MEMORY_TTL_DAYS = int(os.getenv("MEMORY_TTL_DAYS", "180"))  # 0 disables
 
-    Uses a lightweight Claude call (Haiku) to extract key decisions,
-    patterns, and what worked/failed from the step output.
+# agent_id -> {(task_description, limit): (cached_at, memories)}
+_retrieval_cache: dict[str, dict[tuple[str, int], tuple[float, list[dict]]]] = {}
+_cache_lock = threading.Lock()
 
-    Args:
-        step: The completed step dict (must have daimyo, mission_id, title)
-        output: The step's stdout output
 
-    Returns:
-        List of stored memory dicts
-    """
-    if not supabase or not output or not output.strip():
-        return []
+def invalidate_memories(agent_id: str | None = None) -> None:
+    """Drop cached retrieval results for one agent, or all agents."""
+    with _cache_lock:
+        if agent_id is None:
+            _retrieval_cache.clear()
+        else:
+            _retrieval_cache.pop(agent_id, None)
+
+
+def handle_memory_change(event_type: str, new: dict | None, old: dict | None) -> None:
+    """Apply a realtime agent_memory change to the local index and cache."""
+    index = get_index()
+    if event_type == "DELETE" or not new:
+        if old and old.get("id"):
+            index.remove(old["id"])
+    elif new.get("status", "active") == "active":
+        index.add(new)
+    elif new.get("id"):
+        index.remove(new["id"])
+
+    agent_id = (new or {}).get("agent_id") or (old or {}).get("agent_id")
+    invalidate_memories(agent_id)
+
+
+realtime.on_change("agent_memory", handle_memory_change)
 
-    daimyo_id = step.get("daimyo") or step.get("assigned_to", "ed")
-    mission_id = step.get("mission_id")
-    step_title = step.get("title", "unknown step")
+# Must match the agent_memory.memory_type CHECK constraint; anything else
+# from the model is stored as "insight" so one bad row cannot fail a batch.
+MEMORY_TYPES = ("insight", "pattern", "strategy", "preference", "lesson")
+DEFAULT_CONFIDENCE = 0.5
 
-    # Use Haiku for cheap extraction
-    extraction_prompt = f"""Analyze this step output and extract 1-3 key learnings.
 
-Step: {step_title}
-Agent: {daimyo_id}
+def _memory_type(value) -> str:
+    value = value.strip().lower() if isinstance(value, str) else ""
+    return value if value in MEMORY_TYPES else "insight"
 
-Output:
-{output[:3000]}
+
+def _confidence(value) -> float:
+    try:
+        confidence = float(value)
+    except (TypeError, ValueError):
+        return DEFAULT_CONFIDENCE
+    if confidence != confidence:  # NaN
+        return DEFAULT_CONFIDENCE
+    return min(max(confidence, 0.0), 1.0)
+
+
+def _step_agent(step: dict) -> str:
+    return step.get("daimyo") or step.get("assigned_to", "ed")
+
+
+def _extraction_prompt(items: list[tuple[dict, str]]) -> str:
+    sections = []
+    for number, (step, output) in enumerate(items, 1):
+        daimyo_id = _step_agent(step)
+        sections.append(
+            f"### Step {number}: {step.get('title', 'unknown step')}\n"
+            f"Agent: {daimyo_id}\n\n"
+            f"Output:\n{digest(output)}"
+        )
+
+    return f"""Analyze these {len(items)} step output(s) and extract 1-3 key learnings from each.
+
+{chr(10).join(sections)}
 
 Return a JSON array of objects with these fields:
-- "memory_type": one of "insight", "pattern", "decision", "solution", "warning"
+- "step": the number of the step the learning came from
+- "memory_type": one of {", ".join(f'"{t}"' for t in MEMORY_TYPES)}
 - "content": concise description of the learning (1-2 sentences)
 - "tags": array of 2-4 relevant tags
 - "confidence": float 0.0-1.0
 
 Example:
-[{{"memory_type": "solution", "content": "Fixed auth by adding null check before profile access", "tags": ["auth", "null-check", "debugging"], "confidence": 0.85}}]
+[{{"step": 1, "memory_type": "lesson", "content": "Fixed auth by adding null check before profile access", "tags": ["auth", "null-check", "debugging"], "confidence": 0.85}}]
 
 Return ONLY the JSON array, no other text."""
 
+
+def extract_batch(items: list[tuple[dict, str]]) -> list[dict]:
+    """Extract learnings from several step outputs in one cheap-model call.
+
+    Each learning is attributed back to its step (agent and mission), and
+    all memories are written with one bulk insert.
+
+    Args:
+        items: (completed step dict, step stdout) pairs
+
+    Returns:
+        List of stored memory dicts
+    """
+    items = [(step, output) for step, output in items if output and output.strip()]
+    if not supabase or not items:
+        return []
+
     try:
         result = subprocess.run(
             [
                 "claude", "-p",
                 "--model", CHEAP_MODEL,
-                extraction_prompt,
+                _extraction_prompt(items),
             ],
             capture_output=True,
             text=True,
-            timeout=60,
+            timeout=60 + 15 * (len(items) - 1),
         )
 
         if result.returncode != 0:
@@ -79,65 +166,320 @@ Return ONLY the JSON array, no other text."""
     except (subprocess.TimeoutExpired, FileNotFoundError, json.JSONDecodeError):
         return []
 
-    # Store each memory
-    stored = []
+    # Attribute each learning to its step, capped per step
     now = datetime.now(timezone.utc).isoformat()
+    per_step = [0] * len(items)
+    rows = []
+
+    for mem in memories:
+        if not isinstance(mem, dict):
+            continue
+        number = mem.get("step", 1)
+        if not isinstance(number, int) or not 1 <= number <= len(items):
+            continue
+        if per_step[number - 1] >= MAX_MEMORIES_PER_STEP:
+            continue
+        per_step[number - 1] += 1
 
-    for mem in memories[:3]:  # Cap at 3
-        memory_data = {
-            "agent_id": daimyo_id,
-            "memory_type": mem.get("memory_type", "insight"),
+        step = items[number - 1][0]
+        rows.append({
+            "agent_id": _step_agent(step),
+            "memory_type": _memory_type(mem.get("memory_type")),
             "content": mem.get("content", ""),
             "tags": mem.get("tags", []),
-            "confidence": min(max(mem.get("confidence", 0.5), 0.0), 1.0),
-            "source_mission_id": mission_id,
+            "confidence": _confidence(mem.get("confidence", DEFAULT_CONFIDENCE)),
+            "source_mission_id": step.get("mission_id"),
             "status": "active",
             "created_at": now,
-        }
+        })
+
+    rows, merges = _suppress_duplicates(rows)
+    stored = _insert_memories(rows) + _merge_memories(merges)
+    index = get_index()
+    for memory in stored:
+        index.add(memory)
+    for agent_id in {_step_agent(step) for step, _ in items}:
+        invalidate_memories(agent_id)
+    return stored
+
+
+def _suppress_duplicates(rows: list[dict]) -> tuple[list[dict], list[dict]]:
+    """Split new memory rows into rows to insert and merges into existing memories.
+
+    A row within DUPLICATE_BITS of an active memory of the same agent becomes
+    a merge into it; near-duplicates within the batch collapse into one row.
+    """
+    index = get_index()
+    index.sync()
+
+    fresh: list[dict] = []
+    merges: dict[str, dict] = {}
+
+    for row in rows:
+        fingerprint = simhash(row["content"])
+        existing = index.find_near_duplicate(row["agent_id"], fingerprint, DUPLICATE_BITS)
+        if existing:
+            merge = merges.setdefault(existing["id"], {"id": existing["id"], "confidence": 0.0, "count": 0})
+            merge["confidence"] = max(merge["confidence"], row["confidence"])
+            merge["count"] += 1
+            continue
+
+        twin = next(
+            (
+                r for r in fresh
+                if r["agent_id"] == row["agent_id"] and hamming(r["fingerprint"], fingerprint) <= DUPLICATE_BITS
+            ),
+            None,
+        )
+        if twin:
+            twin["occurrences"] += 1
+            twin["confidence"] = max(twin["confidence"], row["confidence"])
+            continue
 
+        fresh.append({**row, "fingerprint": fingerprint, "occurrences": 1})
+
+    return fresh, list(merges.values())
+
+
+def _merge_memories(merges: list[dict]) -> list[dict]:
+    """Fold duplicate sightings into existing memories in one round trip."""
+    if not merges:
+        return []
+
+    try:
+        result = supabase.rpc(
+            "merge_memories", {"merges": merges, "bump": MERGE_CONFIDENCE_BUMP}
+        ).execute()
+        return result.data or []
+    except Exception:
+        return []
+
+
+def consolidate_memories() -> int:
+    """Fold clusters of near-duplicate active memories into one memory each.
+
+    The memory with the highest confidence (then most occurrences, then
+    oldest) is kept; the rest are archived with merged_into pointing at it
+    by the consolidate_memories RPC. Runs as a poller maintenance job.
+
+    Returns:
+        Number of memories archived
+    """
+    if not supabase:
+        return 0
+
+    index = get_index()
+    index.sync(force=True)
+
+    clusters = []
+    for agent_id in index.agents():
+        for group in index.near_duplicate_clusters(agent_id, DUPLICATE_BITS):
+            group.sort(key=lambda m: (
+                -float(m.get("confidence") or 0),
+                -(m.get("occurrences") or 1),
+                m.get("created_at") or "",
+            ))
+            clusters.append({"keep": group[0]["id"], "merged": [m["id"] for m in group[1:]]})
+
+    if not clusters:
+        return 0
+
+    result = supabase.rpc(
+        "consolidate_memories", {"clusters": clusters, "bump": MERGE_CONFIDENCE_BUMP}
+    ).execute()
+
+    for cluster in clusters:
+        for memory_id in cluster["merged"]:
+            index.remove(memory_id)
+    for memory in result.data or []:
+        index.add(memory)
+    index.save()
+    invalidate_memories()
+
+    return sum(len(cluster["merged"]) for cluster in clusters)
+
+
+def archive_stale_memories() -> int:
+    """Archive active memories that have decayed or outlived MEMORY_TTL_DAYS.
+
+    One archive_stale_memories RPC updates every qualifying row; archived
+    memories are then dropped from the local index. Runs as a poller
+    maintenance job.
+
+    Returns:
+        Number of memories archived
+    """
+    if not supabase:
+        return 0
+
+    result = supabase.rpc("archive_stale_memories", {
+        "half_life": f"{HALF_LIFE_DAYS} days" if HALF_LIFE_DAYS > 0 else None,
+        "floor": ARCHIVE_BELOW,
+        "ttl": f"{MEMORY_TTL_DAYS} days" if MEMORY_TTL_DAYS > 0 else None,
+    }).execute()
+    archived = result.data or []
+    if not archived:
+        return 0
+
+    index = get_index()
+    for row in archived:
+        index.remove(row["id"])
+    index.save()
+    for agent_id in {row.get("agent_id") for row in archived}:
+        invalidate_memories(agent_id)
+    return len(archived)
+
+
+def _insert_memories(rows: list[dict]) -> list[dict]:
+    """Bulk insert memory rows; fall back to row-by-row if the batch is rejected."""
+    if not rows:
+        return []
+
+    try:
+        result = supabase.table("agent_memory").insert(rows).execute()
+        return result.data or []
+    except Exception:
+        pass
+
+    stored = []
+    for row in rows:
         try:
-            result = supabase.table("agent_memory").insert(memory_data).execute()
+            result = supabase.table("agent_memory").insert(row).execute()
             if result.data:
                 stored.append(result.data[0])
         except Exception:
             continue
-
     return stored
 
 
+def extract_and_store(step: dict, output: str) -> list[dict]:
+    """Extract learnings from step output and store in agent_memory.
+
+    Uses a lightweight Claude call (Haiku) to extract key decisions,
+    patterns, and what worked/failed from the step output. The executor
+    goes through queue_extraction() instead, which batches steps.
+
+    Args:
+        step: The completed step dict (must have daimyo, mission_id, title)
+        output: The step's stdout output
+
+    Returns:
+        List of stored memory dicts
+    """
+    return extract_batch([(step, output)])
+
+
+class ExtractionBatcher:
+    """Accumulates completed step outputs for one batched extraction.
+
+    A batch is extracted when it reaches max_items, or by flush() once
+    the oldest item has waited window seconds. Pending items are flushed
+    at interpreter exit.
+    """
+
+    def __init__(self, max_items: int = EXTRACTION_BATCH_SIZE, window: float = EXTRACTION_BATCH_WINDOW):
+        self.max_items = max_items
+        self.window = window
+        self._pending: list[tuple[dict, str, float]] = []
+        self._lock = threading.Lock()
+        self._atexit_registered = False
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def submit(self, step: dict, output: str) -> list[dict]:
+        """Queue a step output. Returns stored memories if this filled the batch."""
+        if not output or not output.strip():
+            return []
+        with self._lock:
+            self._pending.append((step, output, time.monotonic()))
+            if not self._atexit_registered:
+                atexit.register(self.flush, True)
+                self._atexit_registered = True
+            full = len(self._pending) >= self.max_items
+        return self.flush(force=True) if full else []
+
+    def due(self) -> bool:
+        with self._lock:
+            return bool(self._pending) and time.monotonic() - self._pending[0][2] >= self.window
+
+    def flush(self, force: bool = False) -> list[dict]:
+        """Extract pending items if forced or the window has elapsed."""
+        if not force and not self.due():
+            return []
+        with self._lock:
+            batch, self._pending = self._pending[:self.max_items], self._pending[self.max_items:]
+        if not batch:
+            return []
+
+        stored = extract_batch([(step, output) for step, output, _ in batch])
+        done = time.monotonic()
+        for _, _, queued_at in batch:
+            metrics.MEMORY_EXTRACTION_LAG_SECONDS.observe(done - queued_at)
+        return stored
+
+
+_batcher = ExtractionBatcher()
+
+
+def queue_extraction(step: dict, output: str) -> list[dict]:
+    """Queue a completed step's output for batched memory extraction."""
+    return _batcher.submit(step, output)
+
+
+def flush_extractions(force: bool = False) -> list[dict]:
+    """Extract queued outputs if the batch window has elapsed (or forced)."""
+    stored = []
+    while True:
+        flushed = _batcher.flush(force=force)
+        stored.extend(flushed)
+        if not force or not len(_batcher):
+            return stored
+
+
 def get_relevant_memories(
     agent_id: str,
     task_description: str = "",
     limit: int = 5,
 ) -> list[dict]:
-    """Retrieve recent relevant memories for an agent.
+    """Retrieve the memories most relevant to a task for an agent.
+
+    Memories are served from the local SQLite FTS5 mirror (see
+    engine.memory_index): ranked by BM25 relevance to the task description
+    with decayed confidence as a prior, or by decayed confidence alone when
+    there is no description. The mirror pulls new rows at most once per
+    MEMORY_INDEX_SYNC_INTERVAL and keeps serving the last synced memories
+    while Supabase is unreachable. Results are cached per agent until
+    invalidated (see invalidate_memories).
 
     Args:
         agent_id: The daimyo ID (e.g., 'ed', 'light')
-        task_description: Optional task context for relevance (unused for now, future: semantic search)
+        task_description: Task context to rank memories against
         limit: Max memories to return
 
     Returns:
-        List of memory dicts ordered by confidence DESC, created_at DESC
+        List of memory dicts, most relevant first
     """
     if not supabase:
         return []
 
+    key = (task_description.strip(), limit)
+    with _cache_lock:
+        cached = _retrieval_cache.get(agent_id, {}).get(key)
+    if cached and time.monotonic() - cached[0] < MEMORY_CACHE_TTL:
+        return [dict(m) for m in cached[1]]
+
     try:
-        result = (
-            supabase.table("agent_memory")
-            .select("*")
-            .eq("agent_id", agent_id)
-            .eq("status", "active")
-            .order("confidence", desc=True)
-            .order("created_at", desc=True)
-            .limit(limit)
-            .execute()
-        )
-        return result.data or []
+        index = get_index()
+        index.sync()
+        memories = index.search(agent_id, key[0], limit)
     except Exception:
         return []
 
+    with _cache_lock:
+        _retrieval_cache.setdefault(agent_id, {})[key] = (time.monotonic(), memories)
+    return [dict(m) for m in memories]
+
 
 def format_memories_section(memories: list[dict]) -> str:
     """Format memories as a markdown section for prompt injection.
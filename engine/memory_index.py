@@ -0,0 +1,374 @@
+"""Shogunate Engine local memory index.
+
+A local mirror of active agent_memory rows in a SQLite database
+(~/.warroom/memory.db) with an FTS5 full-text index over content and
+tags. It is kept current incrementally: local inserts are added directly
+and sync() pulls only rows updated after the stored updated_at watermark,
+dropping the ones no longer active. Retrieval is a local full-text query
+with no network round trip, so it keeps serving the last synced memories
+while Supabase is slow or down.
+
+score = BM25(query, content + tags) + CONFIDENCE_PRIOR * effective confidence
+
+Effective confidence decays by half every MEMORY_HALF_LIFE_DAYS since the
+memory was last seen (re-learned) or, failing that, created.
+
+Each memory also carries a 64-bit SimHash of its content, so near-duplicate
+lessons can be found by Hamming distance without a round trip.
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from engine import realtime
+from engine.config import supabase
+
+INDEX_FILE = os.path.expanduser("~/.warroom/memory.db")
+SYNC_INTERVAL = int(os.getenv("MEMORY_INDEX_SYNC_INTERVAL", "60"))  # seconds
+REALTIME_SYNC_INTERVAL = 3600  # safety net while realtime delivers changes
+CONFIDENCE_PRIOR = float(os.getenv("MEMORY_CONFIDENCE_PRIOR", "1.0"))
+HALF_LIFE_DAYS = float(os.getenv("MEMORY_HALF_LIFE_DAYS", "30"))  # 0 disables decay
+SYNC_PAGE_SIZE = 1000
+SYNC_OVERLAP_SECONDS = 60  # re-read window for updates committed out of updated_at order
+
+TAG_BOOST = 2.0  # FTS5 bm25() weight of tags relative to content
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in into is it its of on or "
+    "that the this to was were will with".split()
+)
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Fields kept per memory; everything else in the row is dropped.
+_STORED_FIELDS = (
+    "id", "agent_id", "memory_type", "content", "tags", "confidence",
+    "created_at", "source_mission_id", "fingerprint", "occurrences",
+    "last_seen_at", "updated_at",
+)
+
+_SUFFIXES = ("ing", "ed", "es", "s")
+_MASK64 = (1 << 64) - 1
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercase alphanumeric tokens without stopwords or single characters."""
+    return [t for t in _TOKEN_RE.findall(text.lower()) if len(t) > 1 and t not in STOPWORDS]
+
+
+def _stem(token: str) -> str:
+    for suffix in _SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            return token[:-len(suffix)]
+    return token
+
+
+def simhash(text: str) -> int:
+    """64-bit SimHash of content tokens, as a signed int (fits a Postgres bigint)."""
+    weights = [0] * 64
+    for token in tokenize(text):
+        digest = int.from_bytes(hashlib.blake2b(_stem(token).encode(), digest_size=8).digest(), "big")
+        for bit in range(64):
+            weights[bit] += 1 if digest >> bit & 1 else -1
+    value = sum(1 << bit for bit in range(64) if weights[bit] > 0)
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def hamming(a: int, b: int) -> int:
+    """Number of differing bits between two fingerprints."""
+    return ((a ^ b) & _MASK64).bit_count()
+
+
+def effective_confidence(memory: dict, now: datetime | None = None) -> float:
+    """Confidence halved for every HALF_LIFE_DAYS since last seen or created."""
+    confidence = float(memory.get("confidence") or 0.0)
+    stamp = memory.get("last_seen_at") or memory.get("created_at")
+    if HALF_LIFE_DAYS <= 0 or not stamp:
+        return confidence
+    try:
+        seen = datetime.fromisoformat(str(stamp).replace("Z", "+00:00"))
+    except ValueError:
+        return confidence
+    if seen.tzinfo is None:
+        seen = seen.replace(tzinfo=timezone.utc)
+    age_days = max(((now or datetime.now(timezone.utc)) - seen).total_seconds() / 86400, 0.0)
+    return confidence * 0.5 ** (age_days / HALF_LIFE_DAYS)
+
+
+_SCHEMA = """
+create table if not exists memories (
+  rowid integer primary key,
+  id text not null unique,
+  agent_id text not null,
+  data text not null
+);
+create index if not exists idx_memories_agent on memories(agent_id);
+create virtual table if not exists memory_fts using fts5(
+  content, tags, tokenize = 'porter unicode61'
+);
+create table if not exists meta (key text primary key, value text);
+"""
+
+
+def _decayed(confidence, stamp) -> float:
+    """SQL function decayed(confidence, last seen or created) for ranking in queries."""
+    return effective_confidence({"confidence": confidence, "created_at": stamp})
+
+
+def _rewind(stamp: str, seconds: float) -> str:
+    try:
+        moment = datetime.fromisoformat(stamp.replace("Z", "+00:00"))
+    except ValueError:
+        return stamp
+    return (moment - timedelta(seconds=seconds)).isoformat()
+
+
+# Effective confidence and recency of a memories row, for ORDER BY
+_DECAYED_SQL = (
+    "decayed(json_extract(m.data, '$.confidence'), "
+    "coalesce(json_extract(m.data, '$.last_seen_at'), json_extract(m.data, '$.created_at')))"
+)
+_CREATED_SQL = "json_extract(m.data, '$.created_at')"
+
+
+def _match_query(text: str) -> str:
+    """FTS5 query matching any of the text's terms."""
+    return " OR ".join(f'"{token}"' for token in dict.fromkeys(tokenize(text)))
+
+
+class MemoryIndex:
+    """SQLite FTS5 mirror of active memories, searched per agent."""
+
+    def __init__(self, path: str = INDEX_FILE):
+        self.path = path
+        self.watermark: str | None = None  # newest updated_at seen from Supabase
+        self._db: sqlite3.Connection | None = None
+        self._synced_at: float | None = None
+        self._loaded = False
+        self._lock = threading.RLock()
+
+    def _conn(self) -> sqlite3.Connection:
+        if self._db is None:
+            try:
+                Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+                self._db = sqlite3.connect(self.path, check_same_thread=False)
+                self._db.executescript(_SCHEMA)
+            except (OSError, sqlite3.DatabaseError):
+                # Unwritable or corrupt mirror: serve from memory until restart
+                self._db = sqlite3.connect(":memory:", check_same_thread=False)
+                self._db.executescript(_SCHEMA)
+            self._db.create_function("decayed", 2, _decayed)
+        return self._db
+
+    def _memories(self, agent_id: str) -> list[dict]:
+        rows = self._conn().execute(
+            "select data from memories where agent_id = ?", (agent_id,)
+        ).fetchall()
+        return [json.loads(data) for (data,) in rows]
+
+    # -- maintenance --------------------------------------------------------
+
+    def _add(self, memory: dict) -> None:
+        if not memory.get("id") or not memory.get("agent_id"):
+            return
+        db = self._conn()
+        self._remove(memory["id"])
+        stored = {k: memory.get(k) for k in _STORED_FIELDS}
+        if stored["fingerprint"] is None:
+            stored["fingerprint"] = simhash(stored.get("content") or "")
+        cursor = db.execute(
+            "insert into memories (id, agent_id, data) values (?, ?, ?)",
+            (stored["id"], stored["agent_id"], json.dumps(stored)),
+        )
+        db.execute(
+            "insert into memory_fts (rowid, content, tags) values (?, ?, ?)",
+            (cursor.lastrowid, stored.get("content") or "", " ".join(map(str, stored.get("tags") or []))),
+        )
+
+    def _remove(self, memory_id: str) -> None:
+        db = self._conn()
+        row = db.execute("select rowid from memories where id = ?", (memory_id,)).fetchone()
+        if row is None:
+            return
+        db.execute("delete from memory_fts where rowid = ?", row)
+        db.execute("delete from memories where rowid = ?", row)
+
+    def add(self, memory: dict) -> None:
+        """Index (or re-index) one memory row.
+
+        Local adds do not move the sync watermark, so rows written by other
+        workers around the same time are still pulled by the next sync().
+        """
+        with self._lock:
+            self._add(memory)
+            self._conn().commit()
+
+    def remove(self, memory_id: str) -> None:
+        """Drop a memory from the index (archived, merged, deleted)."""
+        with self._lock:
+            self._remove(memory_id)
+            self._conn().commit()
+
+    def load(self) -> None:
+        """Read the persisted sync watermark."""
+        with self._lock:
+            self._loaded = True
+            row = self._conn().execute("select value from meta where key = 'updated_watermark'").fetchone()
+            if row and row[0]:
+                self.watermark = row[0]
+
+    def save(self) -> None:
+        """Persist the sync watermark and commit pending changes."""
+        with self._lock:
+            db = self._conn()
+            db.execute(
+                "insert or replace into meta (key, value) values ('updated_watermark', ?)", (self.watermark,)
+            )
+            db.commit()
+
+    def sync(self, force: bool = False) -> int:
+        """Pull memories updated since the watermark. Returns rows applied.
+
+        Active rows are (re-)indexed and archived or merged ones removed.
+        Each sync re-reads the last SYNC_OVERLAP_SECONDS before the
+        watermark, because updated_at is set when a transaction starts and
+        a slow one can commit after later updates were already pulled.
+        The first sync pulls only active rows.
+
+        Runs at most once per SYNC_INTERVAL unless forced (hourly while a
+        realtime subscription keeps the index current); failures leave the
+        index as it was and are retried on the next interval.
+        """
+        if not self._loaded:
+            self.load()
+        if not supabase:
+            return 0
+        interval = REALTIME_SYNC_INTERVAL if realtime.active() else SYNC_INTERVAL
+        if not force and self._synced_at is not None and time.monotonic() - self._synced_at < interval:
+            return 0
+        self._synced_at = time.monotonic()
+
+        applied = 0
+        since = _rewind(self.watermark, SYNC_OVERLAP_SECONDS) if self.watermark else None
+        cursor = None  # (updated_at, id) of the last row pulled; pages on both, as batches share one now()
+        try:
+            while True:
+                query = supabase.table("agent_memory").select("*")
+                if not since:
+                    query = query.eq("status", "active")
+                if cursor:
+                    query = query.or_(
+                        f'updated_at.gt."{cursor[0]}",and(updated_at.eq."{cursor[0]}",id.gt.{cursor[1]})'
+                    )
+                elif since:
+                    query = query.gt("updated_at", since)
+                rows = query.order("updated_at").order("id").limit(SYNC_PAGE_SIZE).execute().data or []
+                with self._lock:
+                    for row in rows:
+                        if row.get("status", "active") == "active":
+                            self._add(row)
+                        elif row.get("id"):
+                            self._remove(row["id"])
+                        if row.get("updated_at"):
+                            self.watermark = max(self.watermark or "", row["updated_at"])
+                    self.save()
+                applied += len(rows)
+                if len(rows) < SYNC_PAGE_SIZE:
+                    break
+                cursor = (rows[-1]["updated_at"], rows[-1]["id"])
+        except Exception:
+            pass
+        return applied
+
+    # -- retrieval ----------------------------------------------------------
+
+    def search(self, agent_id: str, query: str, limit: int = 5) -> list[dict]:
+        """Top memories for an agent by BM25 relevance plus confidence prior.
+
+        Relevance comes from FTS5's bm25() over content and tags, ranked
+        and limited in SQLite. When fewer than limit memories match (or the
+        query has no terms), the rest are filled by (decayed) confidence,
+        so a vague query returns the agent's strongest recent memories.
+        """
+        with self._lock:
+            db = self._conn()
+            found: list[str] = []
+            match = _match_query(query)
+            if match:
+                # bm25() is negated: lower is more relevant
+                found = [data for (data,) in db.execute(
+                    "select m.data from memory_fts "
+                    "join memories m on m.rowid = memory_fts.rowid "
+                    "where memory_fts match ? and m.agent_id = ? "
+                    f"order by -bm25(memory_fts, 1.0, ?) + ? * {_DECAYED_SQL} desc, "
+                    f"{_DECAYED_SQL} desc, {_CREATED_SQL} desc limit ?",
+                    (match, agent_id, TAG_BOOST, CONFIDENCE_PRIOR, limit),
+                )]
+            memories = [json.loads(data) for data in found]
+            if len(memories) < limit:
+                seen = [m["id"] for m in memories]
+                rows = db.execute(
+                    "select m.data from memories m "
+                    f"where m.agent_id = ? and m.id not in ({', '.join('?' * len(seen))}) "
+                    f"order by {_DECAYED_SQL} desc, {_CREATED_SQL} desc limit ?",
+                    (agent_id, *seen, limit - len(memories)),
+                ).fetchall()
+                memories += [json.loads(data) for (data,) in rows]
+        return memories
+
+    def find_near_duplicate(self, agent_id: str, fingerprint: int, max_bits: int) -> dict | None:
+        """Closest indexed memory of the agent within max_bits, or None."""
+        with self._lock:
+            memories = self._memories(agent_id)
+        best, best_bits = None, max_bits + 1
+        for memory in memories:
+            bits = hamming(fingerprint, memory["fingerprint"])
+            if bits < best_bits:
+                best, best_bits = memory, bits
+        return best
+
+    def near_duplicate_clusters(self, agent_id: str, max_bits: int) -> list[list[dict]]:
+        """Groups of two or more of the agent's memories linked by near-duplicate fingerprints."""
+        with self._lock:
+            memories = self._memories(agent_id)
+        parent = list(range(len(memories)))
+
+        def find(i: int) -> int:
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        for i in range(len(memories)):
+            for j in range(i + 1, len(memories)):
+                if hamming(memories[i]["fingerprint"], memories[j]["fingerprint"]) <= max_bits:
+                    parent[find(j)] = find(i)
+
+        groups: dict[int, list[dict]] = {}
+        for i, memory in enumerate(memories):
+            groups.setdefault(find(i), []).append(memory)
+        return [group for group in groups.values() if len(group) > 1]
+
+    def agents(self) -> list[str]:
+        with self._lock:
+            rows = self._conn().execute("select distinct agent_id from memories").fetchall()
+        return [agent_id for (agent_id,) in rows]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn().execute("select count(*) from memories").fetchone()[0]
+
+
+_index = MemoryIndex()
+
+
+def get_index() -> MemoryIndex:
+    """The process-wide memory index."""
+    return _index
@@ -0,0 +1,318 @@
+"""Shogunate Engine metrics.
+
+In-process counters, gauges and histograms rendered in the Prometheus
+text exposition format and served from a localhost /metrics endpoint.
+Recording is always on and cheap; the HTTP server only runs when the
+poller is started with METRICS_PORT set.
+"""
+
+import os
+import threading
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer
+
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))  # 0 = disabled
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STEP_BUCKETS = (1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1200.0, 1800.0, 3600.0)
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    parts = []
+    for key, value in labels.items():
+        escaped = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{key}="{escaped}"')
+    return "{" + ",".join(parts) + "}"
+
+
+class _Metric:
+    """Base class: a named metric family with a fixed set of label names."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: dict[tuple, object] = {}
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key: tuple) -> dict:
+        return dict(zip(self.labelnames, key))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+    def samples(self) -> list[tuple[str, dict, float]]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        for name, labels, value in self.samples():
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> list[tuple[str, dict, float]]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [(self.name, self._labels(key), value) for key, value in items]
+
+
+class Gauge(_Metric):
+    """Point-in-time value that can go up and down."""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> list[tuple[str, dict, float]]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [(self.name, self._labels(key), value) for key, value in items]
+
+
+class Histogram(_Metric):
+    """Cumulative bucketed distribution with sum and count."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+                self._values[key] = series
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["counts"][i] += 1
+                    break
+            series["sum"] += value
+            series["count"] += 1
+
+    def count(self, **labels) -> int:
+        series = self._values.get(self._key(labels))
+        return series["count"] if series else 0
+
+    def samples(self) -> list[tuple[str, dict, float]]:
+        with self._lock:
+            items = sorted(
+                (key, {"counts": list(s["counts"]), "sum": s["sum"], "count": s["count"]})
+                for key, s in self._values.items()
+            )
+        out = []
+        for key, series in items:
+            labels = self._labels(key)
+            cumulative = 0
+            for bound, count in zip(self.buckets, series["counts"]):
+                cumulative += count
+                out.append((f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, cumulative))
+            out.append((f"{self.name}_sum", labels, series["sum"]))
+            out.append((f"{self.name}_count", labels, series["count"]))
+        return out
+
+
+class Registry:
+    """Collection of metric families rendered together."""
+
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(m.render() for m in self._metrics.values()) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def counter(name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Counter:
+    return REGISTRY.register(Counter(name, documentation, labelnames))
+
+
+def gauge(name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Gauge:
+    return REGISTRY.register(Gauge(name, documentation, labelnames))
+
+
+def histogram(
+    name: str,
+    documentation: str,
+    labelnames: tuple[str, ...] = (),
+    buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+) -> Histogram:
+    return REGISTRY.register(Histogram(name, documentation, labelnames, buckets))
+
+
+# ---------------------------------------------------------------------------
+# Engine metrics
+# ---------------------------------------------------------------------------
+
+POLL_CYCLE_SECONDS = histogram(
+    "warroom_poll_cycle_seconds",
+    "Wall time of one poller cycle.",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, 1800.0),
+)
+QUEUE_DEPTH = gauge(
+    "warroom_queue_depth",
+    "Steps per daimyo and status, sampled once per poller cycle.",
+    ("daimyo", "status"),
+)
+STEP_DURATION_SECONDS = histogram(
+    "warroom_step_duration_seconds",
+    "Wall time of a claude -p step run.",
+    ("model",),
+    buckets=STEP_BUCKETS,
+)
+STEP_QUEUE_WAIT_SECONDS = histogram(
+    "warroom_step_queue_wait_seconds",
+    "Time a step spent queued before it started running.",
+    ("model",),
+    buckets=STEP_BUCKETS,
+)
+SUPABASE_REQUESTS_TOTAL = counter(
+    "warroom_supabase_requests_total",
+    "Supabase round trips by table and operation.",
+    ("table", "operation"),
+)
+SUPABASE_REQUEST_SECONDS = histogram(
+    "warroom_supabase_request_seconds",
+    "Supabase round-trip latency by table and operation.",
+    ("table", "operation"),
+)
+CLAUDE_SPAWN_FAILURES_TOTAL = counter(
+    "warroom_claude_spawn_failures_total",
+    "claude -p runs that did not exit cleanly, by model and reason.",
+    ("model", "reason"),
+)
+MEMORY_EXTRACTION_LAG_SECONDS = histogram(
+    "warroom_memory_extraction_lag_seconds",
+    "Time from step completion until its memories are stored.",
+    buckets=(1.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0),
+)
+
+EVENTS_DROPPED_TOTAL = counter(
+    "warroom_events_dropped_total",
+    "Events dropped because the event buffer stayed full.",
+    ("event_type",),
+)
+EVENTS_DEAD_LETTERED_TOTAL = counter(
+    "warroom_events_dead_lettered_total",
+    "Journaled events given up on because Supabase kept rejecting them.",
+    ("event_type",),
+)
+
+
+def observe_supabase_call(table: str, operation: str, seconds: float) -> None:
+    """Record one Supabase round trip."""
+    SUPABASE_REQUESTS_TOTAL.inc(table=table, operation=operation)
+    SUPABASE_REQUEST_SECONDS.observe(seconds, table=table, operation=operation)
+
+
+# ---------------------------------------------------------------------------
+# HTTP endpoint
+# ---------------------------------------------------------------------------
+
+# http.server is imported only when the endpoint starts; most processes
+# (CLI commands, hooks) import metrics but never serve it.
+_server: "ThreadingHTTPServer | None" = None
+
+
+def _handler_class():
+    from http.server import BaseHTTPRequestHandler
+
+    class _MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = REGISTRY.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # Scrapes every few seconds would drown the poller log
+
+    return _MetricsHandler
+
+
+def start_server(port: int = METRICS_PORT, host: str = METRICS_HOST) -> "ThreadingHTTPServer":
+    """Serve /metrics on a daemon thread. Returns the running server."""
+    from http.server import ThreadingHTTPServer
+
+    global _server
+    if _server is None:
+        _server = ThreadingHTTPServer((host, port), _handler_class())
+        threading.Thread(target=_server.serve_forever, name="metrics", daemon=True).start()
+    return _server
+
+
+def stop_server() -> None:
+    """Shut down the /metrics server if running."""
+    global _server
+    if _server is not None:
+        _server.shutdown()
+        _server.server_close()
+        _server = None
+
+
+def enabled() -> bool:
+    """True while the /metrics server is running."""
+    return _server is not None
@@ -1,14 +1,94 @@
 """Shogunate Engine mission runner."""
 
+import os
+import time
 from datetime import datetime, timezone
 from engine.config import supabase, DAIMYO_REGISTRY, WORKER_MODEL
 from engine.events import emit
-from engine.relationships import get_best_collaborator
+from engine.planner import plan
+from engine.relationships import get_affinity
+from engine.team import select_team
 
 
 # Build reverse mapping from domain to daimyo ID
 DOMAIN_TO_DAIMYO = {v["domain"]: k for k, v in DAIMYO_REGISTRY.items()}
 
+# Assignment scoring: domain fit + affinity to the primary - live load.
+# With these weights a domain specialist keeps its work until it has ~5
+# more steps queued than an idle collaborator.
+DOMAIN_WEIGHT = float(os.getenv("ASSIGN_DOMAIN_WEIGHT", "1.0"))
+AFFINITY_WEIGHT = float(os.getenv("ASSIGN_AFFINITY_WEIGHT", "0.5"))
+LOAD_WEIGHT = float(os.getenv("ASSIGN_LOAD_WEIGHT", "0.25"))
+LOAD_CACHE_TTL = int(os.getenv("LOAD_CACHE_TTL", "10"))  # seconds, one poll cycle
+MAX_TEAM_SIZE = int(os.getenv("MAX_TEAM_SIZE", "3"))
+
+_load_cache: dict = {"loaded_at": 0.0, "depths": {}}
+
+
+def get_queue_depths(refresh: bool = False) -> dict[str, int]:
+    """Return queued + running step counts per daimyo.
+
+    One query per LOAD_CACHE_TTL; create_mission() bumps the cached counts
+    locally as it assigns, so a burst of missions spreads without re-querying.
+    """
+    if not supabase:
+        return {}
+
+    if not refresh and time.monotonic() - _load_cache["loaded_at"] < LOAD_CACHE_TTL:
+        return _load_cache["depths"]
+
+    result = (
+        supabase.table("steps")
+        .select("daimyo")
+        .in_("status", ["queued", "running"])
+        .execute()
+    )
+
+    depths: dict[str, int] = {}
+    for step in result.data or []:
+        daimyo = step.get("daimyo")
+        if daimyo:
+            depths[daimyo] = depths.get(daimyo, 0) + 1
+
+    _load_cache["depths"] = depths
+    _load_cache["loaded_at"] = time.monotonic()
+    return depths
+
+
+def choose_daimyo(
+    domain: str,
+    primary: str,
+    loads: dict[str, int],
+    candidates: list[str] | None = None,
+) -> str:
+    """Pick the daimyo for a step by domain fit, affinity to the primary and load.
+
+    Args:
+        domain: The step's domain
+        primary: The mission's primary daimyo
+        loads: Queued + running steps per daimyo
+        candidates: Restrict the choice to these daimyo (e.g. the mission team)
+
+    Returns:
+        The highest-scoring daimyo ID (registry order breaks ties)
+    """
+    best_agent = primary
+    best_score = float("-inf")
+
+    for daimyo_id, info in DAIMYO_REGISTRY.items():
+        if candidates is not None and daimyo_id not in candidates:
+            continue
+        score = (
+            DOMAIN_WEIGHT * (1.0 if info.get("domain") == domain else 0.0)
+            + AFFINITY_WEIGHT * get_affinity(primary, daimyo_id)
+            - LOAD_WEIGHT * loads.get(daimyo_id, 0)
+        )
+        if score > best_score:
+            best_score = score
+            best_agent = daimyo_id
+
+    return best_agent
+
 
 def create_mission(
     proposal_id: str,
@@ -18,7 +98,15 @@ def create_mission(
     steps: list[dict],
     project_id: str | None = None,
 ) -> dict:
-    """Create a mission with steps, using affinity-aware assignment.
+    """Create a mission with steps, using load-aware assignment.
+
+    Each step goes to the daimyo with the best mix of domain fit, affinity
+    to the primary assignee and live queue depth (see choose_daimyo).
+    Missions spanning several domains first pick a team (see
+    engine.team.select_team) and keep every step within it.
+
+    The mission and its steps are written by the create_mission_with_steps
+    RPC in a single transaction, so a crash never leaves half a mission.
 
     Args:
         proposal_id: UUID of the proposal
@@ -29,12 +117,11 @@ def create_mission(
         project_id: Optional project UUID
 
     Returns:
-        The created mission dict
+        The created mission dict, with its created steps under "steps"
     """
     if not supabase:
         raise RuntimeError("Supabase client not initialized")
 
-    # 1. Insert mission
     mission_data = {
         "proposal_id": proposal_id,
         "project_id": project_id,
@@ -43,26 +130,26 @@ def create_mission(
         "status": "queued",
     }
 
-    result = supabase.table("missions").insert(mission_data).execute()
-    mission = result.data[0]
-    mission_id = mission["id"]
+    # 1. Build step rows with load-aware assignment
+    loads = get_queue_depths()
+    domains = list(dict.fromkeys(step.get("domain", "engineering") for step in steps))
+    team = None
+    if len(domains) > 1:
+        team = select_team(
+            assigned_to,
+            domains,
+            k=min(MAX_TEAM_SIZE, len(steps)),
+            loads=loads,
+            registry=DAIMYO_REGISTRY,
+        )
 
-    # 2. Insert steps with affinity-aware assignment
-    created_steps = []
+    step_rows = []
     for step in steps:
-        # Assign daimyo based on domain
         domain = step.get("domain", "engineering")
-        direct_daimyo = DOMAIN_TO_DAIMYO.get(domain)
-
-        if direct_daimyo:
-            daimyo_id = direct_daimyo
-        else:
-            # No direct domain match — use affinity to pick best collaborator
-            candidates = list(DAIMYO_REGISTRY.keys())
-            daimyo_id = get_best_collaborator(assigned_to, candidates)
+        daimyo_id = choose_daimyo(domain, assigned_to, loads, candidates=team)
+        loads[daimyo_id] = loads.get(daimyo_id, 0) + 1
 
-        step_data = {
-            "mission_id": mission_id,
+        step_rows.append({
             "title": step["title"],
             "description": step.get("description"),
             "kind": step.get("kind", "code"),
@@ -70,10 +157,17 @@ def create_mission(
             "model": WORKER_MODEL,
             "status": "queued",
             "timeout_minutes": step.get("timeout_minutes", 30),
-        }
-
-        step_result = supabase.table("steps").insert(step_data).execute()
-        created_steps.append(step_result.data[0])
+        })
+
+    # 2. Insert mission and all steps in one transaction (one round trip)
+    result = supabase.rpc(
+        "create_mission_with_steps",
+        {"mission": mission_data, "steps": step_rows},
+    ).execute()
+    mission = result.data[0] if isinstance(result.data, list) else result.data
+    mission_id = mission["id"]
+    created_steps = mission.get("steps") or []
+    mission["steps"] = created_steps
 
     # 3. Emit mission_started event
     emit(
@@ -87,8 +181,6 @@ def create_mission(
         },
     )
 
-    # Return mission with steps
-    mission["steps"] = created_steps
     return mission
 
 
@@ -101,42 +193,25 @@ def run_pending() -> list[dict]:
     if not supabase:
         return []
 
-    # 1. Query approved proposals
-    proposals_result = supabase.table("proposals").select("*").eq("status", "approved").execute()
+    # 1. Query approved proposals that have no mission yet. proposals.mission_id
+    # is set by a trigger on mission insert, so this is a single indexed anti-join.
+    proposals_result = (
+        supabase.table("proposals")
+        .select("*")
+        .eq("status", "approved")
+        .is_("mission_id", "null")
+        .order("created_at")
+        .execute()
+    )
 
-    if not proposals_result.data:
+    pending_proposals = proposals_result.data or []
+    if not pending_proposals:
         return []
 
-    # Get existing mission proposal IDs to avoid duplicates
-    missions_result = supabase.table("missions").select("proposal_id").execute()
-    existing_proposal_ids = {m["proposal_id"] for m in missions_result.data if m.get("proposal_id")}
-
-    pending_proposals = [p for p in proposals_result.data if p["id"] not in existing_proposal_ids]
-
     created_missions = []
 
     for proposal in pending_proposals:
-        # K2.5 heuristic: research -> code -> review
-        steps = [
-            {
-                "title": f"Research: {proposal['title']}",
-                "description": f"Research and plan implementation for: {proposal.get('description', '')}",
-                "kind": "research",
-                "domain": proposal.get("domain", "engineering"),
-            },
-            {
-                "title": f"Implement: {proposal['title']}",
-                "description": f"Code implementation for: {proposal.get('description', '')}",
-                "kind": "code",
-                "domain": proposal.get("domain", "engineering"),
-            },
-            {
-                "title": f"Review: {proposal['title']}",
-                "description": f"Review and validate implementation of: {proposal.get('description', '')}",
-                "kind": "review",
-                "domain": proposal.get("domain", "engineering"),
-            },
-        ]
+        steps = plan(proposal)
 
         domain = proposal.get("domain", "engineering")
         assigned_to = DOMAIN_TO_DAIMYO.get(domain, "ed")
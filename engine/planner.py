@@ -0,0 +1,257 @@
+"""Shogunate Engine mission planners.
+
+Decomposes an approved proposal into mission steps. Planners are
+registered by name and routed by proposal domain and/or source:
+
+- "heuristic": the K2.5 research -> implement -> review triple
+- "llm": asks CHEAP_MODEL for a right-sized plan, cached on disk by a
+  normalized proposal fingerprint so recurring proposals (cron, discord)
+  reuse a plan without another LLM call
+
+Any planner error or empty plan falls back to the heuristic.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import subprocess
+import time
+from pathlib import Path
+from typing import Callable
+
+from engine.config import CHEAP_MODEL, DAIMYO_REGISTRY
+
+DEFAULT_PLANNER = os.getenv("DEFAULT_PLANNER", "heuristic")
+PLAN_CACHE_FILE = os.path.expanduser("~/.warroom/plan_cache.json")
+PLAN_CACHE_TTL = int(os.getenv("PLAN_CACHE_TTL", str(7 * 24 * 3600)))  # seconds
+MAX_PLAN_STEPS = 6
+
+STEP_KINDS = ("research", "code", "review", "test", "deploy", "write", "analyze")
+
+log = logging.getLogger(__name__)
+
+Planner = Callable[[dict], list[dict]]
+
+_PLANNERS: dict[str, Planner] = {}
+_ROUTES: dict[tuple[str | None, str | None], str] = {}
+
+
+# ---------------------------------------------------------------------------
+# Registry
+# ---------------------------------------------------------------------------
+
+
+def register_planner(name: str) -> Callable[[Planner], Planner]:
+    """Decorator: register a planner function under ``name``."""
+    def decorator(fn: Planner) -> Planner:
+        _PLANNERS[name] = fn
+        return fn
+    return decorator
+
+
+def route(planner: str, domain: str | None = None, source: str | None = None) -> None:
+    """Send proposals matching ``domain`` and/or ``source`` to ``planner``."""
+    _ROUTES[(domain, source)] = planner
+
+
+def get_planner(proposal: dict) -> str:
+    """Pick a planner name: exact (domain, source), then source, then domain, then default."""
+    domain = proposal.get("domain") or "engineering"
+    source = proposal.get("source")
+    for key in ((domain, source), (None, source), (domain, None)):
+        if key in _ROUTES:
+            return _ROUTES[key]
+    return DEFAULT_PLANNER
+
+
+def plan(proposal: dict) -> list[dict]:
+    """Decompose a proposal into step dicts {title, description, kind, domain}."""
+    name = get_planner(proposal)
+    planner = _PLANNERS.get(name)
+
+    if planner and planner is not heuristic_plan:
+        try:
+            steps = planner(proposal)
+            if steps:
+                return steps
+        except Exception as e:
+            log.warning(f"Planner {name!r} failed for proposal {proposal.get('id')}: {e}")
+
+    return heuristic_plan(proposal)
+
+
+# ---------------------------------------------------------------------------
+# Heuristic planner
+# ---------------------------------------------------------------------------
+
+
+@register_planner("heuristic")
+def heuristic_plan(proposal: dict) -> list[dict]:
+    """K2.5 heuristic: research -> code -> review."""
+    title = proposal["title"]
+    description = proposal.get("description", "")
+    domain = proposal.get("domain", "engineering")
+
+    return [
+        {
+            "title": f"Research: {title}",
+            "description": f"Research and plan implementation for: {description}",
+            "kind": "research",
+            "domain": domain,
+        },
+        {
+            "title": f"Implement: {title}",
+            "description": f"Code implementation for: {description}",
+            "kind": "code",
+            "domain": domain,
+        },
+        {
+            "title": f"Review: {title}",
+            "description": f"Review and validate implementation of: {description}",
+            "kind": "review",
+            "domain": domain,
+        },
+    ]
+
+
+# ---------------------------------------------------------------------------
+# LLM planner with plan cache
+# ---------------------------------------------------------------------------
+
+
+def _normalize(text: str) -> str:
+    """Lowercase, mask numbers (dates, counts, ids) and collapse punctuation."""
+    text = (text or "").lower()
+    text = re.sub(r"\d+", "#", text)
+    text = re.sub(r"[^\w#]+", " ", text)
+    return " ".join(text.split())
+
+
+def proposal_fingerprint(proposal: dict) -> str:
+    """Stable hash of a proposal's shape, insensitive to dates and numbers."""
+    key = "|".join([
+        proposal.get("domain") or "engineering",
+        proposal.get("source") or "",
+        _normalize(proposal.get("title", "")),
+        _normalize(proposal.get("description", "")),
+    ])
+    return hashlib.sha256(key.encode()).hexdigest()[:32]
+
+
+def _load_cache() -> dict:
+    if Path(PLAN_CACHE_FILE).exists():
+        try:
+            return json.loads(Path(PLAN_CACHE_FILE).read_text())
+        except (json.JSONDecodeError, OSError):
+            return {}
+    return {}
+
+
+def _save_cache(cache: dict) -> None:
+    now = time.time()
+    live = {k: v for k, v in cache.items() if now - v.get("cached_at", 0) < PLAN_CACHE_TTL}
+    Path(PLAN_CACHE_FILE).parent.mkdir(parents=True, exist_ok=True)
+    Path(PLAN_CACHE_FILE).write_text(json.dumps(live, indent=2))
+
+
+def get_cached_plan(fingerprint: str) -> list[dict] | None:
+    """Return the cached step templates for a fingerprint, if fresh."""
+    entry = _load_cache().get(fingerprint)
+    if not entry or time.time() - entry.get("cached_at", 0) >= PLAN_CACHE_TTL:
+        return None
+    return entry.get("steps")
+
+
+def cache_plan(fingerprint: str, templates: list[dict]) -> None:
+    """Store step templates for a fingerprint."""
+    cache = _load_cache()
+    cache[fingerprint] = {"cached_at": time.time(), "steps": templates}
+    _save_cache(cache)
+
+
+def _render(templates: list[dict], proposal: dict) -> list[dict]:
+    """Fill {title} / {description} placeholders from the proposal."""
+    title = proposal["title"]
+    description = proposal.get("description") or ""
+    return [
+        {
+            **t,
+            "title": t["title"].replace("{title}", title).replace("{description}", description),
+            "description": t["description"].replace("{title}", title).replace("{description}", description),
+        }
+        for t in templates
+    ]
+
+
+def _validate(raw: list, proposal: dict) -> list[dict]:
+    """Coerce LLM output into step templates; drop anything malformed."""
+    default_domain = proposal.get("domain", "engineering")
+    domains = {info["domain"] for info in DAIMYO_REGISTRY.values()}
+    templates = []
+    for item in raw[:MAX_PLAN_STEPS]:
+        if not isinstance(item, dict) or not item.get("title"):
+            continue
+        kind = item.get("kind") if item.get("kind") in STEP_KINDS else "code"
+        domain = item.get("domain") if item.get("domain") in domains else default_domain
+        templates.append({
+            "title": str(item["title"]),
+            "description": str(item.get("description") or item["title"]),
+            "kind": kind,
+            "domain": domain,
+        })
+    return templates
+
+
+@register_planner("llm")
+def llm_plan(proposal: dict) -> list[dict]:
+    """Ask CHEAP_MODEL for a plan, reusing a cached plan for similar proposals."""
+    fingerprint = proposal_fingerprint(proposal)
+    cached = get_cached_plan(fingerprint)
+    if cached:
+        return _render(cached, proposal)
+
+    domains = ", ".join(sorted({info["domain"] for info in DAIMYO_REGISTRY.values()}))
+    prompt = f"""Break this proposal into 1-{MAX_PLAN_STEPS} execution steps, each a focused unit of work for one agent.
+
+Title: {proposal["title"]}
+Domain: {proposal.get("domain", "engineering")}
+Description:
+{proposal.get("description", "")}
+
+Return a JSON array of objects with these fields:
+- "title": short step title; write {{title}} where you refer to the proposal title
+- "description": what the agent must do; write {{description}} where you refer to the proposal description
+- "kind": one of {", ".join(STEP_KINDS)}
+- "domain": one of {domains}
+
+Return ONLY the JSON array, no other text."""
+
+    result = subprocess.run(
+        ["claude", "-p", "--model", CHEAP_MODEL, prompt],
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+    if result.returncode != 0:
+        return []
+
+    raw = result.stdout.strip()
+    # Handle markdown code blocks
+    if raw.startswith("```"):
+        raw = raw.split("\n", 1)[1].rsplit("```", 1)[0].strip()
+
+    steps = json.loads(raw)
+    if not isinstance(steps, list):
+        return []
+
+    templates = _validate(steps, proposal)
+    if templates:
+        cache_plan(fingerprint, templates)
+    return _render(templates, proposal)
+
+
+# Recurring sources get LLM plans; their fingerprints repeat, so the cache absorbs the cost.
+route("llm", source="cron")
+route("llm", source="discord")
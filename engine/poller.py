@@ -5,7 +5,13 @@ Polls Supabase every 10 seconds for:
 2. Queued steps -> executes next step
 3. Stale running steps -> marks as failed
 
+and runs periodic maintenance jobs (drift rollups, memory consolidation,
+event rollups and retention) on their own intervals, tracked in the
+poller state file.
+
 Usage: python -m engine.poller
+
+Set METRICS_PORT to serve Prometheus metrics on http://127.0.0.1:<port>/metrics.
 """
 
 import time
@@ -15,14 +21,25 @@ import sys
 import logging
 from datetime import datetime, timezone, timedelta
 from pathlib import Path
+from typing import Callable
 
+from engine import metrics, realtime
 from engine.config import supabase, DEFAULT_TIMEOUT_MINUTES
 from engine.mission import run_pending
 from engine.executor import execute_next
-from engine.events import emit
+from engine.events import emit, flush_events, replay_journal
+from engine.event_store import prune_events, rollup_recent_events
+from engine.memory import archive_stale_memories, consolidate_memories, flush_extractions
+from engine.relationships import rollup_drift
 
 # Configuration
 POLL_INTERVAL = int(os.getenv("POLL_INTERVAL", "10"))
+DRIFT_ROLLUP_INTERVAL = int(os.getenv("DRIFT_ROLLUP_INTERVAL", "86400"))  # seconds
+MEMORY_CONSOLIDATION_INTERVAL = int(os.getenv("MEMORY_CONSOLIDATION_INTERVAL", "21600"))  # seconds
+MEMORY_ARCHIVAL_INTERVAL = int(os.getenv("MEMORY_ARCHIVAL_INTERVAL", "86400"))  # seconds
+EVENT_REPLAY_INTERVAL = int(os.getenv("EVENT_REPLAY_INTERVAL", "60"))  # seconds
+EVENT_ROLLUP_INTERVAL = int(os.getenv("EVENT_ROLLUP_INTERVAL", "3600"))  # seconds
+EVENT_PRUNE_INTERVAL = int(os.getenv("EVENT_PRUNE_INTERVAL", "86400"))  # seconds
 STATE_FILE = os.path.expanduser("~/.warroom/poller_state.json")
 
 logging.basicConfig(
@@ -102,9 +119,75 @@ def detect_stale_steps() -> int:
     return stale_count
 
 
+def sample_queue_depth() -> dict[tuple[str, str], int]:
+    """Count queued/running steps per daimyo and publish them as gauges.
+
+    Returns {(daimyo, status): count}.
+    """
+    if not supabase:
+        return {}
+
+    result = (
+        supabase.table("steps")
+        .select("daimyo, status")
+        .in_("status", ["queued", "running"])
+        .execute()
+    )
+
+    depth: dict[tuple[str, str], int] = {}
+    for step in result.data or []:
+        key = (step.get("daimyo") or "unassigned", step["status"])
+        depth[key] = depth.get(key, 0) + 1
+
+    metrics.QUEUE_DEPTH.clear()
+    for (daimyo, status), count in depth.items():
+        metrics.QUEUE_DEPTH.set(count, daimyo=daimyo, status=status)
+
+    return depth
+
+
+def maintenance_jobs() -> list[tuple[str, int, Callable[[], object]]]:
+    """Periodic jobs as (name, interval seconds, callable)."""
+    return [
+        ("drift_rollup", DRIFT_ROLLUP_INTERVAL, rollup_drift),
+        ("memory_consolidation", MEMORY_CONSOLIDATION_INTERVAL, consolidate_memories),
+        ("memory_archival", MEMORY_ARCHIVAL_INTERVAL, archive_stale_memories),
+        ("event_replay", EVENT_REPLAY_INTERVAL, replay_journal),
+        ("event_rollup", EVENT_ROLLUP_INTERVAL, rollup_recent_events),
+        ("event_prune", EVENT_PRUNE_INTERVAL, prune_events),
+    ]
+
+
+def run_maintenance(state: dict, now: float | None = None) -> list[str]:
+    """Run every maintenance job whose interval has elapsed.
+
+    Last-run times are kept in state["maintenance"] so intervals survive
+    restarts. A failing job is logged and retried after its next interval.
+
+    Returns the names of the jobs that ran.
+    """
+    now = time.time() if now is None else now
+    last_runs = state.setdefault("maintenance", {})
+    ran = []
+
+    for name, interval, job in maintenance_jobs():
+        if interval <= 0 or now - last_runs.get(name, 0) < interval:
+            continue
+        try:
+            result = job()
+            log.info(f"Maintenance {name}: {result}")
+        except Exception as e:
+            log.error(f"Maintenance {name} error: {e}")
+        last_runs[name] = now
+        ran.append(name)
+
+    return ran
+
+
 def poll_cycle(state: dict) -> dict:
     """Run one poll cycle. Returns updated state."""
     cycle_start = datetime.now(timezone.utc).isoformat()
+    cycle_timer = time.monotonic()
 
     # 1. Convert approved proposals -> missions
     try:
@@ -136,7 +219,25 @@ def poll_cycle(state: dict) -> dict:
         log.error(f"detect_stale_steps() error: {e}")
         stale_count = 0
 
-    # 4. Emit heartbeat
+    # 4. Extract memories for batched step outputs whose window has elapsed
+    try:
+        stored = flush_extractions()
+        if stored:
+            log.info(f"Stored {len(stored)} memories from batched extraction")
+    except Exception as e:
+        log.error(f"flush_extractions() error: {e}")
+
+    # 5. Sample queue depth (only worth the round trip when someone is scraping)
+    if metrics.enabled():
+        try:
+            sample_queue_depth()
+        except Exception as e:
+            log.error(f"sample_queue_depth() error: {e}")
+
+    # 6. Periodic maintenance
+    run_maintenance(state)
+
+    # 7. Emit heartbeat
     try:
         emit("heartbeat", {
             "agent": "poller",
@@ -148,11 +249,13 @@ def poll_cycle(state: dict) -> dict:
     except Exception as e:
         log.error(f"heartbeat emit error: {e}")
 
-    # 5. Update state
+    # 8. Update state
     state["last_run"] = cycle_start
     state["steps_processed"] = state.get("steps_processed", 0) + (1 if step_result else 0)
     state["consecutive_errors"] = 0  # Reset on successful cycle
 
+    metrics.POLL_CYCLE_SECONDS.observe(time.monotonic() - cycle_timer)
+
     return state
 
 
@@ -165,6 +268,12 @@ def main():
     log.info("Shogunate Poller started")
     log.info(f"  Interval: {POLL_INTERVAL}s")
     log.info(f"  State: {STATE_FILE}")
+    if metrics.METRICS_PORT:
+        server = metrics.start_server()
+        host, port = server.server_address[:2]
+        log.info(f"  Metrics: http://{host}:{port}/metrics")
+    if realtime.start():
+        log.info("  Realtime: cache invalidation subscribed")
     log.info("  Press Ctrl+C to stop\n")
 
     state = load_state()
@@ -190,6 +299,17 @@ def main():
     except KeyboardInterrupt:
         log.info("\nPoller stopped by user")
         save_state(state)
+    finally:
+        # Each step runs even if an earlier one fails (e.g. Supabase down at shutdown)
+        for name, step in (
+            ("memory extraction flush", lambda: flush_extractions(force=True)),
+            ("event flush", flush_events),
+            ("metrics server stop", metrics.stop_server),
+        ):
+            try:
+                step()
+            except Exception as e:
+                log.error(f"Shutdown {name} error: {e}")
 
 
 if __name__ == "__main__":
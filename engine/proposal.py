@@ -1,11 +1,14 @@
 """Shogunate Engine proposal service.
 
 CRUD operations for proposals in Supabase.
+
+proposal_created/approved/rejected events are written by the database's
+proposal_event_trigger, so proposals changed by the CLI or the dashboard
+get the same events as those changed here.
 """
 
 from datetime import datetime, timezone
 from engine.config import supabase
-from engine.events import emit
 
 
 def create_proposal(
@@ -48,14 +51,6 @@ def create_proposal(
     result = supabase.table("proposals").insert(proposal_data).execute()
     proposal = result.data[0]
 
-    emit("proposal_created", {
-        "proposal_id": proposal["id"],
-        "title": title,
-        "domain": domain,
-        "requested_by": requested_by,
-        "agent": "system",
-    })
-
     return proposal
 
 
@@ -107,12 +102,6 @@ def approve(proposal_id: str, approved_by: str = "Sensei") -> dict:
 
     proposal = result.data[0] if result.data else {"id": proposal_id}
 
-    emit("proposal_approved", {
-        "proposal_id": proposal_id,
-        "approved_by": approved_by,
-        "agent": "system",
-    })
-
     return proposal
 
 
@@ -135,6 +124,7 @@ def reject(proposal_id: str, reason: str = "") -> dict:
         supabase.table("proposals")
         .update({
             "status": "rejected",
+            "rejection_reason": reason,
             "updated_at": now,
         })
         .eq("id", proposal_id)
@@ -143,10 +133,4 @@ def reject(proposal_id: str, reason: str = "") -> dict:
 
     proposal = result.data[0] if result.data else {"id": proposal_id}
 
-    emit("proposal_rejected", {
-        "proposal_id": proposal_id,
-        "reason": reason,
-        "agent": "system",
-    })
-
     return proposal
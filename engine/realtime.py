@@ -0,0 +1,111 @@
+"""Shogunate Engine realtime cache invalidation.
+
+Engine modules keep small in-process caches (the affinity matrix, the
+memory index and the retrieval cache) and register a handler per table
+here with on_change(). start() subscribes to Supabase realtime
+postgres_changes for those tables on a background thread, so writes by
+other workers reach local caches.
+
+active() is true only while that thread runs and the channel has
+reported SUBSCRIBED; callers use it to stretch their refresh intervals.
+Caches also expire on a TTL, so a missing or dropped subscription only
+costs freshness. Every table with a handler must be in the
+supabase_realtime publication (see tests/unit/test_realtime.py).
+"""
+
+import logging
+import os
+import threading
+from typing import Callable
+
+log = logging.getLogger(__name__)
+
+Handler = Callable[[str, dict | None, dict | None], None]
+
+_handlers: dict[str, list[Handler]] = {}
+_thread: threading.Thread | None = None
+_subscribed = threading.Event()  # set only while the channel reports SUBSCRIBED
+
+
+def on_change(table: str, handler: Handler) -> None:
+    """Register ``handler(event_type, new_record, old_record)`` for a table."""
+    _handlers.setdefault(table, []).append(handler)
+
+
+def dispatch(table: str, payload: dict) -> None:
+    """Deliver one realtime payload to the table's handlers.
+
+    Accepts both the realtime-py shape ({"data": {"type", "record",
+    "old_record"}}) and the JS client shape ({"eventType", "new", "old"}).
+    """
+    data = payload.get("data", payload)
+    event_type = (data.get("type") or data.get("eventType") or "").upper()
+    new = data.get("record") or data.get("new") or None
+    old = data.get("old_record") or data.get("old") or None
+
+    for handler in _handlers.get(table, []):
+        try:
+            handler(event_type, new, old)
+        except Exception as e:
+            log.warning(f"realtime handler for {table} failed: {e}")
+
+
+async def _listen(url: str, key: str) -> None:
+    import asyncio
+    from supabase import acreate_client
+
+    client = await acreate_client(url, key)
+    channel = client.channel("engine-caches")
+    for table in _handlers:
+        channel.on_postgres_changes(
+            "*",
+            schema="public",
+            table=table,
+            callback=lambda payload, table=table: dispatch(table, payload),
+        )
+    await channel.subscribe(on_status)
+    await asyncio.Event().wait()
+
+
+def on_status(status, error=None) -> None:
+    """Track the channel's subscribe status (realtime-py subscribe callback)."""
+    state = str(getattr(status, "value", status)).upper()
+    if state == "SUBSCRIBED":
+        _subscribed.set()
+    else:
+        _subscribed.clear()
+        log.warning(f"realtime channel {state.lower()}, caches fall back to TTL: {error or ''}")
+
+
+def _run(url: str, key: str) -> None:
+    import asyncio  # only the poller subscribes; CLI imports skip the event loop machinery
+
+    try:
+        asyncio.run(_listen(url, key))
+    except Exception as e:
+        log.warning(f"realtime subscription stopped, caches fall back to TTL: {e}")
+    finally:
+        _subscribed.clear()
+
+
+def start() -> bool:
+    """Subscribe to changes for all registered tables. Returns True if started."""
+    global _thread
+    url = os.getenv("SUPABASE_URL", "")
+    key = os.getenv("SUPABASE_KEY", "")
+    if _thread is not None or not (url and key and _handlers):
+        return _thread is not None
+
+    _thread = threading.Thread(target=_run, args=(url, key), name="realtime", daemon=True)
+    _thread.start()
+    return True
+
+
+def active() -> bool:
+    """True once the channel has confirmed SUBSCRIBED, and while it stays so.
+
+    A running listener thread alone is not enough: until the server
+    confirms the subscription (or after it errors or closes), changes may
+    not be delivered, so callers keep their normal refresh intervals.
+    """
+    return _thread is not None and _thread.is_alive() and _subscribed.is_set()
@@ -1,12 +1,112 @@
 """Shogunate Engine relationship and affinity system.
 
-Queries agent_relationships table for affinity scores between Daimyo agents.
-Used for collaborative step assignment and post-mission drift.
+Keeps the (tiny) agent_relationships table in an in-process affinity
+matrix, refreshed on a TTL or by realtime change notifications and
+updated locally by apply_drift, so affinity lookups and collaborator
+selection never hit the network.
+
+Relationships are stored once per unordered pair, canonically as
+(least, greatest); canonical_pair() gives that key. Drift is appended to
+the relationship_drift log (the row keeps only its last few entries) and
+old log entries are rolled up into daily summaries by rollup_drift().
 """
 
+import os
+import threading
+import time
 from datetime import datetime, timezone
+from engine import realtime
 from engine.config import supabase
 
+DEFAULT_AFFINITY = 0.5
+AFFINITY_CACHE_TTL = int(os.getenv("AFFINITY_CACHE_TTL", "300"))  # seconds
+DRIFT_RETAIN_DAYS = int(os.getenv("DRIFT_RETAIN_DAYS", "30"))
+
+
+def canonical_pair(agent_a: str, agent_b: str) -> tuple[str, str]:
+    """Storage order for a relationship: (least, greatest)."""
+    return (agent_a, agent_b) if agent_a <= agent_b else (agent_b, agent_a)
+
+
+class AffinityMatrix:
+    """In-process copy of agent_relationships keyed by unordered agent pair."""
+
+    def __init__(self, ttl: float = AFFINITY_CACHE_TTL):
+        self.ttl = ttl
+        self._affinity: dict[tuple[str, str], float] = {}
+        self._loaded_at: float | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def stale(self) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at >= self.ttl
+
+    def refresh(self) -> None:
+        """Reload every relationship in one query."""
+        result = (
+            supabase.table("agent_relationships")
+            .select("agent_a, agent_b, affinity")
+            .execute()
+        )
+        affinity = {
+            canonical_pair(r["agent_a"], r["agent_b"]): float(r["affinity"])
+            for r in result.data or []
+        }
+        with self._lock:
+            self._affinity = affinity
+            self._loaded_at = time.monotonic()
+
+    def get(self, agent_a: str, agent_b: str, default: float = DEFAULT_AFFINITY) -> float:
+        if self.stale:
+            try:
+                self.refresh()
+            except Exception:
+                # Serve what we have; retry on the next lookup after a short pause
+                self._loaded_at = time.monotonic() - self.ttl + min(self.ttl, 10)
+        return self._affinity.get(canonical_pair(agent_a, agent_b), default)
+
+    def dense(self, agents: list[str], default: float = DEFAULT_AFFINITY) -> list[list[float]]:
+        """Pairwise affinity rows for agents, in order, with a zero diagonal."""
+        if agents:
+            self.get(agents[0], agents[0])  # refresh once if stale
+        affinity = self._affinity
+        return [
+            [0.0 if a == b else affinity.get(canonical_pair(a, b), default) for b in agents]
+            for a in agents
+        ]
+
+    def set(self, agent_a: str, agent_b: str, affinity: float) -> None:
+        with self._lock:
+            self._affinity[canonical_pair(agent_a, agent_b)] = float(affinity)
+
+    def discard(self, agent_a: str, agent_b: str) -> None:
+        with self._lock:
+            self._affinity.pop(canonical_pair(agent_a, agent_b), None)
+
+    def invalidate(self) -> None:
+        self._loaded_at = None
+
+
+_matrix = AffinityMatrix()
+
+
+def invalidate_affinity() -> None:
+    """Force the next affinity lookup to reload from Supabase."""
+    _matrix.invalidate()
+
+
+def handle_relationship_change(event_type: str, new: dict | None, old: dict | None) -> None:
+    """Apply a realtime agent_relationships change to the local matrix."""
+    if event_type == "DELETE" and old and "agent_a" in old:
+        _matrix.discard(old["agent_a"], old["agent_b"])
+    elif new and "affinity" in new:
+        _matrix.set(new["agent_a"], new["agent_b"], new["affinity"])
+    else:
+        _matrix.invalidate()
+
+
+realtime.on_change("agent_relationships", handle_relationship_change)
+
 
 def get_affinity(agent_a: str, agent_b: str) -> float:
     """Get affinity score between two agents.
@@ -18,40 +118,57 @@ def get_affinity(agent_a: str, agent_b: str) -> float:
     Returns:
         Affinity score (0.0-1.0), defaults to 0.5 if no relationship found
     """
-    if not supabase or agent_a == agent_b:
-        return 1.0 if agent_a == agent_b else 0.5
+    if agent_a == agent_b:
+        return 1.0
+    if not supabase:
+        return DEFAULT_AFFINITY
 
-    try:
-        # Check both directions
-        result = (
-            supabase.table("agent_relationships")
-            .select("affinity")
-            .eq("agent_a", agent_a)
-            .eq("agent_b", agent_b)
-            .limit(1)
-            .execute()
-        )
+    return _matrix.get(agent_a, agent_b)
 
-        if result.data:
-            return result.data[0]["affinity"]
 
-        # Try reverse direction
-        result = (
-            supabase.table("agent_relationships")
-            .select("affinity")
-            .eq("agent_a", agent_b)
-            .eq("agent_b", agent_a)
-            .limit(1)
-            .execute()
-        )
+def affinity_matrix(agents: list[str]) -> list[list[float]]:
+    """Dense affinity matrix for agents (row/column order = agents, diagonal 0)."""
+    if not supabase:
+        return [[0.0 if a == b else DEFAULT_AFFINITY for b in agents] for a in agents]
 
-        if result.data:
-            return result.data[0]["affinity"]
+    return _matrix.dense(agents)
 
-    except Exception:
-        pass
 
-    return 0.5  # Default affinity
+def upsert_relationship(agent_a: str, agent_b: str, affinity: float) -> dict:
+    """Create or overwrite the relationship for an unordered pair.
+
+    Args:
+        agent_a: First agent ID
+        agent_b: Second agent ID (order does not matter)
+        affinity: New affinity, clamped to 0.10-0.95
+
+    Returns:
+        The stored relationship dict
+    """
+    if not supabase:
+        raise RuntimeError("Supabase client not initialized")
+    if agent_a == agent_b:
+        raise ValueError("A relationship needs two distinct agents")
+
+    a, b = canonical_pair(agent_a, agent_b)
+    affinity = max(0.10, min(0.95, affinity))
+
+    result = (
+        supabase.table("agent_relationships")
+        .upsert(
+            {
+                "agent_a": a,
+                "agent_b": b,
+                "affinity": affinity,
+                "updated_at": datetime.now(timezone.utc).isoformat(),
+            },
+            on_conflict="agent_a,agent_b",
+        )
+        .execute()
+    )
+
+    _matrix.set(a, b, affinity)
+    return result.data[0] if result.data else {"agent_a": a, "agent_b": b, "affinity": affinity}
 
 
 def get_best_collaborator(primary_agent: str, candidates: list[str]) -> str:
@@ -85,6 +202,10 @@ def apply_drift(agent_pairs: list[tuple[str, str]], success: bool) -> list[dict]
     On success: +0.03 (capped at 0.95)
     On failure: -0.02 (floored at 0.10)
 
+    All pairs are clamped and updated atomically by the apply_drift database
+    function in one round trip, so concurrent missions never lose an update.
+    Each change is appended to the relationship_drift log.
+
     Args:
         agent_pairs: List of (agent_a, agent_b) tuples who collaborated
         success: Whether the mission succeeded
@@ -95,73 +216,55 @@ def apply_drift(agent_pairs: list[tuple[str, str]], success: bool) -> list[dict]
     if not supabase:
         return []
 
+    pairs = sorted({canonical_pair(a, b) for a, b in agent_pairs if a != b})
+    if not pairs:
+        return []
+
     delta = 0.03 if success else -0.02
-    now = datetime.now(timezone.utc).isoformat()
-    updated = []
-
-    for agent_a, agent_b in agent_pairs:
-        if agent_a == agent_b:
-            continue
-
-        # Normalize order for consistency
-        a, b = sorted([agent_a, agent_b])
-
-        try:
-            # Get current relationship
-            result = (
-                supabase.table("agent_relationships")
-                .select("*")
-                .eq("agent_a", a)
-                .eq("agent_b", b)
-                .limit(1)
-                .execute()
-            )
-
-            if not result.data:
-                # Try reverse
-                result = (
-                    supabase.table("agent_relationships")
-                    .select("*")
-                    .eq("agent_a", b)
-                    .eq("agent_b", a)
-                    .limit(1)
-                    .execute()
-                )
-
-            if not result.data:
-                continue
-
-            rel = result.data[0]
-            old_affinity = rel.get("affinity", 0.5)
-            new_affinity = max(0.10, min(0.95, old_affinity + delta))
-
-            # Build drift history entry
-            drift_entry = {
-                "timestamp": now,
-                "delta": delta,
-                "old": old_affinity,
-                "new": new_affinity,
-                "reason": "mission_success" if success else "mission_failure",
-            }
-
-            drift_history = rel.get("drift_history", []) or []
-            drift_history.append(drift_entry)
-
-            # Update
-            update_result = (
-                supabase.table("agent_relationships")
-                .update({
-                    "affinity": new_affinity,
-                    "drift_history": drift_history,
-                })
-                .eq("id", rel["id"])
-                .execute()
-            )
-
-            if update_result.data:
-                updated.append(update_result.data[0])
-
-        except Exception:
-            continue
+
+    try:
+        result = supabase.rpc("apply_drift", {
+            "pairs": [list(pair) for pair in pairs],
+            "delta": delta,
+            "reason": "mission_success" if success else "mission_failure",
+        }).execute()
+    except Exception:
+        return []
+
+    updated = result.data or []
+    for rel in updated:
+        _matrix.set(rel["agent_a"], rel["agent_b"], rel["affinity"])
 
     return updated
+
+
+def get_drift_log(agent_a: str, agent_b: str, limit: int = 20) -> list[dict]:
+    """Recent drift entries for a pair from the append-only drift log, newest first."""
+    if not supabase:
+        return []
+
+    a, b = canonical_pair(agent_a, agent_b)
+    result = (
+        supabase.table("relationship_drift")
+        .select("delta, old_affinity, new_affinity, reason, created_at")
+        .eq("agent_a", a)
+        .eq("agent_b", b)
+        .order("created_at", desc=True)
+        .limit(limit)
+        .execute()
+    )
+    return result.data or []
+
+
+def rollup_drift(retain_days: int = DRIFT_RETAIN_DAYS) -> int:
+    """Fold drift log entries older than retain_days into daily per-pair rollups.
+
+    Returns the number of log entries rolled up.
+    """
+    if not supabase:
+        return 0
+
+    result = supabase.rpc(
+        "rollup_relationship_drift", {"retain": f"{retain_days} days"}
+    ).execute()
+    return int(result.data or 0)
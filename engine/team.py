@@ -0,0 +1,113 @@
+"""Shogunate Engine team selection.
+
+Picks the k-agent team for a mission that maximizes total pairwise
+affinity, subject to covering the mission's domains and to agent load.
+A greedy build (forced to cover uncovered domains first) is refined by
+best-improvement swaps, so cost grows as O(k^2 * n) per round rather
+than with the number of possible teams.
+
+NumPy is used when installed (pip install 'war-room-engine[fast]');
+otherwise the same algorithm runs on plain lists.
+"""
+
+import os
+
+from engine.config import DAIMYO_REGISTRY
+from engine.relationships import affinity_matrix
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised when numpy is absent
+    np = None
+
+TEAM_LOAD_WEIGHT = float(os.getenv("TEAM_LOAD_WEIGHT", "0.1"))  # per queued/running step
+MAX_AGENT_LOAD = int(os.getenv("MAX_AGENT_LOAD", "0"))  # 0 = no cap
+MAX_SWAP_ROUNDS = 20
+
+
+def _column_sums(weights, rows: list[int]) -> list[float]:
+    """Sum of the given rows of the affinity matrix, per column."""
+    if np is not None:
+        return weights[rows].sum(axis=0).tolist()
+    return [sum(col) for col in zip(*(weights[r] for r in rows))]
+
+
+def team_score(team: list[str], loads: dict[str, int] | None = None) -> float:
+    """Total pairwise affinity of a team minus its load penalty."""
+    loads = loads or {}
+    weights = affinity_matrix(team)
+    pairwise = sum(weights[i][j] for i in range(len(team)) for j in range(i + 1, len(team)))
+    return pairwise - TEAM_LOAD_WEIGHT * sum(loads.get(agent, 0) for agent in team)
+
+
+def select_team(
+    primary: str,
+    domains: list[str],
+    k: int,
+    loads: dict[str, int] | None = None,
+    registry: dict[str, dict] | None = None,
+) -> list[str]:
+    """Pick the best k-agent team that includes the primary.
+
+    Args:
+        primary: Daimyo ID that must be on the team
+        domains: Domains the mission needs; covered where the registry allows
+        k: Team size (capped at the number of eligible agents)
+        loads: Queued + running steps per daimyo
+        registry: Agent registry, defaults to DAIMYO_REGISTRY
+
+    Returns:
+        Team member IDs, primary first, then in order of selection
+    """
+    registry = DAIMYO_REGISTRY if registry is None else registry
+    loads = loads or {}
+
+    agents = [primary] + [
+        agent for agent in registry
+        if agent != primary and not (MAX_AGENT_LOAD and loads.get(agent, 0) >= MAX_AGENT_LOAD)
+    ]
+    k = max(1, min(k, len(agents)))
+    if k == 1:
+        return [primary]
+
+    n = len(agents)
+    weights = affinity_matrix(agents)
+    if np is not None:
+        weights = np.asarray(weights, dtype=float)
+    unary = [-TEAM_LOAD_WEIGHT * loads.get(agent, 0) for agent in agents]
+    agent_domain = [registry.get(agent, {}).get("domain") for agent in agents]
+    required = set(domains)
+
+    def covered(members) -> set:
+        return required & {agent_domain[i] for i in members}
+
+    # 1. Greedy build: best marginal gain, restricted to agents that cover a
+    # still-uncovered domain while any such agent is available.
+    team = [0]
+    while len(team) < k:
+        gains = _column_sums(weights, team)
+        outside = [j for j in range(n) if j not in team]
+        missing = required - covered(team)
+        pool = [j for j in outside if agent_domain[j] in missing] or outside
+        team.append(max(pool, key=lambda j: (gains[j] + unary[j], -j)))
+
+    # 2. Swap refinement: replace a non-primary member with an outsider when
+    # that raises the score without losing domain coverage.
+    for _ in range(MAX_SWAP_ROUNDS):
+        coverage = len(covered(team))
+        best = None  # (delta, position, candidate)
+        for pos in range(1, len(team)):
+            rest = team[:pos] + team[pos + 1:]
+            gains = _column_sums(weights, rest)
+            current = gains[team[pos]] + unary[team[pos]]
+            for j in range(n):
+                if j in team or len(covered(rest + [j])) < coverage:
+                    continue
+                delta = gains[j] + unary[j] - current
+                if delta > 1e-9 and (best is None or delta > best[0]):
+                    best = (delta, pos, j)
+        if best is None:
+            break
+        team[best[1]] = best[2]
+
+    return [agents[i] for i in team]
@@ -49,12 +49,14 @@ wr_update_task() {
   fi
 }
 
-# Create an event in the events table
-# Schema: type(proposal_created|mission_started|mission_completed|mission_failed|step_started|step_completed|step_failed|agent_action|user_request), agent, message, metadata(jsonb)
+# Create an event in war_room_events (same schema as engine.events.emit)
+# Schema: event_type (see EventType in engine/event_types.py), agent_id, title, description, metadata(jsonb)
 # Usage: wr_create_event <type> <agent> <message> [metadata_json]
 wr_create_event() {
   local type="$1" agent="$2" message="$3" metadata="${4:-{}}"
-  _wr_curl POST "events" "{\"type\":\"$type\",\"agent\":\"$agent\",\"message\":\"$message\",\"metadata\":$metadata}" > /dev/null
+  local title
+  title="$(echo "$type" | awk -F_ '{for (i = 1; i <= NF; i++) $i = toupper(substr($i, 1, 1)) substr($i, 2)} 1')"
+  _wr_curl POST "war_room_events" "{\"event_type\":\"$type\",\"agent_id\":\"$agent\",\"title\":\"$title\",\"description\":\"$message\",\"metadata\":$metadata}" > /dev/null
 }
 
 # Update project status
@@ -1,5 +1,5 @@
 import { supabase } from '@/lib/supabase'
-import type { AgentStatus, Mission, Step, Event, DashboardStats, Project, ProjectWithMetrics, Board, Task, DynastyStats, Proposal } from '@/lib/types'
+import type { AgentStatus, Mission, Step, Event, WarRoomEvent, DashboardStats, Project, ProjectWithMetrics, Board, Task, DynastyStats, Proposal } from '@/lib/types'
 
 // Domain → Daimyo routing (matches engine/config.py DOMAIN_TO_DAIMYO)
 export const DOMAIN_TO_DAIMYO: Record<string, string> = {
@@ -65,15 +65,27 @@ export async function getMissionTasks(missionId: string): Promise<Task[]> {
   return data as Task[]
 }
 
+export function toEvent(row: WarRoomEvent): Event {
+  return {
+    id: row.id,
+    type: row.event_type,
+    source_id: row.source_id,
+    agent: row.agent_id,
+    message: row.description || row.title,
+    metadata: row.metadata,
+    created_at: row.created_at,
+  }
+}
+
 export async function getEvents(limit = 50): Promise<Event[]> {
   if (!supabase) return []
   const { data, error } = await supabase
-    .from('events')
+    .from('war_room_events')
     .select('*')
     .order('created_at', { ascending: false })
     .limit(limit)
   if (error) { console.error('getEvents error:', error); return [] }
-  return data as Event[]
+  return (data as WarRoomEvent[]).map(toEvent)
 }
 
 export async function getAgentWithHistory(id: string): Promise<{
@@ -86,7 +98,7 @@ export async function getAgentWithHistory(id: string): Promise<{
   const [agentRes, missionsRes, eventsRes] = await Promise.all([
     supabase.from('agent_status').select('*').eq('id', id).single(),
     supabase.from('missions').select('*').eq('assigned_to', id).order('created_at', { ascending: false }),
-    supabase.from('events').select('*').eq('agent', id).order('created_at', { ascending: false }),
+    supabase.from('war_room_events').select('*').eq('agent_id', id).order('created_at', { ascending: false }),
   ])
 
   if (agentRes.error) { console.error('getAgentWithHistory agent error:', agentRes.error) }
@@ -96,7 +108,7 @@ export async function getAgentWithHistory(id: string): Promise<{
   return {
     agent: (agentRes.data as AgentStatus) ?? null,
     missions: (missionsRes.data as Mission[]) ?? [],
-    events: (eventsRes.data as Event[]) ?? [],
+    events: ((eventsRes.data as WarRoomEvent[]) ?? []).map(toEvent),
   }
 }
 
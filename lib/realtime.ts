@@ -3,7 +3,8 @@
 import { useEffect, useState } from "react"
 import { supabase } from "@/lib/supabase"
 import type { RealtimeChannel } from "@supabase/supabase-js"
-import type { Event, AgentStatus, Mission, Step, Project, Task } from "@/lib/types"
+import type { Event, WarRoomEvent, AgentStatus, Mission, Step, Project, Task } from "@/lib/types"
+import { toEvent } from "@/lib/queries"
 import { triggerEventToast, triggerAgentOfflineToast } from "@/lib/toast-events"
 
 const REALTIME_ENABLED = process.env.NEXT_PUBLIC_ENABLE_REALTIME !== "false"
@@ -27,9 +28,9 @@ export function useRealtimeEvents(initialEvents: Event[]): Event[] {
       .channel("events-realtime")
       .on(
         "postgres_changes",
-        { event: "INSERT", schema: "public", table: "events" },
+        { event: "INSERT", schema: "public", table: "war_room_events" },
         (payload) => {
-          const newEvent = payload.new as Event
+          const newEvent = toEvent(payload.new as WarRoomEvent)
           setEvents((prev) => [newEvent, ...prev])
           triggerEventToast(newEvent)
         },
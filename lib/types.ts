@@ -51,15 +51,31 @@ export interface Step {
   created_at: string
 }
 
+// Matches EventType in engine/event_types.py
+export type EventType =
+  | 'proposal_created' | 'proposal_approved' | 'proposal_rejected'
+  | 'mission_started' | 'mission_completed' | 'mission_failed'
+  | 'step_started' | 'step_completed' | 'step_failed' | 'step_stale'
+  | 'council_reviewed'
+  | 'task_created' | 'task_updated' | 'task_started' | 'task_completed' | 'task_failed'
+  | 'heartbeat' | 'agent_action' | 'user_request'
+
+// Row in war_room_events, the single event table
+export interface WarRoomEvent {
+  id: string
+  event_type: EventType
+  agent_id: string
+  title: string
+  description: string | null
+  metadata: Record<string, unknown> | null
+  source_id: string | null
+  created_at: string
+}
+
+// Feed shape (also the columns of the legacy events view)
 export interface Event {
   id: string
-  type:
-    | 'proposal_created' | 'proposal_approved' | 'proposal_rejected'
-    | 'mission_started' | 'mission_completed' | 'mission_failed'
-    | 'step_started' | 'step_completed' | 'step_failed' | 'step_stale'
-    | 'council_reviewed'
-    | 'task_started' | 'task_completed' | 'task_failed'
-    | 'heartbeat' | 'agent_action' | 'user_request'
+  type: EventType
   source_id: string | null
   agent: string | null
   message: string
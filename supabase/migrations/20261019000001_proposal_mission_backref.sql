@@ -0,0 +1,54 @@
+-- Proposal -> mission back-reference
+-- run_pending() used to fetch every approved proposal plus proposal_id from
+-- every mission ever created and set-diff in Python. With proposals.mission_id
+-- and a partial index on unconverted approved proposals, each poll touches
+-- only new work.
+
+-- ============================================================
+-- 1. Back-reference column
+-- ============================================================
+
+alter table proposals add column if not exists mission_id uuid references missions(id) on delete set null;
+
+-- ============================================================
+-- 2. Backfill from existing missions (oldest mission wins)
+-- ============================================================
+
+update proposals p
+set mission_id = m.id
+from (
+  select distinct on (proposal_id) proposal_id, id
+  from missions
+  where proposal_id is not null
+  order by proposal_id, created_at
+) m
+where p.id = m.proposal_id
+  and p.mission_id is null;
+
+-- ============================================================
+-- 3. Keep it in sync for every mission insert
+-- ============================================================
+
+create or replace function link_proposal_to_mission() returns trigger as $$
+begin
+  update proposals
+  set mission_id = new.id
+  where id = new.proposal_id
+    and mission_id is null;
+  return new;
+end;
+$$ language plpgsql;
+
+create trigger mission_proposal_backref_trigger
+  after insert on missions
+  for each row
+  when (new.proposal_id is not null)
+  execute function link_proposal_to_mission();
+
+-- ============================================================
+-- 4. Partial index: only approved proposals still awaiting a mission
+-- ============================================================
+
+create index if not exists idx_proposals_approved_unconverted
+  on proposals(created_at)
+  where status = 'approved' and mission_id is null;
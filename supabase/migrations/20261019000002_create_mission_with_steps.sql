@@ -0,0 +1,58 @@
+-- Transactional mission + steps creation
+-- create_mission() used to insert the mission, then each step with its own
+-- HTTP call: N+2 round trips, and a crash partway left a mission with half
+-- its steps. This function does the mission insert and one bulk step insert
+-- in a single transaction and returns the full object graph.
+
+-- ============================================================
+-- 1. create_mission_with_steps(mission jsonb, steps jsonb) -> jsonb
+-- ============================================================
+-- mission: {proposal_id, project_id, title, assigned_to, status}
+-- steps:   [{title, description, kind, daimyo, model, status, timeout_minutes}, ...]
+-- returns: mission row as json with a "steps" array in input order
+--
+-- Steps are ordered by created_at at execution time, and a single statement
+-- shares one now(), so each step gets now() + its position in microseconds.
+
+create or replace function create_mission_with_steps(mission jsonb, steps jsonb)
+returns jsonb
+language plpgsql
+as $$
+declare
+  new_mission missions;
+  created_steps jsonb;
+begin
+  insert into missions (proposal_id, project_id, title, assigned_to, status)
+  values (
+    nullif(mission->>'proposal_id', '')::uuid,
+    mission->>'project_id',
+    mission->>'title',
+    mission->>'assigned_to',
+    coalesce(mission->>'status', 'queued')
+  )
+  returning * into new_mission;
+
+  with inserted as (
+    insert into steps (mission_id, title, description, kind, daimyo, model, status, timeout_minutes, created_at)
+    select
+      new_mission.id,
+      s->>'title',
+      s->>'description',
+      coalesce(s->>'kind', 'code'),
+      s->>'daimyo',
+      s->>'model',
+      coalesce(s->>'status', 'queued'),
+      coalesce((s->>'timeout_minutes')::int, 30),
+      now() + (ord - 1) * interval '1 microsecond'
+    from jsonb_array_elements(coalesce(steps, '[]'::jsonb)) with ordinality as t(s, ord)
+    returning *
+  )
+  select coalesce(jsonb_agg(to_jsonb(inserted) order by inserted.created_at), '[]'::jsonb)
+  into created_steps
+  from inserted;
+
+  return to_jsonb(new_mission) || jsonb_build_object('steps', created_steps);
+end;
+$$;
+
+grant execute on function create_mission_with_steps(jsonb, jsonb) to service_role;
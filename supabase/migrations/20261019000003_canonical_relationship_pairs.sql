@@ -0,0 +1,70 @@
+-- Canonical symmetric relationship storage
+-- A relationship could be stored as (a,b) or (b,a), so every lookup probed
+-- twice and duplicates could drift apart. Normalize every row to
+-- (least(a,b), greatest(a,b)), merge duplicates, and enforce one row per
+-- unordered pair so lookups and upserts are a single indexed statement.
+
+-- ============================================================
+-- 1. Merge (b,a) rows into an existing (a,b) row
+-- ============================================================
+-- The most recently updated row's affinity wins; drift histories are
+-- concatenated so no audit trail is lost.
+
+update agent_relationships canon
+set affinity = case when dup.updated_at > canon.updated_at then dup.affinity else canon.affinity end,
+    drift_history = coalesce(canon.drift_history, '[]'::jsonb) || coalesce(dup.drift_history, '[]'::jsonb),
+    updated_at = greatest(canon.updated_at, dup.updated_at)
+from agent_relationships dup
+where dup.agent_a > dup.agent_b
+  and canon.agent_a = dup.agent_b
+  and canon.agent_b = dup.agent_a;
+
+delete from agent_relationships dup
+using agent_relationships canon
+where dup.agent_a > dup.agent_b
+  and canon.agent_a = dup.agent_b
+  and canon.agent_b = dup.agent_a;
+
+-- ============================================================
+-- 2. Swap the remaining reversed rows
+-- ============================================================
+
+update agent_relationships
+set agent_a = agent_b,
+    agent_b = agent_a
+where agent_a > agent_b;
+
+-- ============================================================
+-- 3. Keep it canonical: normalize on write, then enforce
+-- ============================================================
+
+create or replace function canonicalize_relationship_pair() returns trigger as $$
+declare
+  swap text;
+begin
+  if new.agent_a > new.agent_b then
+    swap := new.agent_a;
+    new.agent_a := new.agent_b;
+    new.agent_b := swap;
+  end if;
+  return new;
+end;
+$$ language plpgsql;
+
+create trigger agent_relationships_canonical_pair
+  before insert or update of agent_a, agent_b on agent_relationships
+  for each row
+  execute function canonicalize_relationship_pair();
+
+alter table agent_relationships
+  add constraint agent_relationships_canonical_order check (agent_a < agent_b);
+
+-- ============================================================
+-- 4. One row per unordered pair
+-- ============================================================
+
+create unique index if not exists idx_agent_relationships_pair
+  on agent_relationships (least(agent_a, agent_b), greatest(agent_a, agent_b));
+
+-- Redundant with unique(agent_a, agent_b)
+drop index if exists idx_agent_relationships_agents;
@@ -0,0 +1,43 @@
+-- Atomic batched affinity drift
+-- apply_drift() used to select, reverse-select and update each pair from
+-- Python: O(N^2) x 3 round trips per mission, and a read-modify-write on
+-- affinity and drift_history that lost updates when two workers finished
+-- missions at the same moment. This function clamps and updates every pair
+-- in one statement, computing the new value from the row under its lock.
+
+-- ============================================================
+-- 1. apply_drift(pairs jsonb, delta numeric, reason text) -> setof rows
+-- ============================================================
+-- pairs: [["ed", "light"], ["light", "toji"], ...] in any order; self-pairs
+--        and duplicates are ignored
+-- Returns the updated relationship rows. Pairs with no relationship row are
+-- skipped, matching the old Python behaviour.
+
+create or replace function apply_drift(pairs jsonb, delta numeric, reason text default null)
+returns setof agent_relationships
+language sql
+as $$
+  with wanted as (
+    select distinct
+      least(p->>0, p->>1) as agent_a,
+      greatest(p->>0, p->>1) as agent_b
+    from jsonb_array_elements(pairs) as p
+    where p->>0 <> p->>1
+  )
+  update agent_relationships r
+  set affinity = least(0.95, greatest(0.10, r.affinity + delta)),
+      drift_history = coalesce(r.drift_history, '[]'::jsonb) || jsonb_build_array(jsonb_build_object(
+        'timestamp', now(),
+        'delta', delta,
+        'old', r.affinity,
+        'new', least(0.95, greatest(0.10, r.affinity + delta)),
+        'reason', coalesce(reason, case when delta >= 0 then 'mission_success' else 'mission_failure' end)
+      )),
+      updated_at = now()
+  from wanted w
+  where r.agent_a = w.agent_a
+    and r.agent_b = w.agent_b
+  returning r.*;
+$$;
+
+grant execute on function apply_drift(jsonb, numeric, text) to service_role;
@@ -0,0 +1,180 @@
+-- Append-only relationship drift log
+-- Every drift used to rewrite the whole drift_history JSON array on the
+-- relationship row, so the array grew forever and each update and each
+-- select("*") of relationships got slower. Drift entries now go to an
+-- append-only relationship_drift table; the row keeps only a capped window
+-- of recent entries plus a running count, and old log entries are rolled
+-- up into daily per-pair summaries. Write cost per drift stays constant.
+
+-- ============================================================
+-- 1. Drift log + daily rollups
+-- ============================================================
+
+create table if not exists relationship_drift (
+  id bigserial primary key,
+  relationship_id uuid not null references agent_relationships(id) on delete cascade,
+  agent_a text not null,
+  agent_b text not null,
+  delta numeric(4,2) not null,
+  old_affinity numeric(3,2) not null,
+  new_affinity numeric(3,2) not null,
+  reason text,
+  created_at timestamptz not null default now()
+);
+
+create index idx_relationship_drift_pair_time on relationship_drift(agent_a, agent_b, created_at desc);
+create index idx_relationship_drift_time on relationship_drift(created_at);
+
+create table if not exists relationship_drift_daily (
+  agent_a text not null,
+  agent_b text not null,
+  day date not null,
+  drift_count int not null,
+  net_delta numeric(6,2) not null,
+  first_affinity numeric(3,2) not null,
+  last_affinity numeric(3,2) not null,
+  primary key (agent_a, agent_b, day)
+);
+
+alter table relationship_drift enable row level security;
+alter table relationship_drift_daily enable row level security;
+create policy "anon_read_relationship_drift" on relationship_drift for select using (true);
+create policy "anon_read_relationship_drift_daily" on relationship_drift_daily for select using (true);
+
+-- ============================================================
+-- 2. Capped recent window on the relationship row
+-- ============================================================
+
+alter table agent_relationships add column if not exists drift_count int not null default 0;
+
+create or replace function jsonb_tail(arr jsonb, n int) returns jsonb
+language sql immutable
+as $$
+  select coalesce(jsonb_agg(e order by ord), '[]'::jsonb)
+  from (
+    select e, ord
+    from jsonb_array_elements(coalesce(arr, '[]'::jsonb)) with ordinality as t(e, ord)
+    order by ord desc
+    limit n
+  ) recent;
+$$;
+
+-- ============================================================
+-- 3. Backfill the log from existing drift_history arrays, then cap them
+-- ============================================================
+
+insert into relationship_drift (relationship_id, agent_a, agent_b, delta, old_affinity, new_affinity, reason, created_at)
+select
+  r.id,
+  r.agent_a,
+  r.agent_b,
+  (e->>'delta')::numeric,
+  (e->>'old')::numeric,
+  (e->>'new')::numeric,
+  e->>'reason',
+  coalesce((e->>'timestamp')::timestamptz, r.updated_at)
+from agent_relationships r,
+     jsonb_array_elements(coalesce(r.drift_history, '[]'::jsonb)) as e;
+
+update agent_relationships
+set drift_count = jsonb_array_length(coalesce(drift_history, '[]'::jsonb)),
+    drift_history = jsonb_tail(drift_history, 10);
+
+-- ============================================================
+-- 4. apply_drift: log + capped window, same signature
+-- ============================================================
+
+create or replace function apply_drift(pairs jsonb, delta numeric, reason text default null)
+returns setof agent_relationships
+language sql
+as $$
+  with wanted as (
+    select distinct
+      least(p->>0, p->>1) as agent_a,
+      greatest(p->>0, p->>1) as agent_b
+    from jsonb_array_elements(pairs) as p
+    where p->>0 <> p->>1
+  ),
+  locked as (
+    select
+      r.id,
+      r.affinity as old_affinity,
+      least(0.95, greatest(0.10, r.affinity + delta)) as new_affinity,
+      coalesce(reason, case when delta >= 0 then 'mission_success' else 'mission_failure' end) as why
+    from agent_relationships r
+    join wanted w on r.agent_a = w.agent_a and r.agent_b = w.agent_b
+    for update of r
+  ),
+  updated as (
+    update agent_relationships r
+    set affinity = l.new_affinity,
+        drift_history = jsonb_tail(
+          coalesce(r.drift_history, '[]'::jsonb) || jsonb_build_array(jsonb_build_object(
+            'timestamp', now(),
+            'delta', delta,
+            'old', l.old_affinity,
+            'new', l.new_affinity,
+            'reason', l.why
+          )),
+          10
+        ),
+        drift_count = r.drift_count + 1,
+        updated_at = now()
+    from locked l
+    where r.id = l.id
+    returning r.*
+  ),
+  logged as (
+    insert into relationship_drift (relationship_id, agent_a, agent_b, delta, old_affinity, new_affinity, reason)
+    select u.id, u.agent_a, u.agent_b, delta, l.old_affinity, l.new_affinity, l.why
+    from updated u
+    join locked l on l.id = u.id
+  )
+  select * from updated;
+$$;
+
+-- ============================================================
+-- 5. Rollup: fold log entries older than `retain` into daily summaries
+-- ============================================================
+
+create or replace function rollup_relationship_drift(retain interval default '30 days')
+returns integer
+language plpgsql
+as $$
+declare
+  rolled integer;
+begin
+  with moved as (
+    delete from relationship_drift
+    where created_at < now() - retain
+    returning *
+  ),
+  daily as (
+    select
+      agent_a,
+      agent_b,
+      created_at::date as day,
+      count(*)::int as drift_count,
+      sum(delta) as net_delta,
+      (array_agg(old_affinity order by created_at))[1] as first_affinity,
+      (array_agg(new_affinity order by created_at desc))[1] as last_affinity
+    from moved
+    group by agent_a, agent_b, created_at::date
+  ),
+  upserted as (
+    insert into relationship_drift_daily as d (agent_a, agent_b, day, drift_count, net_delta, first_affinity, last_affinity)
+    select agent_a, agent_b, day, drift_count, net_delta, first_affinity, last_affinity
+    from daily
+    on conflict (agent_a, agent_b, day) do update
+      set drift_count = d.drift_count + excluded.drift_count,
+          net_delta = d.net_delta + excluded.net_delta,
+          last_affinity = excluded.last_affinity
+  )
+  select count(*) into rolled from moved;
+
+  return rolled;
+end;
+$$;
+
+grant execute on function apply_drift(jsonb, numeric, text) to service_role;
+grant execute on function rollup_relationship_drift(interval) to service_role;
@@ -0,0 +1,87 @@
+-- Near-duplicate memory suppression
+-- Extraction could store the same lesson dozens of times, bloating
+-- agent_memory and crowding diverse memories out of retrieval. Memories now
+-- carry a 64-bit SimHash fingerprint (computed by the engine). A new memory
+-- that is a near-duplicate of an active one is merged into it instead of
+-- being inserted, and a periodic consolidation pass folds remaining
+-- clusters into one representative. Merged rows are archived, not deleted.
+
+-- ============================================================
+-- 1. Columns
+-- ============================================================
+
+alter table agent_memory add column if not exists fingerprint bigint;
+alter table agent_memory add column if not exists occurrences int not null default 1;
+alter table agent_memory add column if not exists last_seen_at timestamptz;
+alter table agent_memory add column if not exists merged_into uuid references agent_memory(id);
+
+create index if not exists idx_agent_memory_agent_active
+  on agent_memory(agent_id, created_at)
+  where status = 'active';
+
+-- ============================================================
+-- 2. merge_memories(merges jsonb, bump numeric) -> setof rows
+-- ============================================================
+-- merges: [{"id": "<uuid>", "confidence": 0.8, "count": 2}, ...], one entry
+--         per target memory
+-- Each target gains `count` occurrences; its confidence becomes the larger
+-- of its own and the incoming one, plus bump per occurrence, capped at 1.
+
+create or replace function merge_memories(merges jsonb, bump numeric default 0.05)
+returns setof agent_memory
+language sql
+as $$
+  update agent_memory m
+  set occurrences = m.occurrences + coalesce((x->>'count')::int, 1),
+      confidence = least(1, greatest(m.confidence, (x->>'confidence')::numeric)
+                            + bump * coalesce((x->>'count')::int, 1)),
+      last_seen_at = now()
+  from jsonb_array_elements(merges) as x
+  where m.id = (x->>'id')::uuid
+    and m.status = 'active'
+  returning m.*;
+$$;
+
+-- ============================================================
+-- 3. consolidate_memories(clusters jsonb, bump numeric) -> setof rows
+-- ============================================================
+-- clusters: [{"keep": "<uuid>", "merged": ["<uuid>", ...]}, ...]
+-- Archives every merged memory (merged_into = keep) and folds its
+-- occurrences and confidence into the kept memory, in one transaction.
+-- Returns the updated kept memories.
+
+create or replace function consolidate_memories(clusters jsonb, bump numeric default 0.05)
+returns setof agent_memory
+language sql
+as $$
+  with pairs as (
+    select (c->>'keep')::uuid as keep, merged.id::uuid as merged
+    from jsonb_array_elements(clusters) as c,
+         jsonb_array_elements_text(c->'merged') as merged(id)
+  ),
+  absorbed as (
+    update agent_memory m
+    set status = 'archived',
+        merged_into = p.keep
+    from pairs p
+    where m.id = p.merged
+      and m.id <> p.keep
+      and m.status = 'active'
+    returning p.keep, m.occurrences, m.confidence
+  ),
+  totals as (
+    select keep, sum(occurrences)::int as occurrences, max(confidence) as confidence, count(*) as merged
+    from absorbed
+    group by keep
+  )
+  update agent_memory k
+  set occurrences = k.occurrences + t.occurrences,
+      confidence = least(1, greatest(k.confidence, t.confidence) + bump * t.merged),
+      last_seen_at = now()
+  from totals t
+  where k.id = t.keep
+  returning k.*;
+$$;
+
+grant execute on function merge_memories(jsonb, numeric) to service_role;
+grant execute on function consolidate_memories(jsonb, numeric) to service_role;
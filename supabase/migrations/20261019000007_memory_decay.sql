@@ -0,0 +1,51 @@
+-- Memory decay and archival
+-- agent_memory rows stayed active forever, so stale memories kept ranking
+-- on their original confidence and the active set (and every index over
+-- it) grew without bound. The engine now ranks by effective confidence,
+-- halved every half-life since a memory was last seen, and a periodic
+-- poller job archives in bulk the memories whose effective confidence has
+-- fallen below a floor, or that have not been seen within a TTL.
+
+-- ============================================================
+-- 1. Index
+-- ============================================================
+-- Archival scans only the active set by recency.
+
+create index if not exists idx_agent_memory_active_seen
+  on agent_memory((coalesce(last_seen_at, created_at)))
+  where status = 'active';
+
+-- ============================================================
+-- 2. archive_stale_memories(half_life, floor, ttl) -> setof rows
+-- ============================================================
+-- effective = confidence * 0.5 ^ (age / half_life),
+-- age = now() - coalesce(last_seen_at, created_at)
+-- Archives active memories with effective < floor, or age > ttl. A null
+-- half_life or ttl disables that criterion. Returns (id, agent_id) of the
+-- archived memories so the engine can update its local index.
+
+create or replace function archive_stale_memories(
+  half_life interval,
+  floor numeric,
+  ttl interval default null
+)
+returns table (id uuid, agent_id text)
+language sql
+as $$
+  update agent_memory m
+  set status = 'archived'
+  where m.status = 'active'
+    and (
+      (half_life is not null
+        and m.confidence * power(
+              0.5,
+              extract(epoch from now() - coalesce(m.last_seen_at, m.created_at))
+                / extract(epoch from half_life)
+            ) < floor)
+      or (ttl is not null
+        and coalesce(m.last_seen_at, m.created_at) < now() - ttl)
+    )
+  returning m.id, m.agent_id;
+$$;
+
+grant execute on function archive_stale_memories(interval, numeric, interval) to service_role;
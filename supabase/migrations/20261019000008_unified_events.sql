@@ -0,0 +1,183 @@
+-- Unified event pipeline
+-- The engine wrote to war_room_events while the CLI, shell hooks and the
+-- row-change triggers wrote to a separate events table with a different
+-- schema, so the dashboard had to query and subscribe to both. Everything
+-- now writes war_room_events. The old events table is folded into it and
+-- replaced by a view with the old column names, which still accepts
+-- inserts from any writer that has not been updated.
+
+-- ============================================================
+-- 1. war_room_events gains the old table's source reference
+-- ============================================================
+
+alter table war_room_events add column if not exists source_id uuid;
+
+create index if not exists idx_war_room_events_created
+  on war_room_events(created_at desc);
+create index if not exists idx_war_room_events_agent_created
+  on war_room_events(agent_id, created_at desc);
+
+-- ============================================================
+-- 2. Backfill and replace the events table
+-- ============================================================
+
+insert into war_room_events (event_type, agent_id, title, description, metadata, source_id, created_at)
+select e.type,
+       coalesce(e.agent, 'system'),
+       initcap(replace(e.type, '_', ' ')),
+       coalesce(e.message, ''),
+       coalesce(e.metadata, '{}'::jsonb),
+       e.source_id,
+       e.created_at
+from events e;
+
+drop table events cascade;
+
+create view events as
+select id,
+       event_type as type,
+       source_id,
+       agent_id as agent,
+       description as message,
+       metadata,
+       created_at
+from war_room_events;
+
+create or replace function insert_legacy_event() returns trigger
+language plpgsql
+as $$
+begin
+  insert into war_room_events (event_type, agent_id, title, description, metadata, source_id, created_at)
+  values (
+    new.type,
+    coalesce(new.agent, 'system'),
+    initcap(replace(new.type, '_', ' ')),
+    coalesce(new.message, ''),
+    coalesce(new.metadata, '{}'::jsonb),
+    new.source_id,
+    coalesce(new.created_at, now())
+  );
+  return new;
+end;
+$$;
+
+create trigger events_insert_trigger
+  instead of insert on events
+  for each row
+  execute function insert_legacy_event();
+
+-- ============================================================
+-- 3. Row-change triggers write war_room_events
+-- ============================================================
+
+create or replace function emit_task_event() returns trigger
+language plpgsql
+as $$
+begin
+  if tg_op = 'INSERT' then
+    insert into war_room_events (event_type, agent_id, title, description, metadata)
+    values (
+      'task_created',
+      coalesce(new.owner, 'system'),
+      'Task Created',
+      'New task: ' || new.title,
+      jsonb_build_object('task_id', new.id, 'project_id', new.project_id, 'status', new.status)
+    );
+  elsif tg_op = 'UPDATE' then
+    insert into war_room_events (event_type, agent_id, title, description, metadata)
+    values (
+      'task_updated',
+      coalesce(new.owner, 'system'),
+      'Task Updated',
+      new.title || ' -> ' || new.status,
+      jsonb_build_object(
+        'task_id', new.id,
+        'project_id', new.project_id,
+        'old_status', old.status,
+        'new_status', new.status,
+        'owner', new.owner
+      )
+    );
+  end if;
+  return new;
+end;
+$$;
+
+-- Proposal events come from this trigger for every writer (engine, CLI,
+-- dashboard); engine.proposal no longer emits its own copies, and stores
+-- the rejection reason on the row so the trigger can carry it.
+
+alter table proposals add column if not exists rejection_reason text;
+
+create or replace function emit_proposal_event() returns trigger
+language plpgsql
+as $$
+begin
+  if tg_op = 'INSERT' then
+    insert into war_room_events (event_type, agent_id, title, description, metadata, source_id)
+    values (
+      'proposal_created',
+      'system',
+      'Proposal Created',
+      'New proposal: ' || new.title,
+      jsonb_build_object('proposal_id', new.id, 'title', new.title,
+                         'domain', new.domain, 'requested_by', new.requested_by),
+      new.id
+    );
+  elsif tg_op = 'UPDATE' and old.status is distinct from new.status then
+    if new.status = 'approved' then
+      insert into war_room_events (event_type, agent_id, title, description, metadata, source_id)
+      values (
+        'proposal_approved',
+        'system',
+        'Proposal Approved',
+        'Approved: ' || new.title,
+        jsonb_build_object('proposal_id', new.id, 'approved_by', new.approved_by),
+        new.id
+      );
+    elsif new.status = 'rejected' then
+      insert into war_room_events (event_type, agent_id, title, description, metadata, source_id)
+      values (
+        'proposal_rejected',
+        'system',
+        'Proposal Rejected',
+        'Rejected: ' || new.title,
+        jsonb_build_object('proposal_id', new.id, 'reason', coalesce(new.rejection_reason, '')),
+        new.id
+      );
+    end if;
+  end if;
+  return new;
+end;
+$$;
+
+create or replace function emit_agent_status_event() returns trigger
+language plpgsql
+as $$
+begin
+  if old.status is distinct from new.status then
+    insert into war_room_events (event_type, agent_id, title, description, metadata)
+    values (
+      'agent_action',
+      new.id,
+      'Agent Action',
+      new.display_name || ' is now ' || new.status,
+      jsonb_build_object('agent_id', new.id, 'old_status', old.status, 'new_status', new.status)
+    );
+  end if;
+  return new;
+end;
+$$;
+
+-- ============================================================
+-- 4. Realtime
+-- ============================================================
+-- Views cannot be published; the dashboard subscribes to war_room_events.
+
+do $$
+begin
+  alter publication supabase_realtime add table war_room_events;
+exception
+  when duplicate_object or undefined_object then null;
+end;
+$$;
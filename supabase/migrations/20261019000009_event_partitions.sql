@@ -0,0 +1,240 @@
+-- Event partitions, retention and hourly rollups
+-- war_room_events had no retention: heartbeats and step events piled up
+-- forever and every created_at-ordered feed query scanned a growing heap.
+-- The table is now range-partitioned by month. Each event type has a
+-- retention period, and expired months are dropped whole instead of
+-- deleted row by row. Hourly per-type/per-agent counts are kept in
+-- event_rollups_hourly, so activity history outlives the raw rows.
+
+-- ============================================================
+-- 1. Monthly partitions
+-- ============================================================
+-- Partitions are named war_room_events_YYYY_MM. Rows outside every
+-- month partition land in war_room_events_default, so trigger inserts
+-- never fail for lack of a partition; ensure_event_partitions() moves
+-- them out when it creates their month.
+
+drop view if exists events;
+
+alter table war_room_events rename to war_room_events_unpartitioned;
+update war_room_events_unpartitioned set created_at = now() where created_at is null;
+
+create table war_room_events (like war_room_events_unpartitioned including defaults)
+  partition by range (created_at);
+alter table war_room_events alter column created_at set not null;
+alter table war_room_events add primary key (id, created_at);
+
+create table war_room_events_default partition of war_room_events default;
+
+-- ensure_event_partitions(months_ahead, since) -> partitions created
+-- Creates the month partitions from since's month through months_ahead
+-- months past the current one.
+create or replace function ensure_event_partitions(
+  months_ahead int default 2,
+  since timestamptz default now()
+)
+returns integer
+language plpgsql
+as $$
+declare
+  month date := date_trunc('month', least(since, now()))::date;
+  last_month date := (date_trunc('month', now()) + make_interval(months => months_ahead))::date;
+  part text;
+  created integer := 0;
+begin
+  while month <= last_month loop
+    part := 'war_room_events_' || to_char(month, 'YYYY_MM');
+    if to_regclass(part) is null then
+      execute format('create table %I (like war_room_events including defaults)', part);
+      execute format(
+        'with moved as (delete from war_room_events_default where created_at >= %L and created_at < %L returning *)
+         insert into %I select * from moved',
+        month, (month + interval '1 month')::date, part
+      );
+      execute format(
+        'alter table war_room_events attach partition %I for values from (%L) to (%L)',
+        part, month, (month + interval '1 month')::date
+      );
+      created := created + 1;
+    end if;
+    month := (month + interval '1 month')::date;
+  end loop;
+  return created;
+end;
+$$;
+
+select ensure_event_partitions(
+  2, coalesce((select min(created_at) from war_room_events_unpartitioned), now())
+);
+
+insert into war_room_events select * from war_room_events_unpartitioned;
+drop table war_room_events_unpartitioned;
+
+create index idx_war_room_events_created on war_room_events(created_at desc);
+create index idx_war_room_events_agent_created on war_room_events(agent_id, created_at desc);
+create index idx_war_room_events_type_created on war_room_events(event_type, created_at);
+
+alter table war_room_events enable row level security;
+create policy "anon_read_war_room_events" on war_room_events for select using (true);
+
+-- The compatibility view from 20261019000008 is rebuilt on the new table.
+create view events as
+select id,
+       event_type as type,
+       source_id,
+       agent_id as agent,
+       description as message,
+       metadata,
+       created_at
+from war_room_events;
+
+create trigger events_insert_trigger
+  instead of insert on events
+  for each row
+  execute function insert_legacy_event();
+
+-- Realtime publishes inserts under the parent table's name.
+do $$
+begin
+  alter publication supabase_realtime set (publish_via_partition_root = true);
+  alter publication supabase_realtime add table war_room_events;
+exception
+  when duplicate_object or undefined_object then null;
+end;
+$$;
+
+-- ============================================================
+-- 2. Retention per event type
+-- ============================================================
+-- '*' is the retention of every type without its own row. Without a '*'
+-- row, unlisted types are kept forever.
+
+create table if not exists event_retention (
+  event_type text primary key,
+  keep interval not null
+);
+
+insert into event_retention (event_type, keep) values
+  ('heartbeat', '7 days'),
+  ('step_stale', '30 days'),
+  ('step_completed', '90 days'),
+  ('step_failed', '90 days'),
+  ('agent_action', '90 days'),
+  ('*', '365 days')
+on conflict (event_type) do nothing;
+
+alter table event_retention enable row level security;
+create policy "anon_read_event_retention" on event_retention for select using (true);
+
+-- prune_events(dry_run) -> setof (event_type, pruned)
+-- Month partitions older than the longest retention are dropped whole;
+-- remaining rows past their type's retention are deleted. No row newer
+-- than the shortest retention can be expired, so the delete also carries
+-- that constant cutoff, which lets the planner skip recent partitions
+-- instead of scanning all of them for the per-type cutoff. A type can
+-- appear once per pass, so callers sum by event_type. With dry_run
+-- nothing is removed and the counts are what would be.
+
+create or replace function prune_events(dry_run boolean default false)
+returns table (event_type text, pruned bigint)
+language plpgsql
+as $$
+#variable_conflict use_column
+declare
+  default_keep interval := (select r.keep from event_retention r where r.event_type = '*');
+  keep_from date := date_trunc('month', now() - (select max(r.keep) from event_retention r))::date;
+  expired_before timestamptz := now() - (select min(r.keep) from event_retention r);
+  dropped oid[] := '{}';
+  part record;
+begin
+  if default_keep is not null then
+    for part in
+      select c.oid, c.relname
+      from pg_inherits i
+      join pg_class c on c.oid = i.inhrelid
+      where i.inhparent = 'war_room_events'::regclass
+        and c.relname ~ '^war_room_events_[0-9]{4}_[0-9]{2}$'
+        and to_date(right(c.relname, 7), 'YYYY_MM') < keep_from
+      order by c.relname
+    loop
+      return query execute format(
+        'select event_type::text, count(*) from %I group by event_type', part.relname
+      );
+      dropped := dropped || part.oid;
+      if not dry_run then
+        execute format('drop table %I', part.relname);
+      end if;
+    end loop;
+  end if;
+
+  if dry_run then
+    return query
+      select e.event_type::text, count(*)
+      from war_room_events e
+      where e.tableoid <> all(dropped)
+        and e.created_at < expired_before
+        and e.created_at < now() - coalesce(
+          (select r.keep from event_retention r where r.event_type = e.event_type), default_keep)
+      group by e.event_type;
+  else
+    return query
+      with deleted as (
+        delete from war_room_events e
+        where e.created_at < expired_before
+          and e.created_at < now() - coalesce(
+          (select r.keep from event_retention r where r.event_type = e.event_type), default_keep)
+        returning e.event_type
+      )
+      select d.event_type::text, count(*) from deleted d group by d.event_type;
+  end if;
+end;
+$$;
+
+-- ============================================================
+-- 3. Hourly rollups
+-- ============================================================
+-- rollup_events(since, until) -> rollup rows written
+-- Counts events per (hour, event_type, agent_id) over the whole hours in
+-- [since, until). Re-running an hour is safe: counts only grow, so late
+-- (replayed) events raise them and hours already pruned keep theirs.
+
+create table if not exists event_rollups_hourly (
+  hour timestamptz not null,
+  event_type text not null,
+  agent_id text not null,
+  event_count int not null,
+  primary key (hour, event_type, agent_id)
+);
+
+create index if not exists idx_event_rollups_hourly_agent on event_rollups_hourly(agent_id, hour desc);
+
+alter table event_rollups_hourly enable row level security;
+create policy "anon_read_event_rollups_hourly" on event_rollups_hourly for select using (true);
+
+create or replace function rollup_events(since timestamptz, until timestamptz default now())
+returns integer
+language sql
+as $$
+  with counts as (
+    select date_trunc('hour', e.created_at) as hour,
+           e.event_type,
+           coalesce(e.agent_id, 'system') as agent_id,
+           count(*)::int as event_count
+    from war_room_events e
+    where e.created_at >= date_trunc('hour', since)
+      and e.created_at < date_trunc('hour', until)
+    group by 1, 2, 3
+  ),
+  upserted as (
+    insert into event_rollups_hourly as r (hour, event_type, agent_id, event_count)
+    select hour, event_type, agent_id, event_count from counts
+    on conflict (hour, event_type, agent_id) do update
+      set event_count = greatest(r.event_count, excluded.event_count)
+    returning 1
+  )
+  select count(*)::int from upserted;
+$$;
+
+grant execute on function ensure_event_partitions(int, timestamptz) to service_role;
+grant execute on function prune_events(boolean) to service_role;
+grant execute on function rollup_events(timestamptz, timestamptz) to service_role;
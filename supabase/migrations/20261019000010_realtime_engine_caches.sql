@@ -0,0 +1,22 @@
+-- Realtime for engine caches
+-- engine.realtime subscribes to postgres_changes for the tables behind the
+-- engine's in-process caches, but those tables were never added to the
+-- supabase_realtime publication, so no change was ever delivered and the
+-- caches only refreshed on their TTLs. Every table an engine module
+-- registers with realtime.on_change() must be published here.
+
+do $$
+begin
+  alter publication supabase_realtime add table agent_memory;
+exception
+  when duplicate_object or undefined_object then null;
+end;
+$$;
+
+do $$
+begin
+  alter publication supabase_realtime add table agent_relationships;
+exception
+  when duplicate_object or undefined_object then null;
+end;
+$$;
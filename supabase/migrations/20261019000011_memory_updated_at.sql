@@ -0,0 +1,42 @@
+-- agent_memory.updated_at for incremental sync
+-- The engine's local memory mirror synced on a created_at watermark, so it
+-- never saw a memory archived, merged or re-confidenced after it was first
+-- pulled: archived memories kept being retrieved until the mirror was
+-- rebuilt. Rows now carry a server-set updated_at, bumped by a trigger on
+-- every update, and the mirror syncs on that instead, dropping rows that
+-- are no longer active.
+
+-- ============================================================
+-- 1. Column (backfilled before the trigger exists)
+-- ============================================================
+
+alter table agent_memory add column if not exists updated_at timestamptz;
+
+update agent_memory
+set updated_at = coalesce(last_seen_at, created_at)
+where updated_at is null;
+
+alter table agent_memory alter column updated_at set default now();
+alter table agent_memory alter column updated_at set not null;
+
+create index if not exists idx_agent_memory_updated_at on agent_memory(updated_at);
+
+-- ============================================================
+-- 2. touch_agent_memory() trigger
+-- ============================================================
+
+create or replace function touch_agent_memory()
+returns trigger
+language plpgsql
+as $$
+begin
+  new.updated_at := now();
+  return new;
+end;
+$$;
+
+drop trigger if exists agent_memory_touch on agent_memory;
+create trigger agent_memory_touch
+  before update on agent_memory
+  for each row
+  execute function touch_agent_memory();
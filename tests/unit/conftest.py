@@ -0,0 +1,15 @@
+"""Shared fixtures for engine unit tests."""
+
+from unittest.mock import patch
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def event_journal(tmp_path):
+    """Journal emitted events to a per-test file instead of ~/.warroom."""
+    from engine.event_journal import EventJournal
+
+    journal = EventJournal(path=str(tmp_path / "events.jsonl"))
+    with patch("engine.events._journal", journal):
+        yield journal
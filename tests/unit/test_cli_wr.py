@@ -17,6 +17,7 @@ def _mock_supabase():
         tbl.eq.return_value = tbl
         tbl.order.return_value = tbl
         tbl.insert.return_value = tbl
+        tbl.upsert.return_value = tbl
         tbl.update.return_value = tbl
         tbl.execute.return_value = MagicMock(data=[], count=0)
         mock._tables[name] = tbl
@@ -286,7 +287,8 @@ class TestWrStart:
     @patch("engine.config.supabase")
     def test_start_task(self, mock_sb):
         mock_sb_client = _mock_supabase()
-        with patch("engine.config.supabase", mock_sb_client):
+        with patch("engine.config.supabase", mock_sb_client), \
+             patch("engine.events.supabase", mock_sb_client):
             runner = CliRunner()
             result = runner.invoke(cli, ["wr", "start", "42"])
 
@@ -298,9 +300,13 @@ class TestWrStart:
         tasks_tbl.update.assert_called_once()
         call_args = tasks_tbl.update.call_args[0][0]
         assert call_args["status"] == "in_progress"
-        # Verify event was logged
-        events_tbl = mock_sb_client._tables["events"]
-        events_tbl.insert.assert_called_once()
+        # Verify event was logged through the unified event pipeline
+        events_tbl = mock_sb_client._tables["war_room_events"]
+        events_tbl.upsert.assert_called_once()
+        [event] = events_tbl.upsert.call_args[0][0]
+        assert event["event_type"] == "user_request"
+        assert event["metadata"]["task_id"] == 42
+        assert "events" not in mock_sb_client._tables
 
 
 class TestWrDone:
@@ -430,14 +436,38 @@ class TestWrEvent:
     @patch("engine.config.supabase")
     def test_event_logs(self, mock_sb):
         mock_sb_client = _mock_supabase()
-        with patch("engine.config.supabase", mock_sb_client):
+        with patch("engine.config.supabase", mock_sb_client), \
+             patch("engine.events.supabase", mock_sb_client):
             runner = CliRunner()
             result = runner.invoke(cli, ["wr", "event", "Deploy completed"])
 
         assert result.exit_code == 0
         assert "Event logged" in result.output
         assert "Deploy completed" in result.output
-        events_tbl = mock_sb_client._tables["events"]
-        call_args = events_tbl.insert.call_args[0][0]
-        assert call_args["type"] == "user_request"
-        assert call_args["message"] == "Deploy completed"
+        events_tbl = mock_sb_client._tables["war_room_events"]
+        [call_args] = events_tbl.upsert.call_args[0][0]
+        assert call_args["event_type"] == "user_request"
+        assert call_args["agent_id"] == "sensei"
+        assert call_args["description"] == "Deploy completed"
+
+    @patch("engine.config.supabase")
+    def test_event_type_and_agent(self, mock_sb):
+        mock_sb_client = _mock_supabase()
+        with patch("engine.config.supabase", mock_sb_client), \
+             patch("engine.events.supabase", mock_sb_client):
+            runner = CliRunner()
+            result = runner.invoke(
+                cli, ["wr", "event", "Committed: fix", "--type", "agent_action", "--agent", "cc"]
+            )
+
+        assert result.exit_code == 0
+        [call_args] = mock_sb_client._tables["war_room_events"].upsert.call_args[0][0]
+        assert call_args["event_type"] == "agent_action"
+        assert call_args["agent_id"] == "cc"
+
+    @patch("engine.config.supabase")
+    def test_event_rejects_unknown_type(self, mock_sb):
+        result = CliRunner().invoke(cli, ["wr", "event", "Deploy", "--type", "deploy_done"])
+
+        assert result.exit_code == 2
+        assert "deploy_done" in result.output
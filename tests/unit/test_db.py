@@ -0,0 +1,253 @@
+"""Tests for engine.db — Instrumented Supabase client wrapper."""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+
+def _make_client(data=None):
+    """A MagicMock supabase client whose query chains return ``data``."""
+    client = MagicMock()
+    chain = MagicMock()
+    for method in ("select", "insert", "update", "upsert", "delete", "eq", "in_", "order", "limit"):
+        getattr(chain, method).return_value = chain
+    chain.execute.return_value = MagicMock(data=data if data is not None else [])
+    client.table.return_value = chain
+    client.rpc.return_value = chain
+    return client, chain
+
+
+# ---------------------------------------------------------------------------
+# Call recording
+# ---------------------------------------------------------------------------
+
+
+class TestInstrumentedClient:
+    """Test per-call recording through the wrapper."""
+
+    def setup_method(self):
+        from engine.db import clear_calls
+        clear_calls()
+
+    def test_passes_results_through(self):
+        from engine.db import InstrumentedClient
+
+        client, _ = _make_client([{"id": "m-1"}])
+        sb = InstrumentedClient(client)
+
+        result = sb.table("missions").select("*").eq("status", "queued").execute()
+
+        assert result.data == [{"id": "m-1"}]
+        client.table.assert_called_once_with("missions")
+
+    def test_records_table_operation_and_rows(self):
+        from engine.db import InstrumentedClient, recent_calls
+
+        client, _ = _make_client([{"id": "s-1"}, {"id": "s-2"}])
+        sb = InstrumentedClient(client)
+
+        sb.table("steps").select("*").eq("status", "queued").execute()
+
+        call = recent_calls()[-1]
+        assert call.table == "steps"
+        assert call.operation == "select"
+        assert call.rows == 2
+        assert call.seconds >= 0
+        assert call.response_bytes > 0
+
+    def test_records_write_payload_size(self):
+        from engine.db import InstrumentedClient, recent_calls
+
+        client, _ = _make_client([{"id": "e-1"}])
+        sb = InstrumentedClient(client)
+
+        sb.table("war_room_events").insert({"event_type": "heartbeat"}).execute()
+
+        call = recent_calls()[-1]
+        assert call.operation == "insert"
+        assert call.request_bytes == len('{"event_type": "heartbeat"}')
+
+    def test_records_rpc_calls(self):
+        from engine.db import InstrumentedClient, recent_calls
+
+        client, _ = _make_client({"id": "m-1"})
+        sb = InstrumentedClient(client)
+
+        sb.rpc("some_function", {"x": 1}).execute()
+
+        call = recent_calls()[-1]
+        assert call.table == "some_function"
+        assert call.operation == "rpc"
+        assert call.rows == 1
+
+    def test_attributes_call_to_engine_function(self):
+        from engine.db import InstrumentedClient, recent_calls
+        from engine.poller import detect_stale_steps
+
+        client, _ = _make_client([])
+        with patch("engine.poller.supabase", InstrumentedClient(client)):
+            detect_stale_steps()
+
+        assert recent_calls()[-1].caller == "engine.poller.detect_stale_steps"
+
+    def test_records_failed_calls(self):
+        from engine.db import InstrumentedClient, recent_calls
+
+        client, chain = _make_client()
+        chain.execute.side_effect = RuntimeError("connection reset")
+        sb = InstrumentedClient(client)
+
+        with pytest.raises(RuntimeError):
+            sb.table("steps").select("*").execute()
+
+        assert recent_calls()[-1].rows == 0
+
+    def test_feeds_supabase_metrics(self):
+        from engine import metrics
+        from engine.db import InstrumentedClient
+
+        client, _ = _make_client([])
+        sb = InstrumentedClient(client)
+        before = metrics.SUPABASE_REQUESTS_TOTAL.value(table="proposals", operation="update")
+
+        sb.table("proposals").update({"status": "approved"}).eq("id", "p-1").execute()
+
+        assert metrics.SUPABASE_REQUESTS_TOTAL.value(table="proposals", operation="update") == before + 1
+
+    def test_falsy_client_stays_falsy(self):
+        from engine.db import InstrumentedClient
+
+        assert not InstrumentedClient(None)
+
+    def test_summarize_groups_by_caller(self):
+        from engine.db import CallRecord, summarize
+
+        calls = [
+            CallRecord("steps", "select", "engine.executor.execute_next", 0.1, 1, 0, 10),
+            CallRecord("steps", "update", "engine.executor.execute_next", 0.2, 1, 5, 10),
+            CallRecord("missions", "select", "engine.mission.run_pending", 0.3, 0, 0, 2),
+        ]
+
+        summary = summarize(calls)
+
+        assert summary["engine.executor.execute_next"]["calls"] == 2
+        assert summary["engine.executor.execute_next"]["bytes"] == 25
+        assert summary["engine.mission.run_pending"]["calls"] == 1
+
+
+# ---------------------------------------------------------------------------
+# Round-trip budgets
+# ---------------------------------------------------------------------------
+
+
+class TestRoundTripBudget:
+    """Test declared round-trip budgets."""
+
+    def test_within_budget_passes(self):
+        from engine.db import InstrumentedClient, RoundTripBudget
+
+        client, _ = _make_client([])
+        sb = InstrumentedClient(client)
+
+        with RoundTripBudget(2) as budget:
+            sb.table("steps").select("*").execute()
+            sb.table("steps").select("*").execute()
+
+        assert budget.used == 2
+
+    def test_over_budget_raises(self):
+        from engine.db import InstrumentedClient, RoundTripBudget, RoundTripBudgetExceeded
+
+        client, _ = _make_client([])
+        sb = InstrumentedClient(client)
+
+        with pytest.raises(RoundTripBudgetExceeded, match="budget was 1"):
+            with RoundTripBudget(1):
+                sb.table("steps").select("*").execute()
+                sb.table("missions").select("*").execute()
+
+    def test_budget_scoped_to_caller(self):
+        from engine.db import InstrumentedClient, RoundTripBudget
+        from engine.poller import detect_stale_steps
+
+        client, _ = _make_client([])
+        sb = InstrumentedClient(client)
+
+        with patch("engine.poller.supabase", sb):
+            with RoundTripBudget(1, caller="engine.poller.detect_stale_steps"):
+                sb.table("steps").select("*").execute()  # attributed to this test
+                detect_stale_steps()
+
+    def test_works_as_decorator(self):
+        from engine.db import InstrumentedClient, RoundTripBudget, RoundTripBudgetExceeded
+
+        client, _ = _make_client([])
+        sb = InstrumentedClient(client)
+
+        @RoundTripBudget(0)
+        def chatty():
+            sb.table("steps").select("*").execute()
+
+        with pytest.raises(RoundTripBudgetExceeded):
+            chatty()
+
+    def test_poller_stale_scan_is_one_round_trip(self):
+        from engine.db import InstrumentedClient, RoundTripBudget
+        from engine.poller import detect_stale_steps
+
+        client, _ = _make_client([])
+        with patch("engine.poller.supabase", InstrumentedClient(client)):
+            with RoundTripBudget(1):
+                detect_stale_steps()
+
+
+# ---------------------------------------------------------------------------
+# Lazy client
+# ---------------------------------------------------------------------------
+
+
+class TestLazyClient:
+    """Test the build-on-first-use proxy installed by engine.config."""
+
+    def test_truthy_without_building(self):
+        from engine.db import LazyClient
+
+        factory = MagicMock()
+        sb = LazyClient(factory)
+
+        assert sb
+        assert not sb.built
+        factory.assert_not_called()
+
+    def test_builds_once_and_delegates(self):
+        from engine.db import LazyClient
+
+        client, _ = _make_client([{"id": "m-1"}])
+        factory = MagicMock(return_value=client)
+        sb = LazyClient(factory)
+
+        assert sb.table("missions").select("*").execute().data == [{"id": "m-1"}]
+        sb.rpc("rollup_events", {})
+        factory.assert_called_once()
+        assert sb.get() is client
+
+    def test_concurrent_first_use_builds_one_client(self):
+        import threading
+        import time
+        from engine.db import LazyClient
+
+        def slow_factory():
+            time.sleep(0.01)
+            return MagicMock()
+
+        factory = MagicMock(side_effect=slow_factory)
+        sb = LazyClient(factory)
+        seen = []
+        threads = [threading.Thread(target=lambda: seen.append(sb.get())) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        factory.assert_called_once()
+        assert all(c is seen[0] for c in seen)
@@ -0,0 +1,71 @@
+"""Tests for engine/digest.py — salience digests of step outputs."""
+
+from engine.digest import GAP_MARKER, MAX_SEGMENT_CHARS, digest, score, segment
+
+
+def _filler(count: int) -> list[str]:
+    return [f"Read file src/module_{i}.py and it looks fine." for i in range(count)]
+
+
+class TestSegment:
+    def test_splits_on_blank_lines(self):
+        assert segment("first\nstill first\n\nsecond\n\n\nthird") == [
+            "first\nstill first", "second", "third",
+        ]
+
+    def test_caps_segment_size(self):
+        segments = segment("y" * (MAX_SEGMENT_CHARS * 2 + 10))
+        assert [len(s) for s in segments] == [MAX_SEGMENT_CHARS, MAX_SEGMENT_CHARS, 10]
+
+    def test_long_block_split_on_lines(self):
+        block = "\n".join(["z" * 100] * 10)
+        segments = segment(block)
+        assert len(segments) == 2
+        assert all(len(s) <= MAX_SEGMENT_CHARS for s in segments)
+        assert "\n".join(segments) == block
+
+
+class TestScore:
+    def test_error_beats_plain_text(self):
+        assert score("Error: connection refused", 5, 10) > score("Looked around.", 5, 10)
+
+    def test_decision_and_diff_signals(self):
+        plain = score("Updated the file.", 5, 10)
+        assert score("Used a queue instead of polling because it is cheaper.", 5, 10) > plain
+        assert score("@@ -1,2 +1,2 @@\n-old\n+new", 5, 10) > plain
+
+    def test_tail_bias(self):
+        assert score("Same text.", 9, 10) > score("Same text.", 4, 10)
+
+
+class TestDigest:
+    def test_short_output_unchanged(self):
+        assert digest("short output", budget=100) == "short output"
+
+    def test_respects_budget(self):
+        output = "\n\n".join(_filler(200))
+        result = digest(output, budget=1000)
+        assert len(result) <= 1000
+        assert GAP_MARKER.strip() in result
+
+    def test_keeps_salient_segments_in_order(self):
+        paragraphs = _filler(100)
+        paragraphs[40] = "Decided to cache the token because refresh was slow."
+        paragraphs[70] = "Traceback (most recent call last): ValueError in parser"
+        paragraphs.append("## Summary\nParser fixed and tests pass.")
+        result = digest("\n\n".join(paragraphs), budget=600)
+
+        decision = result.index("Decided to cache")
+        error = result.index("ValueError in parser")
+        summary = result.index("## Summary")
+        assert decision < error < summary
+
+    def test_keeps_final_segment(self):
+        paragraphs = _filler(100) + ["All steps completed."]
+        result = digest("\n\n".join(paragraphs), budget=400)
+        assert result.endswith("All steps completed.")
+
+    def test_budget_smaller_than_segment_keeps_tail(self):
+        result = digest("a" * 300 + "END", budget=100)
+        assert len(result) <= 100
+        assert "END" in result
@@ -0,0 +1,171 @@
+"""Tests for engine.event_store — event partitions, retention and rollups."""
+
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock, patch
+
+from click.testing import CliRunner
+
+
+def _rpc_result(data):
+    sb = MagicMock()
+    sb.rpc.return_value.execute.return_value = MagicMock(data=data)
+    return sb
+
+
+class TestEnsurePartitions:
+
+    def test_calls_rpc_with_months_ahead(self):
+        from engine.event_store import ensure_partitions
+
+        sb = _rpc_result(1)
+        with patch("engine.event_store.supabase", sb):
+            assert ensure_partitions(3) == 1
+
+        sb.rpc.assert_called_once_with("ensure_event_partitions", {"months_ahead": 3})
+
+    def test_passes_since(self):
+        from engine.event_store import ensure_partitions
+
+        sb = _rpc_result(0)
+        since = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        with patch("engine.event_store.supabase", sb):
+            ensure_partitions(2, since=since)
+
+        assert sb.rpc.call_args[0][1]["since"] == since.isoformat()
+
+    @patch("engine.event_store.supabase", None)
+    def test_no_supabase(self):
+        from engine.event_store import ensure_partitions
+
+        assert ensure_partitions() == 0
+
+
+class TestRollups:
+
+    def test_rollup_events_range(self):
+        from engine.event_store import rollup_events
+
+        sb = _rpc_result(12)
+        since = datetime(2026, 10, 1, tzinfo=timezone.utc)
+        until = since + timedelta(hours=6)
+        with patch("engine.event_store.supabase", sb):
+            assert rollup_events(since, until) == 12
+
+        sb.rpc.assert_called_once_with(
+            "rollup_events", {"since": since.isoformat(), "until": until.isoformat()}
+        )
+
+    def test_backfill_chunks_by_day(self):
+        from engine.event_store import backfill_rollups
+
+        since = datetime(2026, 10, 1, tzinfo=timezone.utc)
+        until = since + timedelta(days=2, hours=12)
+        with patch("engine.event_store.rollup_events", return_value=5) as rollup:
+            assert backfill_rollups(since, until) == 15
+
+        ranges = [c.args for c in rollup.call_args_list]
+        assert ranges[0] == (since, since + timedelta(days=1))
+        assert ranges[-1] == (since + timedelta(days=2), until)
+
+    def test_recent_rollup_uses_lookback(self):
+        from engine.event_store import rollup_recent_events
+
+        sb = MagicMock()
+        sb.table.return_value.select.return_value.order.return_value.limit.return_value.execute.return_value = (
+            MagicMock(data=[{"hour": datetime.now(timezone.utc).isoformat()}])
+        )
+        with patch("engine.event_store.supabase", sb), \
+             patch("engine.event_store.ensure_partitions") as ensure, \
+             patch("engine.event_store.rollup_events", return_value=4) as rollup:
+            assert rollup_recent_events(lookback_hours=6) == 4
+
+        ensure.assert_called_once()
+        since = rollup.call_args[0][0]
+        assert timedelta(hours=5, minutes=59) < datetime.now(timezone.utc) - since < timedelta(hours=6, minutes=1)
+
+    def test_recent_rollup_resumes_from_latest_hour(self):
+        from engine.event_store import rollup_recent_events
+
+        latest = datetime(2026, 10, 1, 3, tzinfo=timezone.utc)
+        sb = MagicMock()
+        sb.table.return_value.select.return_value.order.return_value.limit.return_value.execute.return_value = (
+            MagicMock(data=[{"hour": "2026-10-01T03:00:00Z"}])
+        )
+        with patch("engine.event_store.supabase", sb), \
+             patch("engine.event_store.ensure_partitions"), \
+             patch("engine.event_store.rollup_events", return_value=0) as rollup:
+            rollup_recent_events(lookback_hours=6)
+
+        assert rollup.call_args[0][0] == latest
+
+
+class TestPruneEvents:
+
+    def test_sums_rows_per_type(self):
+        from engine.event_store import prune_events
+
+        sb = _rpc_result([
+            {"event_type": "heartbeat", "pruned": 100},
+            {"event_type": "step_completed", "pruned": 3},
+            {"event_type": "heartbeat", "pruned": 20},
+        ])
+        with patch("engine.event_store.supabase", sb):
+            pruned = prune_events()
+
+        assert pruned == {"heartbeat": 120, "step_completed": 3}
+        sb.rpc.assert_called_once_with("prune_events", {"dry_run": False})
+
+    def test_dry_run(self):
+        from engine.event_store import prune_events
+
+        sb = _rpc_result([])
+        with patch("engine.event_store.supabase", sb):
+            assert prune_events(dry_run=True) == {}
+
+        sb.rpc.assert_called_once_with("prune_events", {"dry_run": True})
+
+    def test_registered_as_maintenance_jobs(self):
+        from engine.event_store import prune_events, rollup_recent_events
+        from engine.poller import maintenance_jobs
+
+        jobs = {name: job for name, _, job in maintenance_jobs()}
+        assert jobs["event_rollup"] is rollup_recent_events
+        assert jobs["event_prune"] is prune_events
+
+
+class TestEventsCli:
+
+    def test_prune_reports_counts(self):
+        from cli import cli
+
+        with patch("engine.config.supabase", MagicMock()), \
+             patch("engine.event_store.prune_events", return_value={"heartbeat": 7}) as prune:
+            result = CliRunner().invoke(cli, ["events", "prune", "--dry-run"])
+
+        assert result.exit_code == 0
+        prune.assert_called_once_with(dry_run=True)
+        assert "heartbeat" in result.output
+        assert "Would prune 7 events" in result.output
+
+    def test_backfill_passes_utc_range(self):
+        from cli import cli
+
+        with patch("engine.config.supabase", MagicMock()), \
+             patch("engine.event_store.backfill_rollups", return_value=42) as backfill:
+            result = CliRunner().invoke(
+                cli, ["events", "backfill", "--since", "2026-09-01", "--until", "2026-10-01"]
+            )
+
+        assert result.exit_code == 0
+        assert backfill.call_args[0] == (
+            datetime(2026, 9, 1, tzinfo=timezone.utc),
+            datetime(2026, 10, 1, tzinfo=timezone.utc),
+        )
+        assert "Wrote 42" in result.output
+
+    @patch("engine.config.supabase", None)
+    def test_no_supabase(self):
+        from cli import cli
+
+        result = CliRunner().invoke(cli, ["events", "prune"])
+        assert "Supabase not configured" in result.output
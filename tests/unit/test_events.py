@@ -1,28 +1,36 @@
 """Tests for engine.events — Event emitter for Shogunate Engine."""
 
+import uuid
 from datetime import datetime, timezone
 from unittest.mock import MagicMock, patch
 
 import pytest
 
 
+def _api_error(code):
+    """An exception shaped like postgrest's APIError, carrying a response code."""
+    error = Exception(code)
+    error.code = code
+    return error
+
+
 # ---------------------------------------------------------------------------
 # emit() — table name and column mapping
 # ---------------------------------------------------------------------------
 
 
 class TestEmitTableName:
-    """Verify emit() writes to the correct Supabase table."""
+    """Verify emit(sync=True) writes to the correct Supabase table."""
 
     @patch("engine.events.supabase")
     def test_writes_to_war_room_events_table(self, mock_sb):
         from engine.events import emit
 
-        mock_sb.table.return_value.insert.return_value.execute.return_value = MagicMock(
+        mock_sb.table.return_value.upsert.return_value.execute.return_value = MagicMock(
             data=[{"id": "evt-1", "event_type": "step_completed"}]
         )
 
-        emit("step_completed", {"agent": "ed", "message": "Done"})
+        emit("step_completed", {"agent": "ed", "message": "Done"}, sync=True)
 
         mock_sb.table.assert_called_once_with("war_room_events")
 
@@ -30,69 +38,69 @@ class TestEmitTableName:
     def test_does_not_write_to_ops_agent_events(self, mock_sb):
         from engine.events import emit
 
-        mock_sb.table.return_value.insert.return_value.execute.return_value = MagicMock(
+        mock_sb.table.return_value.upsert.return_value.execute.return_value = MagicMock(
             data=[{"id": "evt-1"}]
         )
 
-        emit("step_completed", {"agent": "ed"})
+        emit("step_completed", {"agent": "ed"}, sync=True)
 
         table_arg = mock_sb.table.call_args[0][0]
         assert table_arg != "ops_agent_events"
 
 
 class TestEmitColumnMapping:
-    """Verify emit() maps payload to war_room_events columns correctly."""
+    """Verify emit(sync=True) maps payload to war_room_events columns correctly."""
 
     @patch("engine.events.supabase")
     def test_agent_id_from_agent_key(self, mock_sb):
         from engine.events import emit
 
-        mock_sb.table.return_value.insert.return_value.execute.return_value = MagicMock(
+        mock_sb.table.return_value.upsert.return_value.execute.return_value = MagicMock(
             data=[{}]
         )
 
-        emit("step_completed", {"agent": "ed", "message": "Done"})
+        emit("step_completed", {"agent": "ed", "message": "Done"}, sync=True)
 
-        insert_arg = mock_sb.table.return_value.insert.call_args[0][0]
+        [insert_arg] = mock_sb.table.return_value.upsert.call_args[0][0]
         assert insert_arg["agent_id"] == "ed"
 
     @patch("engine.events.supabase")
     def test_agent_id_from_assigned_to_key(self, mock_sb):
         from engine.events import emit
 
-        mock_sb.table.return_value.insert.return_value.execute.return_value = MagicMock(
+        mock_sb.table.return_value.upsert.return_value.execute.return_value = MagicMock(
             data=[{}]
         )
 
-        emit("step_completed", {"assigned_to": "light", "message": "Reviewed"})
+        emit("step_completed", {"assigned_to": "light", "message": "Reviewed"}, sync=True)
 
-        insert_arg = mock_sb.table.return_value.insert.call_args[0][0]
+        [insert_arg] = mock_sb.table.return_value.upsert.call_args[0][0]
         assert insert_arg["agent_id"] == "light"
 
     @patch("engine.events.supabase")
     def test_agent_id_from_daimyo_key(self, mock_sb):
         from engine.events import emit
 
-        mock_sb.table.return_value.insert.return_value.execute.return_value = MagicMock(
+        mock_sb.table.return_value.upsert.return_value.execute.return_value = MagicMock(
             data=[{}]
         )
 
-        emit("mission_started", {"daimyo": "toji"})
+        emit("mission_started", {"daimyo": "toji"}, sync=True)
 
-        insert_arg = mock_sb.table.return_value.insert.call_args[0][0]
+        [insert_arg] = mock_sb.table.return_value.upsert.call_args[0][0]
         assert insert_arg["agent_id"] == "toji"
 
     @patch("engine.events.supabase")
     def test_agent_id_defaults_to_system(self, mock_sb):
         from engine.events import emit
 
-        mock_sb.table.return_value.insert.return_value.execute.return_value = MagicMock(
+        mock_sb.table.return_value.upsert.return_value.execute.return_value = MagicMock(
             data=[{}]
         )
 
-        emit("system_event", {"message": "No agent info"})
+        emit("agent_action", {"message": "No agent info"}, sync=True)
 
-        insert_arg = mock_sb.table.return_value.insert.call_args[0][0]
+        [insert_arg] = mock_sb.table.return_value.upsert.call_args[0][0]
         assert insert_arg["agent_id"] == "system"
 
     @patch("engine.events.supabase")
@@ -100,150 +108,208 @@ class TestEmitColumnMapping:
         """agent takes priority over assigned_to which takes priority over daimyo."""
         from engine.events import emit
 
-        mock_sb.table.return_value.insert.return_value.execute.return_value = MagicMock(
+        mock_sb.table.return_value.upsert.return_value.execute.return_value = MagicMock(
             data=[{}]
         )
 
-        emit("test", {"agent": "ed", "assigned_to": "light", "daimyo": "toji"})
+        emit("agent_action", {"agent": "ed", "assigned_to": "light", "daimyo": "toji"}, sync=True)
 
-        insert_arg = mock_sb.table.return_value.insert.call_args[0][0]
+        [insert_arg] = mock_sb.table.return_value.upsert.call_args[0][0]
         assert insert_arg["agent_id"] == "ed"
 
     @patch("engine.events.supabase")
     def test_title_from_payload(self, mock_sb):
         from engine.events import emit
 
-        mock_sb.table.return_value.insert.return_value.execute.return_value = MagicMock(
+        mock_sb.table.return_value.upsert.return_value.execute.return_value = MagicMock(
             data=[{}]
         )
 
-        emit("step_completed", {"title": "Custom Title", "agent": "ed"})
+        emit("step_completed", {"title": "Custom Title", "agent": "ed"}, sync=True)
 
-        insert_arg = mock_sb.table.return_value.insert.call_args[0][0]
+        [insert_arg] = mock_sb.table.return_value.upsert.call_args[0][0]
         assert insert_arg["title"] == "Custom Title"
 
     @patch("engine.events.supabase")
     def test_title_defaults_from_event_type(self, mock_sb):
         from engine.events import emit
 
-        mock_sb.table.return_value.insert.return_value.execute.return_value = MagicMock(
+        mock_sb.table.return_value.upsert.return_value.execute.return_value = MagicMock(
             data=[{}]
         )
 
-        emit("step_completed", {"agent": "ed"})
+        emit("step_completed", {"agent": "ed"}, sync=True)
 
-        insert_arg = mock_sb.table.return_value.insert.call_args[0][0]
+        [insert_arg] = mock_sb.table.return_value.upsert.call_args[0][0]
         assert insert_arg["title"] == "Step Completed"
 
     @patch("engine.events.supabase")
     def test_description_from_message_key(self, mock_sb):
         from engine.events import emit
 
-        mock_sb.table.return_value.insert.return_value.execute.return_value = MagicMock(
+        mock_sb.table.return_value.upsert.return_value.execute.return_value = MagicMock(
             data=[{}]
         )
 
-        emit("step_completed", {"message": "Task finished", "agent": "ed"})
+        emit("step_completed", {"message": "Task finished", "agent": "ed"}, sync=True)
 
-        insert_arg = mock_sb.table.return_value.insert.call_args[0][0]
+        [insert_arg] = mock_sb.table.return_value.upsert.call_args[0][0]
         assert insert_arg["description"] == "Task finished"
 
     @patch("engine.events.supabase")
     def test_description_from_description_key(self, mock_sb):
         from engine.events import emit
 
-        mock_sb.table.return_value.insert.return_value.execute.return_value = MagicMock(
+        mock_sb.table.return_value.upsert.return_value.execute.return_value = MagicMock(
             data=[{}]
         )
 
-        emit("step_completed", {"description": "Desc text", "agent": "ed"})
+        emit("step_completed", {"description": "Desc text", "agent": "ed"}, sync=True)
 
-        insert_arg = mock_sb.table.return_value.insert.call_args[0][0]
+        [insert_arg] = mock_sb.table.return_value.upsert.call_args[0][0]
         assert insert_arg["description"] == "Desc text"
 
     @patch("engine.events.supabase")
     def test_description_from_error_key(self, mock_sb):
         from engine.events import emit
 
-        mock_sb.table.return_value.insert.return_value.execute.return_value = MagicMock(
+        mock_sb.table.return_value.upsert.return_value.execute.return_value = MagicMock(
             data=[{}]
         )
 
-        emit("step_failed", {"error": "Timeout occurred", "agent": "ed"})
+        emit("step_failed", {"error": "Timeout occurred", "agent": "ed"}, sync=True)
 
-        insert_arg = mock_sb.table.return_value.insert.call_args[0][0]
+        [insert_arg] = mock_sb.table.return_value.upsert.call_args[0][0]
         assert insert_arg["description"] == "Timeout occurred"
 
     @patch("engine.events.supabase")
     def test_description_defaults_to_empty_string(self, mock_sb):
         from engine.events import emit
 
-        mock_sb.table.return_value.insert.return_value.execute.return_value = MagicMock(
+        mock_sb.table.return_value.upsert.return_value.execute.return_value = MagicMock(
             data=[{}]
         )
 
-        emit("step_completed", {"agent": "ed"})
+        emit("step_completed", {"agent": "ed"}, sync=True)
 
-        insert_arg = mock_sb.table.return_value.insert.call_args[0][0]
+        [insert_arg] = mock_sb.table.return_value.upsert.call_args[0][0]
         assert insert_arg["description"] == ""
 
     @patch("engine.events.supabase")
-    def test_metadata_contains_full_payload(self, mock_sb):
+    def test_metadata_contains_full_payload_for_unprojected_type(self, mock_sb):
         from engine.events import emit
 
-        mock_sb.table.return_value.insert.return_value.execute.return_value = MagicMock(
+        mock_sb.table.return_value.upsert.return_value.execute.return_value = MagicMock(
             data=[{}]
         )
 
         payload = {"agent": "ed", "message": "Done", "extra_field": 42}
-        emit("step_completed", payload)
+        emit("agent_action", payload, sync=True)
 
-        insert_arg = mock_sb.table.return_value.insert.call_args[0][0]
+        [insert_arg] = mock_sb.table.return_value.upsert.call_args[0][0]
         assert insert_arg["metadata"] == payload
 
     @patch("engine.events.supabase")
     def test_no_payload_column_in_insert(self, mock_sb):
         from engine.events import emit
 
-        mock_sb.table.return_value.insert.return_value.execute.return_value = MagicMock(
+        mock_sb.table.return_value.upsert.return_value.execute.return_value = MagicMock(
             data=[{}]
         )
 
-        emit("step_completed", {"agent": "ed"})
+        emit("step_completed", {"agent": "ed"}, sync=True)
 
-        insert_arg = mock_sb.table.return_value.insert.call_args[0][0]
+        [insert_arg] = mock_sb.table.return_value.upsert.call_args[0][0]
         assert "payload" not in insert_arg
 
     @patch("engine.events.supabase")
     def test_event_type_preserved(self, mock_sb):
         from engine.events import emit
 
-        mock_sb.table.return_value.insert.return_value.execute.return_value = MagicMock(
+        mock_sb.table.return_value.upsert.return_value.execute.return_value = MagicMock(
             data=[{}]
         )
 
-        emit("mission_completed", {"agent": "ed"})
+        emit("mission_completed", {"agent": "ed"}, sync=True)
 
-        insert_arg = mock_sb.table.return_value.insert.call_args[0][0]
+        [insert_arg] = mock_sb.table.return_value.upsert.call_args[0][0]
         assert insert_arg["event_type"] == "mission_completed"
 
     @patch("engine.events.supabase")
     def test_created_at_is_iso_utc(self, mock_sb):
         from engine.events import emit
 
-        mock_sb.table.return_value.insert.return_value.execute.return_value = MagicMock(
+        mock_sb.table.return_value.upsert.return_value.execute.return_value = MagicMock(
             data=[{}]
         )
 
-        emit("step_completed", {"agent": "ed"})
+        emit("step_completed", {"agent": "ed"}, sync=True)
 
-        insert_arg = mock_sb.table.return_value.insert.call_args[0][0]
+        [insert_arg] = mock_sb.table.return_value.upsert.call_args[0][0]
         assert "created_at" in insert_arg
         # Should parse as valid ISO datetime
         dt = datetime.fromisoformat(insert_arg["created_at"])
         assert dt.tzinfo is not None
 
 
+class TestPayloadShaping:
+    """Verify per-type projections and size caps on event metadata."""
+
+    def test_projection_drops_unlisted_fields(self):
+        from engine.events import shape_payload
+
+        shaped = shape_payload("step_completed", {
+            "step_id": "s1", "mission_id": "m1", "status": "completed",
+            "output": "ok", "error": None, "debug": {"x": 1},
+        })
+
+        assert shaped == {"step_id": "s1", "mission_id": "m1", "status": "completed", "output": "ok"}
+
+    def test_large_string_replaced_by_preview(self):
+        from engine.events import shape_payload
+
+        output = "start " + "x" * 10_000 + " end"
+        with patch("engine.events.EVENT_FIELD_MAX_CHARS", 100):
+            shaped = shape_payload("step_completed", {"step_id": "s1", "output": output})
+
+        assert "output" not in shaped
+        assert shaped["output_chars"] == len(output)
+        assert len(shaped["output_preview"]) == 100
+        assert shaped["output_preview"].startswith("start ")
+        assert shaped["output_preview"].endswith(" end")
+        assert shaped["step_id"] == "s1"
+
+    def test_large_nested_value_replaced_by_preview(self):
+        from engine.events import shape_payload
+
+        with patch("engine.events.EVENT_FIELD_MAX_CHARS", 50):
+            shaped = shape_payload("custom", {"rows": list(range(100)), "count": 100})
+
+        assert shaped["rows_chars"] > 50
+        assert shaped["rows_preview"].startswith("[0, 1")
+        assert shaped["count"] == 100
+
+    def test_zero_cap_disables_previews(self):
+        from engine.events import shape_payload
+
+        with patch("engine.events.EVENT_FIELD_MAX_CHARS", 0):
+            assert shape_payload("custom", {"blob": "y" * 5000}) == {"blob": "y" * 5000}
+
+    @patch("engine.events.supabase")
+    def test_description_from_long_error_is_capped(self, mock_sb):
+        from engine.events import emit
+
+        mock_sb.table.return_value.upsert.return_value.execute.return_value = MagicMock(data=[{}])
+
+        with patch("engine.events.EVENT_FIELD_MAX_CHARS", 200):
+            emit("step_failed", {"step_id": "s1", "error": "Traceback\n" + "frame\n" * 1000 + "KeyError: 'x'"}, sync=True)
+
+        [insert_arg] = mock_sb.table.return_value.upsert.call_args[0][0]
+        assert len(insert_arg["description"]) == 200
+        assert insert_arg["description"].endswith("KeyError: 'x'")
+        assert insert_arg["metadata"]["error_chars"] > 200
+
+
 class TestEmitWithoutSupabase:
     """Verify emit() behavior when Supabase is not configured."""
 
@@ -251,13 +317,337 @@ class TestEmitWithoutSupabase:
     def test_returns_event_dict_when_supabase_unavailable(self):
         from engine.events import emit
 
-        result = emit("test_event", {"agent": "ed", "message": "Hello"})
+        result = emit("agent_action", {"agent": "ed", "message": "Hello"})
 
-        assert result["event_type"] == "test_event"
+        assert result["event_type"] == "agent_action"
         assert result["agent_id"] == "ed"
         assert result["metadata"] == {"agent": "ed", "message": "Hello"}
         assert "payload" not in result
 
+    @patch("engine.events.supabase", None)
+    def test_unknown_event_type_is_rejected(self, event_journal):
+        from engine.events import emit
+
+        with pytest.raises(ValueError, match="system_event"):
+            emit("system_event", {"agent": "ed"})
+
+        assert event_journal.pending() == []
+
+
+class TestEventBuffer:
+    """Verify buffered emission, batching and the drop policy."""
+
+    @patch("engine.events.supabase")
+    def test_buffered_emit_does_not_insert_inline(self, mock_sb):
+        from engine.events import EventBuffer, emit
+
+        buffer = EventBuffer(interval=60)
+        buffer._start = lambda: None
+
+        with patch("engine.events._buffer", buffer):
+            result = emit("heartbeat", {"agent": "system"})
+
+            assert result["event_type"] == "heartbeat"
+            mock_sb.table.return_value.upsert.assert_not_called()
+            assert len(buffer) == 1
+
+    @patch("engine.events.supabase")
+    def test_flush_inserts_queued_events_in_one_batch(self, mock_sb):
+        from engine.events import EventBuffer, emit, flush_events
+
+        mock_sb.table.return_value.upsert.return_value.execute.return_value = MagicMock(data=[{}, {}])
+        buffer = EventBuffer(interval=60)
+        buffer._start = lambda: None  # no writer thread: drain only via flush
+
+        with patch("engine.events._buffer", buffer):
+            emit("step_completed", {"agent": "ed"})
+            emit("step_completed", {"agent": "light"})
+            flush_events()
+
+        mock_sb.table.assert_called_with("war_room_events")
+        inserted = mock_sb.table.return_value.upsert.call_args[0][0]
+        assert [e["agent_id"] for e in inserted] == ["ed", "light"]
+        assert len(buffer) == 0
+
+    @patch("engine.events.supabase")
+    def test_writer_thread_batches_events(self, mock_sb):
+        import time
+        from engine.events import EventBuffer
+
+        mock_sb.table.return_value.upsert.return_value.execute.return_value = MagicMock(data=[])
+        buffer = EventBuffer(batch_size=3, interval=5)
+
+        for i in range(3):
+            buffer.put(uuid.uuid4().hex, {"event_type": "heartbeat", "n": i})
+        deadline = time.monotonic() + 2
+        while not mock_sb.table.return_value.upsert.called and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        inserted = mock_sb.table.return_value.upsert.call_args[0][0]
+        assert [e["n"] for e in inserted] == [0, 1, 2]
+
+    @patch("engine.events.supabase")
+    def test_flush_waits_for_batch_the_writer_dequeued(self, mock_sb):
+        import threading
+        import time
+        from engine.events import EventBuffer, _insert_events
+
+        buffer = EventBuffer(interval=60)
+        buffer._start = lambda: None
+        buffer.put(uuid.uuid4().hex, {"event_type": "heartbeat"})
+        in_flight = [buffer._queue.get()]  # dequeued by the writer before it takes the lock
+
+        def writer():
+            time.sleep(0.2)
+            _insert_events(in_flight)
+            buffer._done(in_flight)
+
+        threading.Thread(target=writer).start()
+        buffer.flush()
+
+        mock_sb.table.return_value.upsert.assert_called_once()
+
+    @patch("engine.events.supabase")
+    def test_failed_batch_falls_back_to_single_rows_in_order(self, mock_sb):
+        from engine.events import _insert_events
+
+        mock_sb.table.return_value.upsert.return_value.execute.side_effect = [
+            Exception("batch rejected"),
+            MagicMock(data=[{"id": "e1"}]),
+            Exception("bad row"),
+        ]
+
+        entries = [(uuid.uuid4().hex, {"event_type": t}) for t in "abc"]
+
+        stored = _insert_events(entries)
+
+        assert stored == [entries[0][0]]
+        # The row after the failure is not attempted, so order is preserved
+        assert mock_sb.table.return_value.upsert.return_value.execute.call_count == 3
+
+    def test_full_queue_drops_and_counts(self):
+        from engine import metrics
+        from engine.events import EventBuffer
+
+        buffer = EventBuffer(max_size=1, enqueue_timeout=0.01)
+        buffer._start = lambda: None
+        before = metrics.EVENTS_DROPPED_TOTAL.value(event_type="heartbeat")
+
+        assert buffer.put("j1", {"event_type": "heartbeat"}) is True
+        assert buffer.put("j2", {"event_type": "heartbeat"}) is False
+        assert metrics.EVENTS_DROPPED_TOTAL.value(event_type="heartbeat") == before + 1
+
+    @patch("engine.events.supabase")
+    def test_sync_emit_bypasses_buffer(self, mock_sb):
+        from engine.events import EventBuffer, emit
+
+        mock_sb.table.return_value.upsert.return_value.execute.return_value = MagicMock(
+            data=[{"id": "evt-1"}]
+        )
+
+        with patch("engine.events._buffer", EventBuffer(interval=60)) as buffer:
+            result = emit("mission_completed", {"agent": "ed"}, sync=True)
+
+        assert mock_sb.table.return_value.upsert.call_args[0][0] == [result]
+        assert len(buffer) == 0
+
+
+class TestEventJournal:
+    """Verify write-through journaling and ordered replay."""
+
+    @patch("engine.events.supabase", None)
+    def test_event_journaled_without_supabase(self, event_journal):
+        from engine.events import emit
+
+        emit("heartbeat", {"agent": "poller"})
+
+        pending = event_journal.pending()
+        assert [e["event"]["event_type"] for e in pending] == ["heartbeat"]
+
+    @patch("engine.events.supabase")
+    def test_sync_insert_acknowledges_entry(self, mock_sb, event_journal):
+        from engine.events import emit
+
+        mock_sb.table.return_value.upsert.return_value.execute.return_value = MagicMock(data=[{"id": "evt-1"}])
+
+        emit("mission_completed", {"agent": "ed"}, sync=True)
+
+        assert event_journal.pending() == []
+
+    @patch("engine.events.supabase")
+    def test_failed_sync_insert_stays_pending(self, mock_sb, event_journal):
+        from engine.events import emit
+
+        mock_sb.table.return_value.upsert.return_value.execute.side_effect = Exception("offline")
+
+        result = emit("mission_failed", {"agent": "ed"}, sync=True)
+
+        assert result["event_type"] == "mission_failed"
+        assert len(event_journal.pending()) == 1
+
+    @patch("engine.events.supabase")
+    def test_flush_acknowledges_buffered_events(self, mock_sb, event_journal):
+        from engine.events import EventBuffer, emit, flush_events
+
+        mock_sb.table.return_value.upsert.return_value.execute.return_value = MagicMock(data=[{}])
+        buffer = EventBuffer(interval=60)
+        buffer._start = lambda: None
+
+        with patch("engine.events._buffer", buffer):
+            emit("step_completed", {"agent": "ed"})
+            assert len(event_journal.pending()) == 1
+            assert flush_events() == 1
+
+        assert event_journal.pending() == []
+
+    @patch("engine.events.supabase")
+    def test_replay_sends_pending_in_order_and_compacts(self, mock_sb, event_journal):
+        from engine.events import replay_journal
+
+        for n in range(5):
+            event_journal.append({"event_type": "heartbeat", "n": n})
+        mock_sb.table.return_value.upsert.return_value.execute.return_value = MagicMock(data=[])
+
+        with patch("engine.events.EVENT_REPLAY_GRACE", 0):
+            assert replay_journal(batch_size=2) == 5
+
+        batches = [c[0][0] for c in mock_sb.table.return_value.upsert.call_args_list]
+        assert [[e["n"] for e in batch] for batch in batches] == [[0, 1], [2, 3], [4]]
+        assert open(event_journal.path).read() == ""
+
+    @patch("engine.events.supabase")
+    def test_replay_stops_at_failure_and_keeps_rest(self, mock_sb, event_journal):
+        from engine.events import replay_journal
+
+        for n in range(4):
+            event_journal.append({"event_type": "heartbeat", "n": n})
+        mock_sb.table.return_value.upsert.return_value.execute.side_effect = [
+            MagicMock(data=[]),          # batch [0, 1]
+            Exception("offline"),        # batch [2, 3]
+            Exception("offline"),        # row 2
+        ]
+
+        with patch("engine.events.EVENT_REPLAY_GRACE", 0):
+            assert replay_journal(batch_size=2) == 2
+
+        assert [e["event"]["n"] for e in event_journal.pending()] == [2, 3]
+
+    @patch("engine.events.supabase")
+    def test_replay_skips_recent_entries(self, mock_sb, event_journal):
+        from engine.events import replay_journal
+
+        event_journal.append({"event_type": "heartbeat"})
+
+        with patch("engine.events.EVENT_REPLAY_GRACE", 60):
+            assert replay_journal() == 0
+
+        mock_sb.table.return_value.upsert.assert_not_called()
+        assert len(event_journal.pending()) == 1
+
+    @patch("engine.events.supabase")
+    def test_rows_are_upserted_under_journal_id(self, mock_sb, event_journal):
+        from engine.events import emit
+
+        event = emit("mission_completed", {"agent": "ed"}, sync=True)
+
+        upsert = mock_sb.table.return_value.upsert
+        assert upsert.call_args[1] == {"on_conflict": "id,created_at", "ignore_duplicates": True}
+        assert uuid.UUID(event["id"]).hex in open(event_journal.path).read()
+
+    @patch("engine.events.supabase")
+    def test_legacy_entry_gets_journal_id_as_row_id(self, mock_sb, event_journal):
+        from engine.events import replay_journal
+
+        jid = event_journal.append({"event_type": "heartbeat"})
+
+        with patch("engine.events.EVENT_REPLAY_GRACE", 0):
+            replay_journal()
+
+        rows = mock_sb.table.return_value.upsert.call_args[0][0]
+        assert rows[0]["id"] == str(uuid.UUID(jid))
+
+    @patch("engine.events.supabase")
+    def test_data_error_is_dead_lettered_and_replay_continues(self, mock_sb, event_journal):
+        import json
+        from engine.events import replay_journal
+
+        for n in range(3):
+            event_journal.append({"event_type": "heartbeat", "n": n})
+        mock_sb.table.return_value.upsert.return_value.execute.side_effect = [
+            _api_error("22P02"),   # batch
+            MagicMock(data=[]),    # row 0
+            _api_error("22P02"),   # row 1
+            MagicMock(data=[]),    # row 2
+        ]
+
+        with patch("engine.events.EVENT_REPLAY_GRACE", 0):
+            assert replay_journal() == 3
+
+        assert event_journal.pending() == []
+        dead = [json.loads(line) for line in open(event_journal.dead_path)]
+        assert [(d["event"]["n"], d["error"]) for d in dead] == [(1, "22P02")]
+
+    @patch("engine.events.supabase")
+    def test_dead_lettered_after_max_attempts(self, mock_sb, event_journal):
+        from engine.events import replay_journal
+
+        event_journal.append({"event_type": "heartbeat"})
+        mock_sb.table.return_value.upsert.return_value.execute.side_effect = _api_error("500")
+
+        with patch("engine.events.EVENT_REPLAY_GRACE", 0), \
+             patch("engine.events.EVENT_REPLAY_MAX_ATTEMPTS", 3):
+            assert replay_journal() == 0
+            assert event_journal.pending()[0]["attempts"] == 1
+            replay_journal()
+            assert event_journal.pending()[0]["attempts"] == 2
+            assert replay_journal() == 1
+
+        assert event_journal.pending() == []
+
+    @patch("engine.events.supabase")
+    def test_outage_does_not_count_attempts(self, mock_sb, event_journal):
+        from engine.events import replay_journal
+
+        event_journal.append({"event_type": "heartbeat"})
+        mock_sb.table.return_value.upsert.return_value.execute.side_effect = ConnectionError("offline")
+
+        with patch("engine.events.EVENT_REPLAY_GRACE", 0), \
+             patch("engine.events.EVENT_REPLAY_MAX_ATTEMPTS", 1):
+            for _ in range(3):
+                assert replay_journal() == 0
+
+        assert event_journal.pending()[0]["attempts"] == 0
+
+    def test_ack_compacts_large_journal(self, event_journal):
+        import os
+
+        with patch("engine.event_journal.JOURNAL_COMPACT_BYTES", 2000):
+            for n in range(50):
+                event_journal.ack([event_journal.append({"event_type": "heartbeat", "n": n})])
+            pending = event_journal.append({"event_type": "heartbeat", "n": 50})
+
+        assert os.path.getsize(event_journal.path) <= 2000
+        assert [e["jid"] for e in event_journal.pending()] == [pending]
+
+    def test_torn_line_is_ignored(self, event_journal):
+        event_journal.append({"event_type": "a"})
+        with open(event_journal.path, "a") as f:
+            f.write('{"jid": "half')
+
+        assert [e["event"]["event_type"] for e in event_journal.pending()] == ["a"]
+
+    def test_compaction_keeps_appends_from_other_writers(self, event_journal):
+        from engine.event_journal import EventJournal
+
+        other = EventJournal(path=event_journal.path)
+        acked = event_journal.append({"event_type": "a"})
+        event_journal.ack([acked])
+
+        event_journal.compact()
+        other.append({"event_type": "b"})
+
+        assert [e["event"]["event_type"] for e in event_journal.pending()] == ["b"]
+
 
 class TestEmitDocstring:
     """Verify the docstring references the correct table name."""
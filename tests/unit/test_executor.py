@@ -1015,7 +1015,7 @@ class TestMemoryInjection:
         step.update(overrides)
         return step
 
-    @patch("engine.executor.extract_and_store")
+    @patch("engine.executor.queue_extraction")
     @patch("engine.executor._update_agent_status")
     @patch("engine.executor._check_mission_complete")
     @patch("engine.executor.emit")
@@ -1060,7 +1060,7 @@ class TestMemoryInjection:
         assert "## Recent Memories" in skill_arg
         assert "Use async for file ops" in skill_arg
 
-    @patch("engine.executor.extract_and_store")
+    @patch("engine.executor.queue_extraction")
     @patch("engine.executor._update_agent_status")
     @patch("engine.executor._check_mission_complete")
     @patch("engine.executor.emit")
@@ -1094,7 +1094,7 @@ class TestMemoryInjection:
         skill_arg = spawn_call[1].get("skill_md") or spawn_call[0][0]
         assert skill_arg == "# Ed SKILL\nDo engineering."
 
-    @patch("engine.executor.extract_and_store")
+    @patch("engine.executor.queue_extraction")
     @patch("engine.executor._update_agent_status")
     @patch("engine.executor._check_mission_complete")
     @patch("engine.executor.emit")
@@ -1126,7 +1126,7 @@ class TestMemoryInjection:
         # Claude should still be spawned (with original skill_md)
         mock_spawn.assert_called_once()
 
-    @patch("engine.executor.extract_and_store")
+    @patch("engine.executor.queue_extraction")
     @patch("engine.executor._update_agent_status")
     @patch("engine.executor._check_mission_complete")
     @patch("engine.executor.emit")
@@ -1158,7 +1158,7 @@ class TestMemoryInjection:
         assert result["status"] == "completed"
         mock_spawn.assert_called_once()
 
-    @patch("engine.executor.extract_and_store")
+    @patch("engine.executor.queue_extraction")
     @patch("engine.executor._update_agent_status")
     @patch("engine.executor._check_mission_complete")
     @patch("engine.executor.emit")
@@ -1190,6 +1190,92 @@ class TestMemoryInjection:
         mock_get_mem.assert_called_once_with("light", "Design product roadmap", limit=5)
 
 
+# ---------------------------------------------------------------------------
+# Prompt budget
+# ---------------------------------------------------------------------------
+
+
+SKILL = (
+    "You are Ed, engineering VP.\n\n"
+    "## Deployment\nAlways deploy through the staging pipeline and run smoke tests.\n\n"
+    "## Pricing\nDefer pricing questions to Toji and the commerce playbook.\n\n"
+    "## Database\nUse migrations for every Supabase schema change and add indexes.\n"
+)
+
+
+def _memories(n):
+    return [
+        {"memory_type": "insight", "content": f"Memory number {i} " + "detail " * 10, "confidence": 0.5}
+        for i in range(n)
+    ]
+
+
+class TestAssembleSystemPrompt:
+    """Test token-budgeted packing of skill sections and memories."""
+
+    def test_within_budget_is_skill_plus_memories(self):
+        from engine.executor import _assemble_system_prompt
+        from engine.memory import format_memories_section
+        from engine.config import WORKER_MODEL
+
+        memories = _memories(2)
+        prompt = _assemble_system_prompt(SKILL, memories, "anything", WORKER_MODEL)
+
+        assert prompt == SKILL + format_memories_section(memories)
+
+    def test_keeps_relevant_sections_in_document_order(self):
+        from engine.executor import _assemble_system_prompt, estimate_tokens
+        from engine.config import WORKER_MODEL
+
+        budget = estimate_tokens(SKILL) - 10
+        with patch.dict("engine.executor.PROMPT_BUDGETS", {WORKER_MODEL: budget}):
+            prompt = _assemble_system_prompt(SKILL, [], "Add a Supabase migration for the staging deploy", WORKER_MODEL)
+
+        assert prompt.startswith("You are Ed")
+        assert "## Deployment" in prompt and "## Database" in prompt
+        assert "## Pricing" not in prompt
+        assert prompt.index("## Deployment") < prompt.index("## Database")
+        assert estimate_tokens(prompt) <= budget
+
+    def test_drops_least_relevant_memories_first(self):
+        from engine.executor import _assemble_system_prompt, estimate_tokens
+        from engine.memory import format_memories_section
+        from engine.config import WORKER_MODEL
+
+        memories = _memories(5)
+        budget = int(estimate_tokens(format_memories_section(memories[:2])) / 0.25) + 1
+        with patch.dict("engine.executor.PROMPT_BUDGETS", {WORKER_MODEL: budget}):
+            prompt = _assemble_system_prompt("", memories, "task", WORKER_MODEL)
+
+        assert "Memory number 1 " in prompt
+        assert "Memory number 2 " not in prompt
+
+    def test_truncates_oversized_first_section(self):
+        from engine.executor import _assemble_system_prompt, estimate_tokens, TRUNCATION_MARKER
+        from engine.config import CHEAP_MODEL
+
+        skill = "\n".join(f"Rule {i}: keep it simple." for i in range(2000))
+        with patch.dict("engine.executor.PROMPT_BUDGETS", {CHEAP_MODEL: 500}):
+            prompt = _assemble_system_prompt(skill, [], "task", CHEAP_MODEL)
+            again = _assemble_system_prompt(skill, [], "other task", CHEAP_MODEL)
+
+        assert prompt.endswith(TRUNCATION_MARKER)
+        assert estimate_tokens(prompt) <= 500
+        assert prompt == again  # deterministic
+
+    def test_budget_follows_model_tier(self):
+        from engine.executor import _assemble_system_prompt, estimate_tokens
+        from engine.config import CHEAP_MODEL, ORCHESTRATOR_MODEL, PROMPT_BUDGETS
+
+        skill = "Intro\n" + "".join(f"## Section {i}\n" + "text " * 200 + "\n" for i in range(60))
+
+        cheap = _assemble_system_prompt(skill, [], "task", CHEAP_MODEL)
+        orchestrator = _assemble_system_prompt(skill, [], "task", ORCHESTRATOR_MODEL)
+
+        assert estimate_tokens(cheap) <= PROMPT_BUDGETS[CHEAP_MODEL]
+        assert estimate_tokens(cheap) < estimate_tokens(orchestrator) <= PROMPT_BUDGETS[ORCHESTRATOR_MODEL]
+
+
 # ---------------------------------------------------------------------------
 # Drift integration in _check_mission_complete
 # ---------------------------------------------------------------------------
@@ -2,12 +2,24 @@
 
 import json
 import subprocess
+import time
 from datetime import datetime, timezone
 from unittest.mock import MagicMock, patch, call
 
 import pytest
 
 
+@pytest.fixture(autouse=True)
+def fresh_index(tmp_path):
+    """Each test gets an empty local memory index and retrieval cache."""
+    from engine import memory_index
+    from engine.memory import invalidate_memories
+
+    invalidate_memories()
+    with patch.object(memory_index, "_index", memory_index.MemoryIndex(path=str(tmp_path / "memory.db"))):
+        yield
+
+
 # ---------------------------------------------------------------------------
 # extract_and_store
 # ---------------------------------------------------------------------------
@@ -81,6 +93,25 @@ class TestExtractAndStore:
         # Verify supabase insert was called
         mock_sb.table.assert_called_with("agent_memory")
 
+    @patch("engine.memory.get_index")
+    @patch("engine.memory.subprocess.run")
+    @patch("engine.memory.supabase")
+    def test_stored_memories_are_indexed_locally(self, mock_sb, mock_run, mock_get_index):
+        from engine.memory import extract_and_store
+
+        mock_run.return_value = MagicMock(
+            stdout=json.dumps([{"memory_type": "insight", "content": "Cache role cards", "confidence": 0.7}]),
+            stderr="",
+            returncode=0,
+        )
+        stored_memory = {"id": "mem-002", "agent_id": "ed", "content": "Cache role cards"}
+        mock_get_index.return_value.find_near_duplicate.return_value = None
+        mock_sb.table.return_value.insert.return_value.execute.return_value = MagicMock(data=[stored_memory])
+
+        extract_and_store(self._make_step(), "Some output")
+
+        mock_get_index.return_value.add.assert_called_once_with(stored_memory)
+
     @patch("engine.memory.supabase", None)
     def test_returns_empty_when_no_supabase(self):
         from engine.memory import extract_and_store
@@ -191,8 +222,14 @@ class TestExtractAndStore:
 
         # Return 5 memories from Claude
         memories = [
-            {"memory_type": "insight", "content": f"Learning {i}", "tags": ["test"], "confidence": 0.5}
-            for i in range(5)
+            {"memory_type": "insight", "content": content, "tags": ["test"], "confidence": 0.5}
+            for content in [
+                "Paginate list endpoints",
+                "Cache role cards in memory",
+                "Stripe webhooks need idempotency keys",
+                "Avoid blocking IO in the poller",
+                "Prefer RPCs for multi-row writes",
+            ]
         ]
         mock_run.return_value = MagicMock(
             stdout=json.dumps(memories),
@@ -207,8 +244,9 @@ class TestExtractAndStore:
         step = self._make_step()
         result = extract_and_store(step, "Some output")
 
-        # Should only attempt 3 inserts (capped)
-        assert mock_sb.table.return_value.insert.call_count == 3
+        # One bulk insert of 3 rows (capped)
+        mock_sb.table.return_value.insert.assert_called_once()
+        assert len(mock_sb.table.return_value.insert.call_args[0][0]) == 3
 
     @patch("engine.memory.subprocess.run")
     @patch("engine.memory.supabase")
@@ -226,10 +264,10 @@ class TestExtractAndStore:
         )
 
         inserted_data = []
-        def capture_insert(data):
-            inserted_data.append(data)
+        def capture_insert(rows):
+            inserted_data.extend(rows)
             mock_result = MagicMock()
-            mock_result.execute.return_value = MagicMock(data=[{**data, "id": "mem-x"}])
+            mock_result.execute.return_value = MagicMock(data=[{**row, "id": "mem-x"} for row in rows])
             return mock_result
 
         mock_sb.table.return_value.insert.side_effect = capture_insert
@@ -253,10 +291,10 @@ class TestExtractAndStore:
         )
 
         inserted_data = []
-        def capture_insert(data):
-            inserted_data.append(data)
+        def capture_insert(rows):
+            inserted_data.extend(rows)
             mock_result = MagicMock()
-            mock_result.execute.return_value = MagicMock(data=[{**data, "id": "mem-x"}])
+            mock_result.execute.return_value = MagicMock(data=[{**row, "id": "mem-x"} for row in rows])
             return mock_result
 
         mock_sb.table.return_value.insert.side_effect = capture_insert
@@ -277,10 +315,10 @@ class TestExtractAndStore:
         )
 
         inserted_data = []
-        def capture_insert(data):
-            inserted_data.append(data)
+        def capture_insert(rows):
+            inserted_data.extend(rows)
             mock_result = MagicMock()
-            mock_result.execute.return_value = MagicMock(data=[{**data, "id": "mem-x"}])
+            mock_result.execute.return_value = MagicMock(data=[{**row, "id": "mem-x"} for row in rows])
             return mock_result
 
         mock_sb.table.return_value.insert.side_effect = capture_insert
@@ -294,12 +332,12 @@ class TestExtractAndStore:
     @patch("engine.memory.subprocess.run")
     @patch("engine.memory.supabase")
     def test_supabase_insert_failure_continues(self, mock_sb, mock_run):
-        """If one memory insert fails, the others should still be attempted."""
+        """If the bulk insert is rejected, each memory is retried on its own."""
         from engine.memory import extract_and_store
 
         memories = [
-            {"memory_type": "insight", "content": "Learning 1", "tags": [], "confidence": 0.5},
-            {"memory_type": "insight", "content": "Learning 2", "tags": [], "confidence": 0.6},
+            {"memory_type": "insight", "content": "Paginate list endpoints", "tags": [], "confidence": 0.5},
+            {"memory_type": "insight", "content": "Cache role cards in memory", "tags": [], "confidence": 0.6},
         ]
         mock_run.return_value = MagicMock(
             stdout=json.dumps(memories), stderr="", returncode=0,
@@ -308,7 +346,7 @@ class TestExtractAndStore:
         call_count = [0]
         def insert_side_effect(data):
             call_count[0] += 1
-            if call_count[0] == 1:
+            if call_count[0] <= 2:
                 raise Exception("Insert failed")
             mock_result = MagicMock()
             mock_result.execute.return_value = MagicMock(data=[{**data, "id": "mem-002"}])
@@ -319,7 +357,8 @@ class TestExtractAndStore:
         step = self._make_step()
         result = extract_and_store(step, "Some output")
 
-        # First insert failed, second succeeded
+        # Bulk insert and first row failed, second row succeeded
+        assert call_count[0] == 3
         assert len(result) == 1
 
     @patch("engine.memory.subprocess.run")
@@ -360,7 +399,7 @@ class TestExtractAndStore:
     @patch("engine.memory.subprocess.run")
     @patch("engine.memory.supabase")
     def test_truncates_output_in_prompt(self, mock_sb, mock_run):
-        """Output passed to Claude should be truncated to 3000 chars."""
+        """Output passed to Claude should be digested to about 3000 chars."""
         from engine.memory import extract_and_store
 
         mock_run.return_value = MagicMock(
@@ -371,11 +410,305 @@ class TestExtractAndStore:
         step = self._make_step()
         extract_and_store(step, long_output)
 
-        # The prompt (last positional arg to claude -p) should contain truncated output
+        # The prompt (last positional arg to claude -p) should contain a digest
         call_args = mock_run.call_args[0][0]
         prompt = call_args[-1]  # Last arg is the prompt
-        assert "x" * 3000 in prompt
-        assert "x" * 5000 not in prompt
+        assert "x" * 600 in prompt
+        assert "x" * 3000 not in prompt
+        assert prompt.count("x") <= 3000
+
+    @patch("engine.memory.subprocess.run")
+    @patch("engine.memory.supabase")
+    def test_prompt_keeps_error_from_end_of_long_output(self, mock_sb, mock_run):
+        """A failure at the end of a long output reaches the extraction prompt."""
+        from engine.memory import extract_and_store
+
+        mock_run.return_value = MagicMock(
+            stdout="[]", stderr="", returncode=0,
+        )
+
+        filler = "\n\n".join(f"Scanned module {i} and found nothing." for i in range(300))
+        output = filler + "\n\nTraceback: KeyError 'profile' raised in auth middleware"
+        extract_and_store(self._make_step(), output)
+
+        prompt = mock_run.call_args[0][0][-1]
+        assert "KeyError 'profile'" in prompt
+        assert "[...]" in prompt
+
+
+# ---------------------------------------------------------------------------
+# Batched extraction
+# ---------------------------------------------------------------------------
+
+
+def _batch_steps():
+    return [
+        ({"id": "s1", "mission_id": "m1", "title": "Build API", "daimyo": "ed"}, "Output one"),
+        ({"id": "s2", "mission_id": "m2", "title": "Price plan", "daimyo": "toji"}, "Output two"),
+    ]
+
+
+class TestExtractBatch:
+    """Test one-call extraction across several step outputs."""
+
+    @patch("engine.memory.get_index")
+    @patch("engine.memory.subprocess.run")
+    @patch("engine.memory.supabase")
+    def test_attributes_learnings_to_their_steps(self, mock_sb, mock_run, mock_get_index):
+        from engine.memory import extract_batch
+
+        mock_run.return_value = MagicMock(stdout=json.dumps([
+            {"step": 2, "memory_type": "decision", "content": "Annual plans discount 20%", "confidence": 0.7},
+            {"step": 1, "memory_type": "solution", "content": "Paginate list endpoints", "confidence": 0.8},
+            {"step": 9, "memory_type": "insight", "content": "Unknown step", "confidence": 0.5},
+        ]), stderr="", returncode=0)
+        mock_sb.table.return_value.insert.return_value.execute.return_value = MagicMock(data=[{"id": "a"}, {"id": "b"}])
+        mock_get_index.return_value.find_near_duplicate.return_value = None
+
+        extract_batch(_batch_steps())
+
+        mock_run.assert_called_once()
+        prompt = mock_run.call_args[0][0][-1]
+        assert "Step 1: Build API" in prompt and "Step 2: Price plan" in prompt
+
+        rows = mock_sb.table.return_value.insert.call_args[0][0]
+        assert mock_sb.table.return_value.insert.call_count == 1
+        assert [(r["agent_id"], r["source_mission_id"]) for r in rows] == [("toji", "m2"), ("ed", "m1")]
+
+    @patch("engine.memory.get_index")
+    @patch("engine.memory.subprocess.run")
+    @patch("engine.memory.supabase")
+    def test_coerces_type_and_confidence_to_schema(self, mock_sb, mock_run, mock_get_index):
+        from engine.memory import MEMORY_TYPES, extract_batch
+
+        mock_run.return_value = MagicMock(stdout=json.dumps([
+            {"step": 1, "memory_type": "Lesson", "content": "Paginate list endpoints", "confidence": "high"},
+            {"step": 1, "memory_type": "warning", "content": "Avoid direct DB writes", "confidence": "0.9"},
+            {"step": 2, "content": "Annual plans discount 20%", "confidence": None},
+            {"step": 2, "memory_type": ["pattern"], "content": "Trials convert", "confidence": 7},
+        ]), stderr="", returncode=0)
+        mock_sb.table.return_value.insert.return_value.execute.return_value = MagicMock(data=[])
+        mock_get_index.return_value.find_near_duplicate.return_value = None
+
+        extract_batch(_batch_steps())
+
+        rows = mock_sb.table.return_value.insert.call_args[0][0]
+        assert [r["memory_type"] for r in rows] == ["lesson", "insight", "insight", "insight"]
+        assert [r["confidence"] for r in rows] == [0.5, 0.9, 0.5, 1.0]
+        assert set(MEMORY_TYPES) == {"insight", "pattern", "strategy", "preference", "lesson"}
+        assert "strategy" in mock_run.call_args[0][0][-1]
+
+    @patch("engine.memory.subprocess.run")
+    @patch("engine.memory.supabase")
+    def test_skips_empty_outputs(self, mock_sb, mock_run):
+        from engine.memory import extract_batch
+
+        assert extract_batch([({"id": "s1"}, "   ")]) == []
+        mock_run.assert_not_called()
+
+
+class TestExtractionBatcher:
+    """Test batching by size and time window."""
+
+    @patch("engine.memory.extract_batch")
+    def test_flushes_when_batch_is_full(self, mock_extract):
+        from engine.memory import ExtractionBatcher
+
+        mock_extract.return_value = [{"id": "mem-1"}]
+        batcher = ExtractionBatcher(max_items=2, window=60)
+        (step1, out1), (step2, out2) = _batch_steps()
+
+        assert batcher.submit(step1, out1) == []
+        mock_extract.assert_not_called()
+
+        assert batcher.submit(step2, out2) == [{"id": "mem-1"}]
+        mock_extract.assert_called_once_with([(step1, out1), (step2, out2)])
+        assert len(batcher) == 0
+
+    @patch("engine.memory.extract_batch")
+    def test_flush_waits_for_window(self, mock_extract):
+        from engine.memory import ExtractionBatcher
+
+        batcher = ExtractionBatcher(max_items=5, window=60)
+        batcher.submit(*_batch_steps()[0])
+
+        assert batcher.flush() == []
+        mock_extract.assert_not_called()
+
+        with patch("engine.memory.time.monotonic", return_value=time.monotonic() + 61):
+            batcher.flush()
+        mock_extract.assert_called_once()
+
+    @patch("engine.memory.extract_batch")
+    def test_force_flush_drains_everything(self, mock_extract):
+        from engine import memory
+
+        mock_extract.return_value = []
+        batcher = memory.ExtractionBatcher(max_items=5, window=60)
+        with patch.object(memory, "_batcher", batcher):
+            for step, output in _batch_steps():
+                memory.queue_extraction(step, output)
+            memory.flush_extractions(force=True)
+
+        mock_extract.assert_called_once()
+        assert len(batcher) == 0
+
+    @patch("engine.memory.extract_batch")
+    def test_ignores_empty_output(self, mock_extract):
+        from engine.memory import ExtractionBatcher
+
+        batcher = ExtractionBatcher(max_items=1, window=60)
+
+        assert batcher.submit({"id": "s1"}, "") == []
+        assert len(batcher) == 0
+        mock_extract.assert_not_called()
+
+
+# ---------------------------------------------------------------------------
+# Near-duplicate suppression and consolidation
+# ---------------------------------------------------------------------------
+
+
+def _learnings(*contents, confidence=0.6):
+    return MagicMock(
+        stdout=json.dumps([
+            {"step": 1, "memory_type": "insight", "content": c, "confidence": confidence} for c in contents
+        ]),
+        stderr="",
+        returncode=0,
+    )
+
+
+class TestDuplicateSuppression:
+    """Test merging near-duplicate learnings instead of storing them."""
+
+    STEP = {"id": "s1", "mission_id": "m1", "title": "Deploy", "daimyo": "ed"}
+
+    @patch("engine.memory.subprocess.run")
+    @patch("engine.memory.supabase")
+    def test_merges_into_existing_memory(self, mock_sb, mock_run):
+        from engine.memory import extract_and_store, get_index
+
+        get_index().add({
+            "id": "mem-1", "agent_id": "ed", "content": "Always run the smoke test before deploying to staging",
+            "confidence": 0.5,
+        })
+        mock_run.return_value = _learnings("Always run smoke tests before deploying to staging", confidence=0.7)
+        mock_sb.rpc.return_value.execute.return_value = MagicMock(data=[{
+            "id": "mem-1", "agent_id": "ed", "content": "Always run the smoke test before deploying to staging",
+            "confidence": 0.75, "occurrences": 2,
+        }])
+
+        result = extract_and_store(self.STEP, "Some output")
+
+        mock_sb.table.return_value.insert.assert_not_called()
+        fn, params = mock_sb.rpc.call_args[0]
+        assert fn == "merge_memories"
+        assert params["merges"] == [{"id": "mem-1", "confidence": 0.7, "count": 1}]
+        assert result[0]["occurrences"] == 2
+
+    @patch("engine.memory.subprocess.run")
+    @patch("engine.memory.supabase")
+    def test_collapses_duplicates_within_batch(self, mock_sb, mock_run):
+        from engine.memory import extract_and_store
+
+        mock_run.return_value = _learnings(
+            "Always run the smoke test before deploying to staging",
+            "Always run smoke tests before deploying to staging",
+        )
+        mock_sb.table.return_value.insert.return_value.execute.return_value = MagicMock(data=[{"id": "mem-1"}])
+
+        extract_and_store(self.STEP, "Some output")
+
+        rows = mock_sb.table.return_value.insert.call_args[0][0]
+        assert len(rows) == 1
+        assert rows[0]["occurrences"] == 2
+        assert isinstance(rows[0]["fingerprint"], int)
+        mock_sb.rpc.assert_not_called()
+
+
+class TestConsolidateMemories:
+    """Test the periodic consolidation pass."""
+
+    @patch("engine.memory.supabase")
+    def test_keeps_most_confident_and_archives_rest(self, mock_sb):
+        from engine.memory import consolidate_memories, get_index
+
+        index = get_index()
+        index._loaded = True
+        index._synced_at = time.monotonic()
+        index.add({"id": "a", "agent_id": "ed", "content": "Always run the smoke test before deploying to staging", "confidence": 0.5})
+        index.add({"id": "b", "agent_id": "ed", "content": "Always run smoke tests before deploying to staging", "confidence": 0.8})
+        index.add({"id": "c", "agent_id": "ed", "content": "Stripe webhooks need idempotency keys", "confidence": 0.9})
+        mock_sb.rpc.return_value.execute.return_value = MagicMock(data=[{
+            "id": "b", "agent_id": "ed", "content": "Always run smoke tests before deploying to staging",
+            "confidence": 0.85, "occurrences": 2,
+        }])
+
+        with patch.object(index, "sync"):
+            archived = consolidate_memories()
+
+        assert archived == 1
+        fn, params = mock_sb.rpc.call_args[0]
+        assert fn == "consolidate_memories"
+        assert params["clusters"] == [{"keep": "b", "merged": ["a"]}]
+        assert sorted(m["id"] for m in index.search("ed", "smoke test", limit=5)) == ["b", "c"]
+
+    @patch("engine.memory.supabase")
+    def test_no_clusters_makes_no_rpc(self, mock_sb):
+        from engine.memory import consolidate_memories
+
+        with patch("engine.memory.get_index") as mock_get_index:
+            mock_get_index.return_value.agents.return_value = ["ed"]
+            mock_get_index.return_value.near_duplicate_clusters.return_value = []
+            assert consolidate_memories() == 0
+
+        mock_sb.rpc.assert_not_called()
+
+
+class TestArchiveStaleMemories:
+    """Test the periodic archival pass."""
+
+    @patch("engine.memory.supabase")
+    def test_archives_in_one_rpc_and_updates_index(self, mock_sb):
+        from engine.memory import archive_stale_memories, get_index
+
+        index = get_index()
+        index.add({"id": "a", "agent_id": "ed", "content": "Old deploy checklist", "confidence": 0.2})
+        index.add({"id": "b", "agent_id": "ed", "content": "Current deploy checklist", "confidence": 0.9})
+        mock_sb.rpc.return_value.execute.return_value = MagicMock(data=[{"id": "a", "agent_id": "ed"}])
+
+        with patch("engine.memory.HALF_LIFE_DAYS", 30), \
+             patch("engine.memory.MEMORY_TTL_DAYS", 180), \
+             patch("engine.memory.invalidate_memories") as mock_invalidate:
+            archived = archive_stale_memories()
+
+        assert archived == 1
+        fn, params = mock_sb.rpc.call_args[0]
+        assert fn == "archive_stale_memories"
+        assert params["half_life"] == "30 days"
+        assert params["ttl"] == "180 days"
+        assert [m["id"] for m in index.search("ed", "deploy checklist")] == ["b"]
+        mock_invalidate.assert_called_once_with("ed")
+
+    @patch("engine.memory.supabase")
+    def test_disabled_criteria_sent_as_null(self, mock_sb):
+        from engine.memory import archive_stale_memories
+
+        mock_sb.rpc.return_value.execute.return_value = MagicMock(data=[])
+
+        with patch("engine.memory.HALF_LIFE_DAYS", 0), patch("engine.memory.MEMORY_TTL_DAYS", 0):
+            assert archive_stale_memories() == 0
+
+        params = mock_sb.rpc.call_args[0][1]
+        assert params["half_life"] is None
+        assert params["ttl"] is None
+
+    @patch("engine.memory.supabase", None)
+    def test_no_supabase_is_noop(self):
+        from engine.memory import archive_stale_memories
+
+        assert archive_stale_memories() == 0
 
 
 # ---------------------------------------------------------------------------
@@ -386,7 +719,8 @@ class TestExtractAndStore:
 class TestGetRelevantMemories:
     """Test memory retrieval for agents."""
 
-    @patch("engine.memory.supabase")
+    @patch("engine.memory.supabase", MagicMock())
+    @patch("engine.memory_index.supabase")
     def test_returns_memories_for_agent(self, mock_sb):
         from engine.memory import get_relevant_memories
 
@@ -394,14 +728,7 @@ class TestGetRelevantMemories:
             {"id": "m1", "agent_id": "ed", "content": "Learning 1", "confidence": 0.9},
             {"id": "m2", "agent_id": "ed", "content": "Learning 2", "confidence": 0.7},
         ]
-
-        chain = MagicMock()
-        chain.select.return_value = chain
-        chain.eq.return_value = chain
-        chain.order.return_value = chain
-        chain.limit.return_value = chain
-        chain.execute.return_value = MagicMock(data=memories)
-        mock_sb.table.return_value = chain
+        mock_sb.table.return_value = _memory_rows_chain(memories)
 
         result = get_relevant_memories("ed")
 
@@ -409,57 +736,62 @@ class TestGetRelevantMemories:
         assert result[0]["content"] == "Learning 1"
         mock_sb.table.assert_called_with("agent_memory")
 
-    @patch("engine.memory.supabase")
+    @patch("engine.memory.supabase", MagicMock())
+    @patch("engine.memory_index.supabase")
     def test_filters_by_agent_id_and_active_status(self, mock_sb):
         from engine.memory import get_relevant_memories
 
-        chain = MagicMock()
-        chain.select.return_value = chain
-        chain.eq.return_value = chain
-        chain.order.return_value = chain
-        chain.limit.return_value = chain
-        chain.execute.return_value = MagicMock(data=[])
+        chain = _memory_rows_chain([
+            {"id": "m1", "agent_id": "ed", "content": "Ed learning", "confidence": 0.9},
+            {"id": "m2", "agent_id": "light", "content": "Light learning", "confidence": 0.5},
+        ])
         mock_sb.table.return_value = chain
 
-        get_relevant_memories("light")
+        result = get_relevant_memories("light")
 
-        # Check .eq was called with both agent_id and status
-        eq_calls = chain.eq.call_args_list
-        eq_args = [(c[0][0], c[0][1]) for c in eq_calls]
-        assert ("agent_id", "light") in eq_args
+        assert [m["id"] for m in result] == ["m2"]
+        eq_args = [(c[0][0], c[0][1]) for c in chain.eq.call_args_list]
         assert ("status", "active") in eq_args
 
-    @patch("engine.memory.supabase")
+    @patch("engine.memory.supabase", MagicMock())
+    @patch("engine.memory_index.supabase")
     def test_respects_limit_parameter(self, mock_sb):
         from engine.memory import get_relevant_memories
 
-        chain = MagicMock()
-        chain.select.return_value = chain
-        chain.eq.return_value = chain
-        chain.order.return_value = chain
-        chain.limit.return_value = chain
-        chain.execute.return_value = MagicMock(data=[])
-        mock_sb.table.return_value = chain
-
-        get_relevant_memories("ed", limit=10)
+        mock_sb.table.return_value = _memory_rows_chain([
+            {"id": f"m{i}", "agent_id": "ed", "content": f"Lesson {i}", "confidence": 0.5}
+            for i in range(12)
+        ])
 
-        chain.limit.assert_called_with(10)
+        assert len(get_relevant_memories("ed", limit=10)) == 10
 
-    @patch("engine.memory.supabase")
+    @patch("engine.memory.supabase", MagicMock())
+    @patch("engine.memory_index.supabase")
     def test_default_limit_is_five(self, mock_sb):
         from engine.memory import get_relevant_memories
 
-        chain = MagicMock()
-        chain.select.return_value = chain
-        chain.eq.return_value = chain
-        chain.order.return_value = chain
-        chain.limit.return_value = chain
-        chain.execute.return_value = MagicMock(data=[])
-        mock_sb.table.return_value = chain
+        mock_sb.table.return_value = _memory_rows_chain([
+            {"id": f"m{i}", "agent_id": "ed", "content": f"Lesson {i}", "confidence": 0.5}
+            for i in range(8)
+        ])
 
-        get_relevant_memories("ed")
+        assert len(get_relevant_memories("ed")) == 5
 
-        chain.limit.assert_called_with(5)
+    @patch("engine.memory.supabase", MagicMock())
+    @patch("engine.memory_index.supabase")
+    def test_ranks_by_decayed_confidence(self, mock_sb):
+        from engine.memory import get_relevant_memories
+
+        now = datetime.now(timezone.utc).isoformat()
+        mock_sb.table.return_value = _memory_rows_chain([
+            {"id": "stale", "agent_id": "ed", "confidence": 0.9, "created_at": "2025-01-01T00:00:00+00:00"},
+            {"id": "fresh", "agent_id": "ed", "confidence": 0.6, "created_at": now},
+            {"id": "weak", "agent_id": "ed", "confidence": 0.2, "created_at": now},
+        ])
+
+        result = get_relevant_memories("ed", limit=2)
+
+        assert [m["id"] for m in result] == ["fresh", "weak"]
 
     @patch("engine.memory.supabase", None)
     def test_returns_empty_when_no_supabase(self):
@@ -468,7 +800,8 @@ class TestGetRelevantMemories:
         result = get_relevant_memories("ed")
         assert result == []
 
-    @patch("engine.memory.supabase")
+    @patch("engine.memory.supabase", MagicMock())
+    @patch("engine.memory_index.supabase")
     def test_handles_query_exception(self, mock_sb):
         from engine.memory import get_relevant_memories
 
@@ -477,21 +810,183 @@ class TestGetRelevantMemories:
         result = get_relevant_memories("ed")
         assert result == []
 
-    @patch("engine.memory.supabase")
+    @patch("engine.memory.supabase", MagicMock())
+    @patch("engine.memory_index.supabase")
+    def test_serves_mirror_while_supabase_is_down(self, mock_sb):
+        from engine.memory import get_index, get_relevant_memories
+
+        get_index().add({"id": "m1", "agent_id": "ed", "content": "Paginate list endpoints", "confidence": 0.8})
+        mock_sb.table.side_effect = Exception("Connection error")
+
+        result = get_relevant_memories("ed", "Add pagination to the list endpoint")
+
+        assert [m["id"] for m in result] == ["m1"]
+
+    @patch("engine.memory.supabase", MagicMock())
+    @patch("engine.memory_index.supabase")
     def test_returns_empty_list_when_no_data(self, mock_sb):
         from engine.memory import get_relevant_memories
 
-        chain = MagicMock()
-        chain.select.return_value = chain
-        chain.eq.return_value = chain
-        chain.order.return_value = chain
-        chain.limit.return_value = chain
-        chain.execute.return_value = MagicMock(data=None)
-        mock_sb.table.return_value = chain
+        mock_sb.table.return_value = _memory_rows_chain(None)
 
         result = get_relevant_memories("ed")
         assert result == []
 
+    @patch("engine.memory.get_index")
+    @patch("engine.memory.supabase")
+    def test_task_description_ranks_from_local_index(self, mock_sb, mock_get_index):
+        from engine.memory import get_relevant_memories
+
+        index = mock_get_index.return_value
+        index.search.return_value = [{"id": "m1", "content": "Relevant"}]
+
+        result = get_relevant_memories("ed", "Fix the auth flow", limit=3)
+
+        index.sync.assert_called_once()
+        index.search.assert_called_with("ed", "Fix the auth flow", 3)
+        mock_sb.table.assert_not_called()
+        assert result == [{"id": "m1", "content": "Relevant"}]
+
+
+# ---------------------------------------------------------------------------
+# Retrieval cache
+# ---------------------------------------------------------------------------
+
+
+def _memory_rows_chain(rows):
+    chain = MagicMock()
+    chain.select.return_value = chain
+    chain.eq.return_value = chain
+    chain.gt.return_value = chain
+    chain.order.return_value = chain
+    chain.limit.return_value = chain
+    chain.insert.return_value = chain
+    chain.execute.return_value = MagicMock(data=rows)
+    return chain
+
+
+class TestRetrievalCache:
+    """Test per-agent caching of retrieval results."""
+
+    @patch("engine.memory.get_index")
+    @patch("engine.memory.supabase", MagicMock())
+    def test_repeat_lookup_makes_no_search(self, mock_get_index):
+        from engine.memory import get_relevant_memories
+
+        mock_get_index.return_value.search.return_value = [{"id": "m1", "agent_id": "ed"}]
+
+        first = get_relevant_memories("ed")
+        second = get_relevant_memories("ed")
+
+        assert first == second == [{"id": "m1", "agent_id": "ed"}]
+        mock_get_index.return_value.search.assert_called_once()
+
+    @patch("engine.memory.get_index")
+    @patch("engine.memory.supabase", MagicMock())
+    def test_indexed_lookup_is_cached(self, mock_get_index):
+        from engine.memory import get_relevant_memories
+
+        mock_get_index.return_value.search.return_value = [{"id": "m1"}]
+
+        get_relevant_memories("ed", "Fix auth")
+        get_relevant_memories("ed", "Fix auth")
+
+        mock_get_index.return_value.search.assert_called_once()
+
+    @patch("engine.memory.get_index")
+    @patch("engine.memory.supabase", MagicMock())
+    def test_invalidation_is_per_agent(self, mock_get_index):
+        from engine.memory import get_relevant_memories, invalidate_memories
+
+        mock_get_index.return_value.search.return_value = []
+
+        get_relevant_memories("ed")
+        get_relevant_memories("light")
+        invalidate_memories("ed")
+        get_relevant_memories("ed")
+        get_relevant_memories("light")
+
+        assert mock_get_index.return_value.search.call_count == 3
+
+    @patch("engine.memory.get_index")
+    @patch("engine.memory.supabase", MagicMock())
+    def test_expires_after_ttl(self, mock_get_index):
+        from engine.memory import get_relevant_memories
+
+        mock_get_index.return_value.search.return_value = []
+
+        get_relevant_memories("ed")
+        with patch("engine.memory.time.monotonic", return_value=time.monotonic() + 10_000):
+            get_relevant_memories("ed")
+
+        assert mock_get_index.return_value.search.call_count == 2
+
+    @patch("engine.memory.get_index")
+    @patch("engine.memory.supabase", MagicMock())
+    def test_failures_are_not_cached(self, mock_get_index):
+        from engine.memory import get_relevant_memories
+
+        mock_get_index.return_value.search.side_effect = [Exception("locked"), [{"id": "m1"}]]
+
+        assert get_relevant_memories("ed") == []
+        assert get_relevant_memories("ed") == [{"id": "m1"}]
+
+    @patch("engine.memory.subprocess.run")
+    @patch("engine.memory.supabase")
+    def test_local_write_invalidates_agent(self, mock_sb, mock_run):
+        from engine.memory import extract_and_store, get_relevant_memories
+
+        chain = _memory_rows_chain([])
+        mock_sb.table.return_value = chain
+        chain.execute.side_effect = [
+            MagicMock(data=[]),  # mirror sync
+            MagicMock(data=[{"id": "m1", "agent_id": "ed", "content": "Paginate list endpoints"}]),  # insert
+        ]
+        mock_run.return_value = MagicMock(
+            stdout=json.dumps([{"memory_type": "insight", "content": "Paginate list endpoints"}]),
+            stderr="",
+            returncode=0,
+        )
+
+        with patch("engine.memory_index.supabase", mock_sb):
+            assert get_relevant_memories("ed") == []
+            extract_and_store({"id": "s1", "daimyo": "ed"}, "Some output")
+
+            assert [m["id"] for m in get_relevant_memories("ed")] == ["m1"]
+
+
+class TestHandleMemoryChange:
+    """Test realtime agent_memory notifications."""
+
+    def test_insert_indexes_and_invalidates(self):
+        from engine.memory import handle_memory_change, get_index, _retrieval_cache
+
+        _retrieval_cache["ed"] = {("", 5): (time.monotonic(), [])}
+
+        handle_memory_change("INSERT", {"id": "m1", "agent_id": "ed", "content": "Paginate list endpoints", "status": "active"}, None)
+
+        assert get_index().search("ed", "paginate")[0]["id"] == "m1"
+        assert "ed" not in _retrieval_cache
+
+    def test_archive_removes_from_index(self):
+        from engine.memory import handle_memory_change, get_index
+
+        get_index().add({"id": "m1", "agent_id": "ed", "content": "Paginate list endpoints"})
+
+        handle_memory_change("UPDATE", {"id": "m1", "agent_id": "ed", "status": "archived"}, None)
+
+        assert len(get_index()) == 0
+
+    def test_delete_without_agent_invalidates_everything(self):
+        from engine.memory import handle_memory_change, _retrieval_cache
+
+        _retrieval_cache["ed"] = {}
+        _retrieval_cache["light"] = {}
+
+        handle_memory_change("DELETE", None, {"id": "m1"})
+
+        assert _retrieval_cache == {}
+
 
 # ---------------------------------------------------------------------------
 # format_memories_section
@@ -546,12 +1041,12 @@ class TestFormatMemoriesSection:
 
 
 # ---------------------------------------------------------------------------
-# Integration: executor calls extract_and_store
+# Integration: executor queues extraction
 # ---------------------------------------------------------------------------
 
 
 class TestExecutorMemoryIntegration:
-    """Test that executor.py calls extract_and_store after step completion."""
+    """Test that executor.py queues memory extraction after step completion."""
 
     def _make_step(self, **overrides):
         step = {
@@ -571,14 +1066,14 @@ class TestExecutorMemoryIntegration:
         step.update(overrides)
         return step
 
-    @patch("engine.executor.extract_and_store")
+    @patch("engine.executor.queue_extraction")
     @patch("engine.executor._update_agent_status")
     @patch("engine.executor._check_mission_complete")
     @patch("engine.executor.emit")
     @patch("engine.executor.supabase")
     @patch("engine.executor._spawn_claude")
     @patch("engine.executor._load_skill_md")
-    def test_calls_extract_and_store_on_success(
+    def test_queues_extraction_on_success(
         self, mock_load, mock_spawn, mock_sb, mock_emit,
         mock_check_mission, mock_update_agent, mock_extract,
     ):
@@ -596,7 +1091,7 @@ class TestExecutorMemoryIntegration:
 
         mock_extract.assert_called_once_with(step, "Output from Claude")
 
-    @patch("engine.executor.extract_and_store")
+    @patch("engine.executor.queue_extraction")
     @patch("engine.executor._update_agent_status")
     @patch("engine.executor._check_mission_complete")
     @patch("engine.executor.emit")
@@ -620,7 +1115,7 @@ class TestExecutorMemoryIntegration:
 
         mock_extract.assert_not_called()
 
-    @patch("engine.executor.extract_and_store")
+    @patch("engine.executor.queue_extraction")
     @patch("engine.executor._update_agent_status")
     @patch("engine.executor._check_mission_complete")
     @patch("engine.executor.emit")
@@ -649,7 +1144,7 @@ class TestExecutorMemoryIntegration:
         mock_check_mission.assert_called_once()
         mock_update_agent.assert_called_once()
 
-    @patch("engine.executor.extract_and_store")
+    @patch("engine.executor.queue_extraction")
     @patch("engine.executor._update_agent_status")
     @patch("engine.executor._check_mission_complete")
     @patch("engine.executor.emit")
@@ -0,0 +1,341 @@
+"""Tests for engine.memory_index — Local SQLite FTS5 memory mirror."""
+
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+
+def _memory(memory_id, content, agent_id="ed", confidence=0.5, tags=None,
+            created_at="2026-10-01T00:00:00+00:00", updated_at=None, status="active"):
+    return {
+        "id": memory_id,
+        "agent_id": agent_id,
+        "memory_type": "insight",
+        "content": content,
+        "tags": tags or [],
+        "confidence": confidence,
+        "created_at": created_at,
+        "updated_at": updated_at or created_at,
+        "status": status,
+    }
+
+
+def _memory_chain(*pages):
+    chain = MagicMock()
+    chain.select.return_value = chain
+    chain.eq.return_value = chain
+    chain.gt.return_value = chain
+    chain.or_.return_value = chain
+    chain.order.return_value = chain
+    chain.limit.return_value = chain
+    chain.execute.side_effect = [MagicMock(data=page) for page in pages]
+    return chain
+
+
+@pytest.fixture
+def index(tmp_path):
+    from engine.memory_index import MemoryIndex
+
+    return MemoryIndex(path=str(tmp_path / "memory.db"))
+
+
+class TestTokenize:
+    """Test query/content tokenization."""
+
+    def test_lowercases_and_drops_stopwords(self):
+        from engine.memory_index import tokenize
+
+        assert tokenize("Fix the Auth null-check in a hook") == ["fix", "auth", "null", "check", "hook"]
+
+
+class TestSearch:
+    """Test relevance ranking."""
+
+    def test_ranks_relevant_memory_above_higher_confidence(self, index):
+        index.add(_memory("m1", "Deploys need the staging smoke test first", confidence=0.9))
+        index.add(_memory("m2", "Supabase auth tokens expire after one hour", confidence=0.6))
+        index.add(_memory("m3", "Role cards render from static data", confidence=0.5))
+
+        result = index.search("ed", "Refresh expired supabase auth token", limit=1)
+
+        assert result[0]["id"] == "m2"
+
+    def test_tags_are_searchable(self, index):
+        index.add(_memory("m1", "Keep retries bounded", tags=["stripe", "webhooks"]))
+        index.add(_memory("m2", "Cache role cards"))
+
+        assert index.search("ed", "stripe webhook handler", limit=1)[0]["id"] == "m1"
+
+    def test_no_overlap_falls_back_to_confidence(self, index):
+        index.add(_memory("m1", "Alpha", confidence=0.4))
+        index.add(_memory("m2", "Beta", confidence=0.8))
+
+        assert [m["id"] for m in index.search("ed", "unrelated words")] == ["m2", "m1"]
+
+    def test_scoped_to_agent(self, index):
+        index.add(_memory("m1", "Pricing experiments", agent_id="toji"))
+
+        assert index.search("ed", "pricing") == []
+        assert index.search("toji", "pricing")[0]["id"] == "m1"
+
+    def test_remove_drops_memory(self, index):
+        index.add(_memory("m1", "Pricing experiments"))
+        index.remove("m1")
+
+        assert index.search("ed", "pricing") == []
+        assert len(index) == 0
+
+    def test_readd_replaces_content(self, index):
+        index.add(_memory("m1", "Pricing experiments"))
+        index.add(_memory("m1", "Onboarding emails"))
+
+        assert index.search("ed", "onboarding")[0]["content"] == "Onboarding emails"
+        assert len(index) == 1
+
+    def test_matches_ranked_first_then_filled_by_confidence(self, index):
+        index.add(_memory("m1", "Pricing experiments", confidence=0.2))
+        index.add(_memory("m2", "Onboarding emails", confidence=0.9))
+        index.add(_memory("m3", "Role cards", confidence=0.5))
+
+        assert [m["id"] for m in index.search("ed", "pricing", limit=2)] == ["m1", "m2"]
+        assert [m["id"] for m in index.search("ed", "pricing", limit=1)] == ["m1"]
+
+    def test_stemmed_terms_match(self, index):
+        index.add(_memory("m1", "Deploying requires smoke tests", confidence=0.1))
+        index.add(_memory("m2", "Pricing experiments", confidence=0.9))
+        index.add(_memory("m3", "Onboarding emails", confidence=0.9))
+
+        assert index.search("ed", "deploy test", limit=1)[0]["id"] == "m1"
+
+
+class TestDecay:
+    """Test time-decayed effective confidence."""
+
+    def test_halves_every_half_life(self):
+        from datetime import datetime, timezone
+        from engine.memory_index import effective_confidence
+
+        now = datetime(2026, 10, 31, tzinfo=timezone.utc)
+        memory = {"confidence": 0.8, "created_at": "2026-10-01T00:00:00Z"}
+
+        with patch("engine.memory_index.HALF_LIFE_DAYS", 30):
+            assert effective_confidence(memory, now) == pytest.approx(0.4)
+
+    def test_last_seen_resets_age(self):
+        from datetime import datetime, timezone
+        from engine.memory_index import effective_confidence
+
+        now = datetime(2026, 10, 31, tzinfo=timezone.utc)
+        memory = {"confidence": 0.8, "created_at": "2026-01-01T00:00:00+00:00",
+                  "last_seen_at": "2026-10-31T00:00:00+00:00"}
+
+        assert effective_confidence(memory, now) == pytest.approx(0.8)
+
+    def test_disabled_or_undated_returns_raw_confidence(self):
+        from engine.memory_index import effective_confidence
+
+        assert effective_confidence({"confidence": 0.7}) == 0.7
+        with patch("engine.memory_index.HALF_LIFE_DAYS", 0):
+            assert effective_confidence({"confidence": 0.7, "created_at": "2020-01-01T00:00:00+00:00"}) == 0.7
+
+    def test_recent_memory_outranks_stale_stronger_one(self, index):
+        index.add(_memory("old", "Alpha", confidence=0.9, created_at="2025-01-01T00:00:00+00:00"))
+        index.add(_memory("new", "Beta", confidence=0.6, created_at="2026-10-18T00:00:00+00:00"))
+
+        assert [m["id"] for m in index.search("ed", "unrelated words")] == ["new", "old"]
+
+
+class TestSync:
+    """Test incremental sync and persistence."""
+
+    @patch("engine.memory_index.supabase")
+    def test_pulls_rows_after_watermark_and_persists(self, mock_sb, index):
+        chain = _memory_chain([_memory("m1", "First", updated_at="2026-10-02T00:00:00+00:00")])
+        mock_sb.table.return_value = chain
+        index.watermark = "2026-10-01T00:01:00+00:00"
+
+        added = index.sync(force=True)
+
+        assert added == 1
+        # Re-reads the overlap window before the watermark, across every status
+        chain.gt.assert_called_with("updated_at", "2026-10-01T00:00:00+00:00")
+        chain.eq.assert_not_called()
+        assert index.watermark == "2026-10-02T00:00:00+00:00"
+
+        from engine.memory_index import MemoryIndex
+        reopened = MemoryIndex(path=index.path)
+        reopened.load()
+        assert reopened.watermark == "2026-10-02T00:00:00+00:00"
+        assert reopened.search("ed", "first")[0]["id"] == "m1"
+
+    @patch("engine.memory_index.supabase")
+    def test_first_sync_pulls_only_active_rows(self, mock_sb, index):
+        chain = _memory_chain([])
+        mock_sb.table.return_value = chain
+
+        index.sync(force=True)
+
+        chain.eq.assert_called_with("status", "active")
+        chain.gt.assert_not_called()
+
+    @patch("engine.memory_index.supabase")
+    def test_archived_rows_are_removed(self, mock_sb, index):
+        index.add(_memory("m1", "Pricing experiments"))
+        index.add(_memory("m2", "Pricing tiers"))
+        index.watermark = "2026-10-01T00:00:00+00:00"
+        mock_sb.table.return_value = _memory_chain([
+            _memory("m1", "Pricing experiments", status="archived", updated_at="2026-10-03T00:00:00+00:00"),
+        ])
+
+        index.sync(force=True)
+
+        assert [m["id"] for m in index.search("ed", "pricing")] == ["m2"]
+        assert index.watermark == "2026-10-03T00:00:00+00:00"
+
+    @patch("engine.memory_index.supabase")
+    def test_throttled_within_interval(self, mock_sb, index):
+        mock_sb.table.return_value = _memory_chain([], [])
+
+        index.sync()
+        index.sync()
+
+        assert mock_sb.table.call_count == 1
+
+    @patch("engine.memory_index.realtime.active", return_value=True)
+    @patch("engine.memory_index.supabase")
+    def test_realtime_stretches_sync_interval(self, mock_sb, mock_active, index):
+        mock_sb.table.return_value = _memory_chain([], [])
+
+        index.sync()
+        with patch("engine.memory_index.time.monotonic", return_value=time.monotonic() + 120):
+            index.sync()
+
+        assert mock_sb.table.call_count == 1
+
+    @patch("engine.memory_index.supabase")
+    def test_unconfirmed_subscription_keeps_sync_interval(self, mock_sb, index):
+        from engine import realtime
+
+        mock_sb.table.return_value = _memory_chain([], [])
+        thread = MagicMock(is_alive=MagicMock(return_value=True))
+        with patch.object(realtime, "_thread", thread), \
+             patch.object(realtime, "_subscribed", threading.Event()):
+            assert not realtime.active()  # listener running, not yet SUBSCRIBED
+            index.sync()
+            with patch("engine.memory_index.time.monotonic", return_value=time.monotonic() + 120):
+                index.sync()
+            assert mock_sb.table.call_count == 2
+
+            realtime.on_status("SUBSCRIBED")
+            assert realtime.active()
+            realtime.on_status("CHANNEL_ERROR", Exception("dropped"))
+            assert not realtime.active()
+
+    @patch("engine.memory_index.supabase")
+    def test_pages_until_short_page(self, mock_sb, index):
+        page = [_memory(f"m{i}", "x", created_at=f"2026-10-01T00:00:{i:02d}+00:00") for i in range(3)]
+        mock_sb.table.return_value = _memory_chain(page, [])
+
+        with patch("engine.memory_index.SYNC_PAGE_SIZE", 3):
+            assert index.sync(force=True) == 3
+
+        assert mock_sb.table.call_count == 2
+
+    @patch("engine.memory_index.supabase")
+    def test_pages_past_rows_sharing_one_updated_at(self, mock_sb, index):
+        stamp = "2026-10-05T00:00:00+00:00"
+        for i in range(3):
+            index.add(_memory(f"m{i}", "Pricing experiments"))
+        index.watermark = "2026-10-01T00:00:00+00:00"
+        archived = [_memory(f"m{i}", "Pricing experiments", status="archived", updated_at=stamp) for i in range(3)]
+        chain = _memory_chain(archived[:2], archived[2:])
+        mock_sb.table.return_value = chain
+
+        with patch("engine.memory_index.SYNC_PAGE_SIZE", 2):
+            assert index.sync(force=True) == 3
+
+        chain.or_.assert_called_once_with(f'updated_at.gt."{stamp}",and(updated_at.eq."{stamp}",id.gt.m1)')
+        chain.order.assert_any_call("id")
+        assert len(index) == 0
+
+    @patch("engine.memory_index.supabase")
+    def test_sync_failure_keeps_index(self, mock_sb, index):
+        index.add(_memory("m1", "Pricing"))
+        mock_sb.table.side_effect = Exception("offline")
+
+        assert index.sync(force=True) == 0
+        assert index.search("ed", "pricing")[0]["id"] == "m1"
+
+    def test_local_add_does_not_move_watermark(self, index):
+        index.add(_memory("m1", "Pricing", created_at="2026-10-05T00:00:00+00:00"))
+
+        assert index.watermark is None
+
+    @patch("engine.memory_index.supabase", None)
+    def test_load_restores_persisted_index(self, tmp_path):
+        from engine.memory_index import MemoryIndex
+
+        path = str(tmp_path / "memory.db")
+        previous = MemoryIndex(path=path)
+        previous.add(_memory("m1", "Pricing experiments"))
+        previous.watermark = "2026-10-03T00:00:00+00:00"
+        previous.save()
+
+        index = MemoryIndex(path=path)
+        index.sync()
+
+        assert index.watermark == "2026-10-03T00:00:00+00:00"
+        assert index.search("ed", "pricing")[0]["id"] == "m1"
+
+
+    def test_corrupt_file_falls_back_to_memory(self, tmp_path):
+        from engine.memory_index import MemoryIndex
+
+        path = tmp_path / "memory.db"
+        path.write_bytes(b"not a database" * 100)
+
+        index = MemoryIndex(path=str(path))
+        index.add(_memory("m1", "Pricing experiments"))
+
+        assert index.search("ed", "pricing")[0]["id"] == "m1"
+
+
+class TestFingerprints:
+    """Test SimHash fingerprints and near-duplicate lookup."""
+
+    def test_near_duplicates_are_close(self):
+        from engine.memory_index import simhash, hamming
+
+        a = simhash("Always run the smoke test before deploying to staging")
+        b = simhash("Always run smoke tests before deploying to staging")
+        c = simhash("Stripe webhooks need idempotency keys")
+
+        assert hamming(a, b) <= 6
+        assert hamming(a, c) > 12
+
+    def test_fits_signed_bigint(self):
+        from engine.memory_index import simhash
+
+        for text in ["alpha beta", "gamma delta epsilon", "zeta"]:
+            assert -(1 << 63) <= simhash(text) < (1 << 63)
+
+    def test_find_near_duplicate_scoped_to_agent(self, index):
+        from engine.memory_index import simhash
+
+        index.add(_memory("m1", "Fixed auth by adding null check before profile access"))
+        fingerprint = simhash("Fixed auth by adding a null check before accessing profile")
+
+        assert index.find_near_duplicate("ed", fingerprint, 6)["id"] == "m1"
+        assert index.find_near_duplicate("toji", fingerprint, 6) is None
+        assert index.find_near_duplicate("ed", simhash("Cache role cards"), 6) is None
+
+    def test_clusters_group_transitive_duplicates(self, index):
+        index.add(_memory("m1", "Always run the smoke test before deploying to staging"))
+        index.add(_memory("m2", "Always run smoke tests before deploying to staging"))
+        index.add(_memory("m3", "Stripe webhooks need idempotency keys"))
+
+        clusters = index.near_duplicate_clusters("ed", 6)
+
+        assert [sorted(m["id"] for m in group) for group in clusters] == [["m1", "m2"]]
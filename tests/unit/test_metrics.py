@@ -0,0 +1,194 @@
+"""Tests for engine.metrics — Prometheus-style metrics for Shogunate Engine."""
+
+import urllib.error
+import urllib.request
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+
+# ---------------------------------------------------------------------------
+# Metric families
+# ---------------------------------------------------------------------------
+
+
+class TestCounter:
+    """Test labelled counters."""
+
+    def test_inc_accumulates_per_label_set(self):
+        from engine.metrics import Counter
+
+        c = Counter("test_total", "Test counter.", ("reason",))
+        c.inc(reason="timeout")
+        c.inc(reason="timeout")
+        c.inc(reason="exit_code")
+
+        assert c.value(reason="timeout") == 2
+        assert c.value(reason="exit_code") == 1
+
+    def test_rejects_wrong_labels(self):
+        from engine.metrics import Counter
+
+        c = Counter("test_total", "Test counter.", ("reason",))
+        with pytest.raises(ValueError):
+            c.inc(model="haiku")
+
+    def test_render_text_format(self):
+        from engine.metrics import Counter
+
+        c = Counter("test_total", "Test counter.", ("reason",))
+        c.inc(reason="timeout")
+
+        text = c.render()
+        assert "# HELP test_total Test counter." in text
+        assert "# TYPE test_total counter" in text
+        assert 'test_total{reason="timeout"} 1' in text
+
+
+class TestGauge:
+    """Test gauges."""
+
+    def test_set_and_clear(self):
+        from engine.metrics import Gauge
+
+        g = Gauge("test_depth", "Test gauge.", ("daimyo", "status"))
+        g.set(3, daimyo="ed", status="queued")
+        assert g.value(daimyo="ed", status="queued") == 3
+
+        g.clear()
+        assert g.value(daimyo="ed", status="queued") == 0
+
+
+class TestHistogram:
+    """Test cumulative histograms."""
+
+    def test_buckets_are_cumulative(self):
+        from engine.metrics import Histogram
+
+        h = Histogram("test_seconds", "Test histogram.", buckets=(1.0, 5.0))
+        h.observe(0.5)
+        h.observe(3.0)
+        h.observe(100.0)
+
+        text = h.render()
+        assert 'test_seconds_bucket{le="1"} 1' in text
+        assert 'test_seconds_bucket{le="5"} 2' in text
+        assert 'test_seconds_bucket{le="+Inf"} 3' in text
+        assert "test_seconds_count 3" in text
+        assert "test_seconds_sum 103.5" in text
+
+    def test_count_per_label(self):
+        from engine.metrics import Histogram
+
+        h = Histogram("test_seconds", "Test histogram.", ("model",))
+        h.observe(1.0, model="sonnet")
+        h.observe(2.0, model="sonnet")
+
+        assert h.count(model="sonnet") == 2
+        assert h.count(model="opus") == 0
+
+
+# ---------------------------------------------------------------------------
+# HTTP endpoint
+# ---------------------------------------------------------------------------
+
+
+class TestServer:
+    """Test the localhost /metrics endpoint."""
+
+    def test_serves_registry_on_metrics_path(self):
+        from engine import metrics
+
+        server = metrics.start_server(port=0)
+        try:
+            assert metrics.enabled()
+            host, port = server.server_address[:2]
+            body = urllib.request.urlopen(f"http://{host}:{port}/metrics").read().decode()
+            assert "warroom_poll_cycle_seconds" in body
+            assert "warroom_claude_spawn_failures_total" in body
+        finally:
+            metrics.stop_server()
+
+        assert not metrics.enabled()
+
+    def test_other_paths_return_404(self):
+        from engine import metrics
+
+        server = metrics.start_server(port=0)
+        try:
+            host, port = server.server_address[:2]
+            with pytest.raises(urllib.error.HTTPError) as exc_info:
+                urllib.request.urlopen(f"http://{host}:{port}/")
+            assert exc_info.value.code == 404
+        finally:
+            metrics.stop_server()
+
+
+# ---------------------------------------------------------------------------
+# Engine instrumentation
+# ---------------------------------------------------------------------------
+
+
+class TestQueueDepth:
+    """Test poller queue depth sampling."""
+
+    @patch("engine.poller.supabase")
+    def test_counts_steps_per_daimyo_and_status(self, mock_sb):
+        from engine import metrics
+        from engine.poller import sample_queue_depth
+
+        chain = MagicMock()
+        chain.select.return_value = chain
+        chain.in_.return_value = chain
+        chain.execute.return_value = MagicMock(data=[
+            {"daimyo": "ed", "status": "queued"},
+            {"daimyo": "ed", "status": "queued"},
+            {"daimyo": "light", "status": "running"},
+        ])
+        mock_sb.table.return_value = chain
+
+        depth = sample_queue_depth()
+
+        assert depth == {("ed", "queued"): 2, ("light", "running"): 1}
+        assert metrics.QUEUE_DEPTH.value(daimyo="ed", status="queued") == 2
+        chain.in_.assert_called_once_with("status", ["queued", "running"])
+
+    @patch("engine.poller.supabase", None)
+    def test_returns_empty_without_supabase(self):
+        from engine.poller import sample_queue_depth
+
+        assert sample_queue_depth() == {}
+
+
+class TestSpawnFailures:
+    """Test claude spawn failure counting in the executor."""
+
+    @patch("engine.executor._update_agent_status")
+    @patch("engine.executor._check_mission_complete")
+    @patch("engine.executor._should_escalate", return_value=False)
+    @patch("engine.executor.emit")
+    @patch("engine.executor.supabase", None)
+    @patch("engine.executor._spawn_claude")
+    @patch("engine.executor._load_skill_md", return_value="")
+    def test_timeout_is_counted(self, mock_load, mock_spawn, mock_emit, *_):
+        import subprocess
+        from engine import metrics
+        from engine.executor import execute_step
+
+        before = metrics.CLAUDE_SPAWN_FAILURES_TOTAL.value(model="test-model", reason="timeout")
+        mock_spawn.side_effect = subprocess.TimeoutExpired(cmd=["claude"], timeout=60)
+
+        execute_step({
+            "id": "step-1",
+            "mission_id": "m-1",
+            "assigned_to": "ed",
+            "description": "Do it",
+            "timeout_minutes": 1,
+            "model": "test-model",
+            "created_at": "2026-01-01T00:00:00+00:00",
+            "started_at": "2026-01-01T00:00:30+00:00",
+        })
+
+        assert metrics.CLAUDE_SPAWN_FAILURES_TOTAL.value(model="test-model", reason="timeout") == before + 1
+        assert metrics.STEP_DURATION_SECONDS.count(model="test-model") >= 1
+        assert metrics.STEP_QUEUE_WAIT_SECONDS.count(model="test-model") >= 1
@@ -38,15 +38,9 @@ class TestCreateMission:
             "title": "Build API",
             "assigned_to": "ed",
             "status": "queued",
+            "steps": [],
         }
-
-        # Mission insert
-        mission_chain = MagicMock()
-        mission_chain.insert.return_value = mission_chain
-        mission_chain.execute.return_value = MagicMock(data=[mission_data])
-
-        # Steps insert (no steps in this test)
-        mock_sb.table.return_value = mission_chain
+        mock_sb.rpc.return_value.execute.return_value = MagicMock(data=mission_data)
 
         result = create_mission(
             proposal_id="p-001",
@@ -59,135 +53,156 @@ class TestCreateMission:
         assert result["id"] == "m-001"
         assert result["status"] == "queued"
         assert result["assigned_to"] == "ed"
+        assert result["steps"] == []
 
     @patch("engine.mission.emit")
-    @patch("engine.mission.get_best_collaborator")
-    @patch("engine.mission.DOMAIN_TO_DAIMYO", {"engineering": "ed", "product": "light"})
+    @patch("engine.mission.get_queue_depths", return_value={})
     @patch("engine.mission.DAIMYO_REGISTRY", {
         "ed": {"name": "Ed", "domain": "engineering"},
         "light": {"name": "Light", "domain": "product"},
     })
     @patch("engine.mission.supabase")
-    def test_assigns_step_by_domain(self, mock_sb, mock_collab, mock_emit):
+    def test_assigns_step_by_domain(self, mock_sb, mock_depths, mock_emit):
         from engine.mission import create_mission
 
-        mission_data = {
+        mock_sb.rpc.return_value.execute.return_value = MagicMock(data={
             "id": "m-002",
-            "proposal_id": "p-002",
-            "title": "Test",
-            "assigned_to": "ed",
-            "status": "queued",
-        }
+            "steps": [{"id": "s-001", "mission_id": "m-002", "title": "Product step", "daimyo": "light"}],
+        })
 
-        step_data = {
-            "id": "s-001",
-            "mission_id": "m-002",
-            "title": "Code step",
-            "daimyo": "ed",
-            "status": "queued",
-        }
+        result = create_mission(
+            proposal_id="p-002",
+            title="Test",
+            description="Test",
+            assigned_to="ed",
+            steps=[{"title": "Product step", "kind": "research", "domain": "product"}],
+        )
 
-        insert_chain = MagicMock()
-        insert_chain.insert.return_value = insert_chain
+        rpc_steps = mock_sb.rpc.call_args[0][1]["steps"]
+        assert rpc_steps[0]["daimyo"] == "light"
+        assert result["steps"][0]["daimyo"] == "light"
 
-        call_count = [0]
+    @patch("engine.mission.emit")
+    @patch("engine.mission.get_affinity")
+    @patch("engine.mission.get_queue_depths", return_value={})
+    @patch("engine.mission.DAIMYO_REGISTRY", {
+        "ed": {"name": "Ed", "domain": "engineering"},
+        "light": {"name": "Light", "domain": "product"},
+        "toji": {"name": "Toji", "domain": "commerce"},
+    })
+    @patch("engine.mission.supabase")
+    def test_uses_affinity_for_unknown_domain(self, mock_sb, mock_depths, mock_affinity, mock_emit):
+        from engine.mission import create_mission
 
-        def table_router(name):
-            call_count[0] += 1
-            if call_count[0] == 1:
-                # Mission insert
-                insert_chain.execute.return_value = MagicMock(data=[mission_data])
-            else:
-                # Step insert
-                insert_chain.execute.return_value = MagicMock(data=[step_data])
-            return insert_chain
+        mock_sb.rpc.return_value.execute.return_value = MagicMock(data={"id": "m-003", "steps": []})
+        mock_affinity.side_effect = lambda a, b: {"ed": 0.2, "light": 0.9, "toji": 0.4}[b]
+
+        create_mission(
+            proposal_id="p-003",
+            title="Test",
+            description="Test",
+            assigned_to="ed",
+            steps=[{"title": "Unknown domain step", "kind": "code", "domain": "mystery"}],
+        )
 
-        mock_sb.table.side_effect = table_router
+        # No domain fit anywhere — highest affinity to the primary wins
+        rpc_steps = mock_sb.rpc.call_args[0][1]["steps"]
+        assert rpc_steps[0]["daimyo"] == "light"
 
-        result = create_mission(
-            proposal_id="p-002",
+    @patch("engine.mission.emit")
+    @patch("engine.mission.get_queue_depths")
+    @patch("engine.mission.DAIMYO_REGISTRY", {
+        "ed": {"name": "Ed", "domain": "engineering"},
+        "light": {"name": "Light", "domain": "product"},
+    })
+    @patch("engine.mission.supabase")
+    def test_spreads_work_off_overloaded_specialist(self, mock_sb, mock_depths, mock_emit):
+        from engine.mission import create_mission
+
+        mock_depths.return_value = {"ed": 8}
+        mock_sb.rpc.return_value.execute.return_value = MagicMock(data={"id": "m-004", "steps": []})
+
+        create_mission(
+            proposal_id="p-004",
             title="Test",
             description="Test",
             assigned_to="ed",
             steps=[{"title": "Code step", "kind": "code", "domain": "engineering"}],
         )
 
-        # Should NOT call get_best_collaborator — direct domain match
-        mock_collab.assert_not_called()
-        assert result["steps"][0]["daimyo"] == "ed"
+        rpc_steps = mock_sb.rpc.call_args[0][1]["steps"]
+        assert rpc_steps[0]["daimyo"] == "light"
 
     @patch("engine.mission.emit")
-    @patch("engine.mission.get_best_collaborator")
-    @patch("engine.mission.DOMAIN_TO_DAIMYO", {"engineering": "ed"})
+    @patch("engine.mission.get_queue_depths")
     @patch("engine.mission.DAIMYO_REGISTRY", {
         "ed": {"name": "Ed", "domain": "engineering"},
         "light": {"name": "Light", "domain": "product"},
     })
     @patch("engine.mission.supabase")
-    def test_uses_affinity_for_unknown_domain(self, mock_sb, mock_collab, mock_emit):
+    def test_counts_own_assignments_toward_load(self, mock_sb, mock_depths, mock_emit):
         from engine.mission import create_mission
 
-        mission_data = {
-            "id": "m-003",
-            "proposal_id": "p-003",
-            "title": "Test",
-            "assigned_to": "ed",
-            "status": "queued",
-        }
-
-        step_data = {
-            "id": "s-002",
-            "mission_id": "m-003",
-            "title": "Unknown domain step",
-            "daimyo": "light",
-            "status": "queued",
-        }
+        loads = {"ed": 3}
+        mock_depths.return_value = loads
+        mock_sb.rpc.return_value.execute.return_value = MagicMock(data={"id": "m-005", "steps": []})
 
-        insert_chain = MagicMock()
-        insert_chain.insert.return_value = insert_chain
+        create_mission(
+            proposal_id="p-005",
+            title="Test",
+            description="Test",
+            assigned_to="ed",
+            steps=[{"title": f"Step {i}", "domain": "engineering"} for i in range(6)],
+        )
 
-        call_count = [0]
+        daimyos = [s["daimyo"] for s in mock_sb.rpc.call_args[0][1]["steps"]]
+        assert daimyos[0] == "ed"
+        assert "light" in daimyos
+        assert loads["ed"] + loads["light"] == 3 + 6
 
-        def table_router(name):
-            call_count[0] += 1
-            if call_count[0] == 1:
-                insert_chain.execute.return_value = MagicMock(data=[mission_data])
-            else:
-                insert_chain.execute.return_value = MagicMock(data=[step_data])
-            return insert_chain
+    @patch("engine.mission.emit")
+    @patch("engine.mission.select_team", return_value=["ed", "light"])
+    @patch("engine.mission.get_queue_depths", return_value={})
+    @patch("engine.mission.DAIMYO_REGISTRY", {
+        "ed": {"name": "Ed", "domain": "engineering"},
+        "light": {"name": "Light", "domain": "product"},
+        "toji": {"name": "Toji", "domain": "commerce"},
+    })
+    @patch("engine.mission.supabase")
+    def test_multi_domain_mission_stays_within_team(self, mock_sb, mock_depths, mock_team, mock_emit):
+        from engine.mission import create_mission
 
-        mock_sb.table.side_effect = table_router
-        mock_collab.return_value = "light"
+        mock_sb.rpc.return_value.execute.return_value = MagicMock(data={"id": "m-006", "steps": []})
 
-        result = create_mission(
-            proposal_id="p-003",
+        create_mission(
+            proposal_id="p-006",
             title="Test",
             description="Test",
             assigned_to="ed",
-            steps=[{"title": "Unknown domain step", "kind": "code", "domain": "mystery"}],
+            steps=[
+                {"title": "Build", "domain": "engineering"},
+                {"title": "Price", "domain": "commerce"},
+                {"title": "Spec", "domain": "product"},
+            ],
         )
 
-        # Should call get_best_collaborator since domain "mystery" not in DOMAIN_TO_DAIMYO
-        mock_collab.assert_called_once()
+        assert mock_team.call_args[0][:2] == ("ed", ["engineering", "commerce", "product"])
+        daimyos = [s["daimyo"] for s in mock_sb.rpc.call_args[0][1]["steps"]]
+        assert daimyos[0] == "ed"
+        assert daimyos[2] == "light"
+        assert "toji" not in daimyos
 
     @patch("engine.mission.emit")
     @patch("engine.mission.supabase")
     def test_emits_mission_started_event(self, mock_sb, mock_emit):
         from engine.mission import create_mission
 
-        mission_data = {
+        mock_sb.rpc.return_value.execute.return_value = MagicMock(data={
             "id": "m-004",
-            "proposal_id": "p-004",
             "title": "Build Feature",
             "assigned_to": "ed",
-            "status": "queued",
-        }
-
-        insert_chain = MagicMock()
-        insert_chain.insert.return_value = insert_chain
-        insert_chain.execute.return_value = MagicMock(data=[mission_data])
-
-        mock_sb.table.return_value = insert_chain
+            "steps": [],
+        })
 
         create_mission(
             proposal_id="p-004",
@@ -210,20 +225,7 @@ class TestCreateMission:
     def test_includes_project_id_if_provided(self, mock_sb, mock_emit):
         from engine.mission import create_mission
 
-        mission_data = {
-            "id": "m-005",
-            "proposal_id": "p-005",
-            "project_id": "proj-001",
-            "title": "Test",
-            "assigned_to": "ed",
-            "status": "queued",
-        }
-
-        insert_chain = MagicMock()
-        insert_chain.insert.return_value = insert_chain
-        insert_chain.execute.return_value = MagicMock(data=[mission_data])
-
-        mock_sb.table.return_value = insert_chain
+        mock_sb.rpc.return_value.execute.return_value = MagicMock(data={"id": "m-005", "steps": []})
 
         create_mission(
             proposal_id="p-005",
@@ -234,9 +236,88 @@ class TestCreateMission:
             project_id="proj-001",
         )
 
-        # Verify insert was called with project_id
-        insert_call = insert_chain.insert.call_args[0][0]
-        assert insert_call["project_id"] == "proj-001"
+        # Verify the RPC was called with project_id on the mission
+        rpc_params = mock_sb.rpc.call_args[0][1]
+        assert rpc_params["mission"]["project_id"] == "proj-001"
+
+    @patch("engine.mission.emit")
+    @patch("engine.mission.get_queue_depths", return_value={})
+    def test_mission_and_steps_are_one_round_trip(self, mock_depths, mock_emit):
+        from engine.db import InstrumentedClient, RoundTripBudget
+        from engine.mission import create_mission
+
+        client = MagicMock()
+        client.rpc.return_value.execute.return_value = MagicMock(data={
+            "id": "m-006",
+            "steps": [{"id": f"s-{i}"} for i in range(10)],
+        })
+
+        with patch("engine.mission.supabase", InstrumentedClient(client)):
+            with RoundTripBudget(1):
+                result = create_mission(
+                    proposal_id="p-006",
+                    title="Big decomposition",
+                    description="Ten steps",
+                    assigned_to="ed",
+                    steps=[{"title": f"Step {i}", "domain": "engineering"} for i in range(10)],
+                )
+
+        client.rpc.assert_called_once()
+        assert client.rpc.call_args[0][0] == "create_mission_with_steps"
+        assert len(client.rpc.call_args[0][1]["steps"]) == 10
+        client.table.assert_not_called()
+        assert len(result["steps"]) == 10
+
+
+# ---------------------------------------------------------------------------
+# get_queue_depths
+# ---------------------------------------------------------------------------
+
+
+class TestGetQueueDepths:
+    """Test the cached per-daimyo queue depth lookup."""
+
+    def setup_method(self):
+        from engine import mission
+        mission._load_cache.update({"loaded_at": 0.0, "depths": {}})
+
+    @patch("engine.mission.supabase", None)
+    def test_returns_empty_without_supabase(self):
+        from engine.mission import get_queue_depths
+
+        assert get_queue_depths() == {}
+
+    @patch("engine.mission.supabase")
+    def test_counts_queued_and_running_per_daimyo(self, mock_sb):
+        from engine.mission import get_queue_depths
+
+        chain = MagicMock()
+        chain.select.return_value = chain
+        chain.in_.return_value = chain
+        chain.execute.return_value = MagicMock(data=[
+            {"daimyo": "ed"}, {"daimyo": "ed"}, {"daimyo": "light"}, {"daimyo": None},
+        ])
+        mock_sb.table.return_value = chain
+
+        assert get_queue_depths() == {"ed": 2, "light": 1}
+        chain.in_.assert_called_once_with("status", ["queued", "running"])
+
+    @patch("engine.mission.supabase")
+    def test_cached_within_ttl(self, mock_sb):
+        from engine.mission import get_queue_depths
+
+        chain = MagicMock()
+        chain.select.return_value = chain
+        chain.in_.return_value = chain
+        chain.execute.return_value = MagicMock(data=[{"daimyo": "ed"}])
+        mock_sb.table.return_value = chain
+
+        get_queue_depths()
+        get_queue_depths()
+        assert chain.execute.call_count == 1
+
+        get_queue_depths(refresh=True)
+        assert chain.execute.call_count == 2
 
 
 # ---------------------------------------------------------------------------
@@ -258,11 +339,7 @@ class TestRunPending:
     def test_returns_empty_when_no_approved_proposals(self, mock_sb):
         from engine.mission import run_pending
 
-        select_chain = MagicMock()
-        select_chain.select.return_value = select_chain
-        select_chain.eq.return_value = select_chain
-        select_chain.execute.return_value = MagicMock(data=[])
-
+        select_chain = _proposals_chain([])
         mock_sb.table.return_value = select_chain
 
         result = run_pending()
@@ -283,27 +360,7 @@ class TestRunPending:
             "status": "approved",
         }
 
-        # First call: proposals query
-        proposals_chain = MagicMock()
-        proposals_chain.select.return_value = proposals_chain
-        proposals_chain.eq.return_value = proposals_chain
-        proposals_chain.execute.return_value = MagicMock(data=[proposal])
-
-        # Second call: missions query for existing proposal_ids
-        missions_chain = MagicMock()
-        missions_chain.select.return_value = missions_chain
-        missions_chain.execute.return_value = MagicMock(data=[])
-
-        call_count = [0]
-
-        def table_router(name):
-            call_count[0] += 1
-            if call_count[0] == 1:
-                return proposals_chain
-            return missions_chain
-
-        mock_sb.table.side_effect = table_router
-
+        mock_sb.table.return_value = _proposals_chain([proposal])
         mock_create.return_value = {"id": "m-010", "title": "Add auth", "steps": []}
 
         result = run_pending()
@@ -311,52 +368,37 @@ class TestRunPending:
         assert len(result) == 1
         mock_create.assert_called_once()
         # Verify create_mission was called with 3 steps (research, code, review)
-        create_call_kwargs = mock_create.call_args
-        steps_arg = create_call_kwargs[1].get("steps") or create_call_kwargs[0][4] if len(create_call_kwargs[0]) > 4 else None
-        # The steps should be passed via keyword arg
-        if steps_arg is None:
-            steps_arg = create_call_kwargs.kwargs.get("steps", [])
+        steps_arg = mock_create.call_args.kwargs.get("steps", [])
         assert len(steps_arg) == 3
 
     @patch("engine.mission.create_mission")
-    @patch("engine.mission.DOMAIN_TO_DAIMYO", {"engineering": "ed"})
     @patch("engine.mission.supabase")
-    def test_skips_proposals_with_existing_missions(self, mock_sb, mock_create):
+    def test_queries_only_unconverted_approved_proposals(self, mock_sb, mock_create):
+        """Anti-join on proposals.mission_id instead of scanning missions."""
         from engine.mission import run_pending
 
-        proposal = {
-            "id": "p-020",
-            "title": "Already has mission",
-            "description": "Already processed",
-            "domain": "engineering",
-            "status": "approved",
-        }
-
-        # Proposals query
-        proposals_chain = MagicMock()
-        proposals_chain.select.return_value = proposals_chain
-        proposals_chain.eq.return_value = proposals_chain
-        proposals_chain.execute.return_value = MagicMock(data=[proposal])
-
-        # Missions query — this proposal already has a mission
-        missions_chain = MagicMock()
-        missions_chain.select.return_value = missions_chain
-        missions_chain.execute.return_value = MagicMock(data=[{"proposal_id": "p-020"}])
+        chain = _proposals_chain([])
+        mock_sb.table.return_value = chain
 
-        call_count = [0]
+        run_pending()
 
-        def table_router(name):
-            call_count[0] += 1
-            if call_count[0] == 1:
-                return proposals_chain
-            return missions_chain
+        mock_sb.table.assert_called_once_with("proposals")
+        chain.eq.assert_called_once_with("status", "approved")
+        chain.is_.assert_called_once_with("mission_id", "null")
+        mock_create.assert_not_called()
 
-        mock_sb.table.side_effect = table_router
+    @patch("engine.mission.create_mission")
+    def test_poll_is_one_round_trip(self, mock_create):
+        from engine.db import InstrumentedClient, RoundTripBudget
+        from engine.mission import run_pending
 
-        result = run_pending()
+        client = MagicMock()
+        client.table.return_value = _proposals_chain([{"id": "p-1", "title": "T"}])
+        mock_create.return_value = {"id": "m-1", "steps": []}
 
-        assert result == []
-        mock_create.assert_not_called()
+        with patch("engine.mission.supabase", InstrumentedClient(client)):
+            with RoundTripBudget(1, caller="engine.mission.run_pending"):
+                run_pending()
 
     @patch("engine.mission.create_mission")
     @patch("engine.mission.DOMAIN_TO_DAIMYO", {"engineering": "ed"})
@@ -373,25 +415,7 @@ class TestRunPending:
             "status": "approved",
         }
 
-        proposals_chain = MagicMock()
-        proposals_chain.select.return_value = proposals_chain
-        proposals_chain.eq.return_value = proposals_chain
-        proposals_chain.execute.return_value = MagicMock(data=[proposal])
-
-        missions_chain = MagicMock()
-        missions_chain.select.return_value = missions_chain
-        missions_chain.execute.return_value = MagicMock(data=[])
-
-        call_count = [0]
-
-        def table_router(name):
-            call_count[0] += 1
-            if call_count[0] == 1:
-                return proposals_chain
-            return missions_chain
-
-        mock_sb.table.side_effect = table_router
-
+        mock_sb.table.return_value = _proposals_chain([proposal])
         mock_create.return_value = {"id": "m-030", "steps": []}
 
         run_pending()
@@ -405,6 +429,17 @@ class TestRunPending:
         assert steps[2]["kind"] == "review"
 
 
+def _proposals_chain(data):
+    """Mock the proposals select chain used by run_pending()."""
+    chain = MagicMock()
+    chain.select.return_value = chain
+    chain.eq.return_value = chain
+    chain.is_.return_value = chain
+    chain.order.return_value = chain
+    chain.execute.return_value = MagicMock(data=data)
+    return chain
+
+
 # ---------------------------------------------------------------------------
 # DOMAIN_TO_DAIMYO mapping
 # ---------------------------------------------------------------------------
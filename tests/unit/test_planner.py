@@ -0,0 +1,215 @@
+"""Tests for engine.planner — Mission decomposition planners."""
+
+import json
+import time
+from unittest.mock import MagicMock, patch
+
+
+def _proposal(**overrides):
+    proposal = {
+        "id": "p-001",
+        "title": "Weekly metrics report 2026-10-12",
+        "description": "Compile the 14 KPIs for week 41",
+        "domain": "operations",
+        "source": "cron",
+    }
+    proposal.update(overrides)
+    return proposal
+
+
+def _llm_output(steps):
+    return MagicMock(stdout=json.dumps(steps), stderr="", returncode=0)
+
+
+# ---------------------------------------------------------------------------
+# Routing
+# ---------------------------------------------------------------------------
+
+
+class TestGetPlanner:
+    """Test planner routing by domain and source."""
+
+    def test_manual_proposals_use_default(self):
+        from engine.planner import get_planner, DEFAULT_PLANNER
+
+        assert get_planner(_proposal(source="manual")) == DEFAULT_PLANNER
+
+    def test_recurring_sources_use_llm(self):
+        from engine.planner import get_planner
+
+        assert get_planner(_proposal(source="cron")) == "llm"
+        assert get_planner(_proposal(source="discord")) == "llm"
+
+    def test_exact_route_wins_over_source(self):
+        from engine import planner
+
+        with patch.dict(planner._ROUTES, {("commerce", "cron"): "heuristic"}):
+            assert planner.get_planner(_proposal(domain="commerce", source="cron")) == "heuristic"
+            assert planner.get_planner(_proposal(domain="operations", source="cron")) == "llm"
+
+    def test_domain_route(self):
+        from engine import planner
+
+        with patch.dict(planner._ROUTES, {("product", None): "llm"}):
+            assert planner.get_planner(_proposal(domain="product", source="manual")) == "llm"
+
+
+# ---------------------------------------------------------------------------
+# plan()
+# ---------------------------------------------------------------------------
+
+
+class TestPlan:
+    """Test plan dispatch and fallback."""
+
+    def test_heuristic_triple(self):
+        from engine.planner import plan
+
+        steps = plan(_proposal(source="manual"))
+
+        assert [s["kind"] for s in steps] == ["research", "code", "review"]
+        assert all(s["domain"] == "operations" for s in steps)
+
+    def test_custom_planner_is_used(self):
+        from engine import planner
+
+        custom = MagicMock(return_value=[{"title": "Only step", "description": "x", "kind": "write", "domain": "product"}])
+        with patch.dict(planner._PLANNERS, {"custom": custom}), \
+                patch.dict(planner._ROUTES, {(None, "manual"): "custom"}):
+            steps = planner.plan(_proposal(source="manual"))
+
+        assert steps[0]["title"] == "Only step"
+
+    def test_falls_back_to_heuristic_on_error(self):
+        from engine import planner
+
+        broken = MagicMock(side_effect=RuntimeError("boom"))
+        with patch.dict(planner._PLANNERS, {"llm": broken}):
+            steps = planner.plan(_proposal(source="cron"))
+
+        assert len(steps) == 3
+
+    def test_falls_back_to_heuristic_on_empty_plan(self):
+        from engine import planner
+
+        with patch.dict(planner._PLANNERS, {"llm": MagicMock(return_value=[])}):
+            steps = planner.plan(_proposal(source="cron"))
+
+        assert len(steps) == 3
+
+
+# ---------------------------------------------------------------------------
+# LLM planner + cache
+# ---------------------------------------------------------------------------
+
+
+class TestLLMPlanner:
+    """Test the CHEAP_MODEL planner and its plan cache."""
+
+    @patch("engine.planner.subprocess.run")
+    def test_calls_cheap_model_and_renders_placeholders(self, mock_run, tmp_path):
+        from engine.config import CHEAP_MODEL
+        from engine.planner import llm_plan
+
+        mock_run.return_value = _llm_output([
+            {"title": "Gather: {title}", "description": "Pull data for {description}", "kind": "analyze", "domain": "operations"},
+            {"title": "Write report", "description": "Summarize", "kind": "write", "domain": "product"},
+        ])
+
+        with patch("engine.planner.PLAN_CACHE_FILE", str(tmp_path / "plans.json")):
+            steps = llm_plan(_proposal())
+
+        cmd = mock_run.call_args[0][0]
+        assert cmd[:4] == ["claude", "-p", "--model", CHEAP_MODEL]
+        assert steps[0]["title"] == "Gather: Weekly metrics report 2026-10-12"
+        assert steps[0]["description"] == "Pull data for Compile the 14 KPIs for week 41"
+        assert steps[1]["domain"] == "product"
+
+    @patch("engine.planner.subprocess.run")
+    def test_null_description_renders_empty(self, mock_run, tmp_path):
+        from engine.planner import llm_plan
+
+        mock_run.return_value = _llm_output([
+            {"title": "Report: {title}", "description": "Cover {description}", "kind": "write", "domain": "operations"},
+        ])
+
+        with patch("engine.planner.PLAN_CACHE_FILE", str(tmp_path / "plans.json")):
+            steps = llm_plan(_proposal(description=None))
+
+        assert steps[0]["description"] == "Cover "
+
+    @patch("engine.planner.subprocess.run")
+    def test_similar_proposal_reuses_cached_plan(self, mock_run, tmp_path):
+        from engine.planner import llm_plan
+
+        mock_run.return_value = _llm_output([
+            {"title": "Report: {title}", "description": "{description}", "kind": "write", "domain": "operations"},
+        ])
+
+        with patch("engine.planner.PLAN_CACHE_FILE", str(tmp_path / "plans.json")):
+            llm_plan(_proposal())
+            steps = llm_plan(_proposal(
+                id="p-002",
+                title="Weekly metrics report 2026-10-19",
+                description="Compile the 15 KPIs for week 42",
+            ))
+
+        mock_run.assert_called_once()
+        assert steps[0]["title"] == "Report: Weekly metrics report 2026-10-19"
+
+    @patch("engine.planner.subprocess.run")
+    def test_expired_plan_is_regenerated(self, mock_run, tmp_path):
+        from engine.planner import llm_plan
+
+        mock_run.return_value = _llm_output([
+            {"title": "{title}", "description": "{description}", "kind": "write", "domain": "operations"},
+        ])
+
+        with patch("engine.planner.PLAN_CACHE_FILE", str(tmp_path / "plans.json")), \
+                patch("engine.planner.PLAN_CACHE_TTL", 60):
+            llm_plan(_proposal())
+            with patch("engine.planner.time.time", return_value=time.time() + 120):
+                llm_plan(_proposal())
+
+        assert mock_run.call_count == 2
+
+    @patch("engine.planner.subprocess.run")
+    def test_invalid_fields_are_coerced(self, mock_run, tmp_path):
+        from engine.planner import llm_plan, MAX_PLAN_STEPS
+
+        mock_run.return_value = _llm_output(
+            [{"title": "Do it", "kind": "dance", "domain": "astrology"}, "junk", {"description": "no title"}]
+            + [{"title": f"Extra {i}"} for i in range(10)]
+        )
+
+        with patch("engine.planner.PLAN_CACHE_FILE", str(tmp_path / "plans.json")):
+            steps = llm_plan(_proposal())
+
+        assert steps[0] == {"title": "Do it", "description": "Do it", "kind": "code", "domain": "operations"}
+        assert len(steps) <= MAX_PLAN_STEPS
+
+    @patch("engine.planner.subprocess.run")
+    def test_nonzero_exit_returns_empty(self, mock_run, tmp_path):
+        from engine.planner import llm_plan
+
+        mock_run.return_value = MagicMock(stdout="", stderr="err", returncode=1)
+
+        with patch("engine.planner.PLAN_CACHE_FILE", str(tmp_path / "plans.json")):
+            assert llm_plan(_proposal()) == []
+
+
+class TestFingerprint:
+    """Test proposal normalization for the plan cache."""
+
+    def test_ignores_numbers_case_and_punctuation(self):
+        from engine.planner import proposal_fingerprint
+
+        a = proposal_fingerprint(_proposal(title="Daily Digest — 2026-10-18!"))
+        b = proposal_fingerprint(_proposal(title="daily digest 2026-10-19"))
+        assert a == b
+
+    def test_domain_and_source_distinguish(self):
+        from engine.planner import proposal_fingerprint
+
+        assert proposal_fingerprint(_proposal(source="cron")) != proposal_fingerprint(_proposal(source="discord"))
+        assert proposal_fingerprint(_proposal(domain="product")) != proposal_fingerprint(_proposal(domain="commerce"))
@@ -366,6 +366,58 @@ class TestPollCycle:
         assert "last_run" in new_state
 
 
+# ---------------------------------------------------------------------------
+# run_maintenance
+# ---------------------------------------------------------------------------
+
+
+class TestRunMaintenance:
+    """Test periodic maintenance scheduling."""
+
+    def test_runs_due_jobs_and_records_time(self):
+        from engine.poller import run_maintenance
+
+        job = MagicMock(return_value=3)
+        with patch("engine.poller.maintenance_jobs", return_value=[("rollup", 100, job)]):
+            state = {}
+            ran = run_maintenance(state, now=1000.0)
+
+        assert ran == ["rollup"]
+        job.assert_called_once()
+        assert state["maintenance"]["rollup"] == 1000.0
+
+    def test_skips_jobs_within_interval(self):
+        from engine.poller import run_maintenance
+
+        job = MagicMock()
+        with patch("engine.poller.maintenance_jobs", return_value=[("rollup", 100, job)]):
+            ran = run_maintenance({"maintenance": {"rollup": 950.0}}, now=1000.0)
+
+        assert ran == []
+        job.assert_not_called()
+
+    def test_failing_job_waits_for_next_interval(self):
+        from engine.poller import run_maintenance
+
+        job = MagicMock(side_effect=Exception("rpc failed"))
+        with patch("engine.poller.maintenance_jobs", return_value=[("rollup", 100, job)]):
+            state = {}
+            run_maintenance(state, now=1000.0)
+            run_maintenance(state, now=1050.0)
+
+        job.assert_called_once()
+        assert state["maintenance"]["rollup"] == 1000.0
+
+    def test_zero_interval_disables_job(self):
+        from engine.poller import run_maintenance
+
+        job = MagicMock()
+        with patch("engine.poller.maintenance_jobs", return_value=[("rollup", 0, job)]):
+            assert run_maintenance({}, now=1000.0) == []
+
+        job.assert_not_called()
+
+
 # ---------------------------------------------------------------------------
 # main loop behavior
 # ---------------------------------------------------------------------------
@@ -435,6 +487,25 @@ class TestMainLoop:
         assert 60 in sleep_calls
 
 
+    @patch("engine.poller.metrics.stop_server")
+    @patch("engine.poller.flush_events")
+    @patch("engine.poller.flush_extractions", side_effect=Exception("offline"))
+    @patch("engine.poller.save_state")
+    @patch("engine.poller.poll_cycle", side_effect=KeyboardInterrupt())
+    @patch("engine.poller.load_state", return_value={})
+    @patch("engine.poller.supabase", MagicMock())
+    def test_shutdown_steps_run_after_a_failure(
+        self, mock_load, mock_poll, mock_save, mock_extract, mock_flush, mock_stop
+    ):
+        from engine.poller import main
+
+        main()
+
+        mock_extract.assert_called_once_with(force=True)
+        mock_flush.assert_called_once()
+        mock_stop.assert_called_once()
+
+
 # ---------------------------------------------------------------------------
 # Module-level constants
 # ---------------------------------------------------------------------------
@@ -7,14 +7,14 @@ import pytest
 
 
 # ---------------------------------------------------------------------------
-# create_proposal — insert + event emission
+# create_proposal — insert (events come from proposal_event_trigger)
 # ---------------------------------------------------------------------------
 
 
 class TestCreateProposal:
-    """Verify create_proposal() inserts into proposals table and emits event."""
+    """Verify create_proposal() inserts into proposals table."""
 
-    @patch("engine.proposal.emit")
+    @patch("engine.events.emit")
     @patch("engine.proposal.supabase")
     def test_inserts_into_proposals_table(self, mock_sb, mock_emit):
         from engine.proposal import create_proposal
@@ -27,7 +27,7 @@ class TestCreateProposal:
 
         mock_sb.table.assert_called_once_with("proposals")
 
-    @patch("engine.proposal.emit")
+    @patch("engine.events.emit")
     @patch("engine.proposal.supabase")
     def test_insert_data_contains_required_fields(self, mock_sb, mock_emit):
         from engine.proposal import create_proposal
@@ -44,7 +44,7 @@ class TestCreateProposal:
         assert insert_arg["domain"] == "engineering"
         assert insert_arg["status"] == "pending"
 
-    @patch("engine.proposal.emit")
+    @patch("engine.events.emit")
     @patch("engine.proposal.supabase")
     def test_default_requested_by_is_sensei(self, mock_sb, mock_emit):
         from engine.proposal import create_proposal
@@ -58,7 +58,7 @@ class TestCreateProposal:
         insert_arg = mock_sb.table.return_value.insert.call_args[0][0]
         assert insert_arg["requested_by"] == "Sensei"
 
-    @patch("engine.proposal.emit")
+    @patch("engine.events.emit")
     @patch("engine.proposal.supabase")
     def test_custom_requested_by(self, mock_sb, mock_emit):
         from engine.proposal import create_proposal
@@ -72,7 +72,7 @@ class TestCreateProposal:
         insert_arg = mock_sb.table.return_value.insert.call_args[0][0]
         assert insert_arg["requested_by"] == "Pip"
 
-    @patch("engine.proposal.emit")
+    @patch("engine.events.emit")
     @patch("engine.proposal.supabase")
     def test_project_id_included_when_provided(self, mock_sb, mock_emit):
         from engine.proposal import create_proposal
@@ -86,7 +86,7 @@ class TestCreateProposal:
         insert_arg = mock_sb.table.return_value.insert.call_args[0][0]
         assert insert_arg["project_id"] == "proj-123"
 
-    @patch("engine.proposal.emit")
+    @patch("engine.events.emit")
     @patch("engine.proposal.supabase")
     def test_project_id_none_by_default(self, mock_sb, mock_emit):
         from engine.proposal import create_proposal
@@ -100,7 +100,7 @@ class TestCreateProposal:
         insert_arg = mock_sb.table.return_value.insert.call_args[0][0]
         assert insert_arg["project_id"] is None
 
-    @patch("engine.proposal.emit")
+    @patch("engine.events.emit")
     @patch("engine.proposal.supabase")
     def test_source_defaults_to_manual(self, mock_sb, mock_emit):
         from engine.proposal import create_proposal
@@ -114,7 +114,7 @@ class TestCreateProposal:
         insert_arg = mock_sb.table.return_value.insert.call_args[0][0]
         assert insert_arg["source"] == "manual"
 
-    @patch("engine.proposal.emit")
+    @patch("engine.events.emit")
     @patch("engine.proposal.supabase")
     def test_source_custom_value(self, mock_sb, mock_emit):
         from engine.proposal import create_proposal
@@ -128,7 +128,7 @@ class TestCreateProposal:
         insert_arg = mock_sb.table.return_value.insert.call_args[0][0]
         assert insert_arg["source"] == "discord"
 
-    @patch("engine.proposal.emit")
+    @patch("engine.events.emit")
     @patch("engine.proposal.supabase")
     def test_returns_created_proposal(self, mock_sb, mock_emit):
         from engine.proposal import create_proposal
@@ -142,9 +142,9 @@ class TestCreateProposal:
 
         assert result == expected
 
-    @patch("engine.proposal.emit")
+    @patch("engine.events.emit")
     @patch("engine.proposal.supabase")
-    def test_emits_proposal_created_event(self, mock_sb, mock_emit):
+    def test_leaves_proposal_created_event_to_trigger(self, mock_sb, mock_emit):
         from engine.proposal import create_proposal
 
         mock_sb.table.return_value.insert.return_value.execute.return_value = MagicMock(
@@ -153,13 +153,8 @@ class TestCreateProposal:
 
         create_proposal("Fix auth", "Fix the login bug", "engineering")
 
-        mock_emit.assert_called_once()
-        event_type = mock_emit.call_args[0][0]
-        event_payload = mock_emit.call_args[0][1]
-        assert event_type == "proposal_created"
-        assert event_payload["proposal_id"] == "prop-1"
-        assert event_payload["title"] == "Fix auth"
-        assert event_payload["domain"] == "engineering"
+        # proposal_event_trigger writes the event; the engine must not duplicate it
+        mock_emit.assert_not_called()
 
     @patch("engine.proposal.supabase", None)
     def test_raises_runtime_error_when_no_supabase(self):
@@ -266,14 +261,14 @@ class TestListPending:
 
 
 # ---------------------------------------------------------------------------
-# approve — update status + emit event
+# approve — update status
 # ---------------------------------------------------------------------------
 
 
 class TestApprove:
-    """Verify approve() updates proposal and emits event."""
+    """Verify approve() updates proposal."""
 
-    @patch("engine.proposal.emit")
+    @patch("engine.events.emit")
     @patch("engine.proposal.supabase")
     def test_updates_status_to_approved(self, mock_sb, mock_emit):
         from engine.proposal import approve
@@ -291,7 +286,7 @@ class TestApprove:
         update_arg = chain.update.call_args[0][0]
         assert update_arg["status"] == "approved"
 
-    @patch("engine.proposal.emit")
+    @patch("engine.events.emit")
     @patch("engine.proposal.supabase")
     def test_sets_approved_at_timestamp(self, mock_sb, mock_emit):
         from engine.proposal import approve
@@ -312,7 +307,7 @@ class TestApprove:
         dt = datetime.fromisoformat(update_arg["approved_at"])
         assert dt.tzinfo is not None
 
-    @patch("engine.proposal.emit")
+    @patch("engine.events.emit")
     @patch("engine.proposal.supabase")
     def test_sets_approved_by(self, mock_sb, mock_emit):
         from engine.proposal import approve
@@ -330,7 +325,7 @@ class TestApprove:
         update_arg = chain.update.call_args[0][0]
         assert update_arg["approved_by"] == "Ed"
 
-    @patch("engine.proposal.emit")
+    @patch("engine.events.emit")
     @patch("engine.proposal.supabase")
     def test_default_approved_by_is_sensei(self, mock_sb, mock_emit):
         from engine.proposal import approve
@@ -348,7 +343,7 @@ class TestApprove:
         update_arg = chain.update.call_args[0][0]
         assert update_arg["approved_by"] == "Sensei"
 
-    @patch("engine.proposal.emit")
+    @patch("engine.events.emit")
     @patch("engine.proposal.supabase")
     def test_filters_by_proposal_id(self, mock_sb, mock_emit):
         from engine.proposal import approve
@@ -365,7 +360,7 @@ class TestApprove:
 
         chain.eq.assert_called_once_with("id", "prop-1")
 
-    @patch("engine.proposal.emit")
+    @patch("engine.events.emit")
     @patch("engine.proposal.supabase")
     def test_returns_updated_proposal(self, mock_sb, mock_emit):
         from engine.proposal import approve
@@ -381,9 +376,9 @@ class TestApprove:
 
         assert result == expected
 
-    @patch("engine.proposal.emit")
+    @patch("engine.events.emit")
     @patch("engine.proposal.supabase")
-    def test_emits_proposal_approved_event(self, mock_sb, mock_emit):
+    def test_leaves_proposal_approved_event_to_trigger(self, mock_sb, mock_emit):
         from engine.proposal import approve
 
         chain = MagicMock()
@@ -396,14 +391,9 @@ class TestApprove:
 
         approve("prop-1", approved_by="Sensei")
 
-        mock_emit.assert_called_once()
-        event_type = mock_emit.call_args[0][0]
-        event_payload = mock_emit.call_args[0][1]
-        assert event_type == "proposal_approved"
-        assert event_payload["proposal_id"] == "prop-1"
-        assert event_payload["approved_by"] == "Sensei"
+        mock_emit.assert_not_called()
 
-    @patch("engine.proposal.emit")
+    @patch("engine.events.emit")
     @patch("engine.proposal.supabase")
     def test_returns_fallback_when_no_result_data(self, mock_sb, mock_emit):
         from engine.proposal import approve
@@ -427,14 +417,14 @@ class TestApprove:
 
 
 # ---------------------------------------------------------------------------
-# reject — update status + emit event
+# reject — update status + reason
 # ---------------------------------------------------------------------------
 
 
 class TestReject:
-    """Verify reject() updates proposal and emits event."""
+    """Verify reject() updates proposal."""
 
-    @patch("engine.proposal.emit")
+    @patch("engine.events.emit")
     @patch("engine.proposal.supabase")
     def test_updates_status_to_rejected(self, mock_sb, mock_emit):
         from engine.proposal import reject
@@ -452,7 +442,7 @@ class TestReject:
         update_arg = chain.update.call_args[0][0]
         assert update_arg["status"] == "rejected"
 
-    @patch("engine.proposal.emit")
+    @patch("engine.events.emit")
     @patch("engine.proposal.supabase")
     def test_sets_updated_at_timestamp(self, mock_sb, mock_emit):
         from engine.proposal import reject
@@ -472,7 +462,7 @@ class TestReject:
         dt = datetime.fromisoformat(update_arg["updated_at"])
         assert dt.tzinfo is not None
 
-    @patch("engine.proposal.emit")
+    @patch("engine.events.emit")
     @patch("engine.proposal.supabase")
     def test_filters_by_proposal_id(self, mock_sb, mock_emit):
         from engine.proposal import reject
@@ -489,7 +479,7 @@ class TestReject:
 
         chain.eq.assert_called_once_with("id", "prop-1")
 
-    @patch("engine.proposal.emit")
+    @patch("engine.events.emit")
     @patch("engine.proposal.supabase")
     def test_returns_updated_proposal(self, mock_sb, mock_emit):
         from engine.proposal import reject
@@ -505,9 +495,9 @@ class TestReject:
 
         assert result == expected
 
-    @patch("engine.proposal.emit")
+    @patch("engine.events.emit")
     @patch("engine.proposal.supabase")
-    def test_emits_proposal_rejected_event(self, mock_sb, mock_emit):
+    def test_stores_reason_for_proposal_rejected_event(self, mock_sb, mock_emit):
         from engine.proposal import reject
 
         chain = MagicMock()
@@ -520,14 +510,10 @@ class TestReject:
 
         reject("prop-1", reason="Too risky")
 
-        mock_emit.assert_called_once()
-        event_type = mock_emit.call_args[0][0]
-        event_payload = mock_emit.call_args[0][1]
-        assert event_type == "proposal_rejected"
-        assert event_payload["proposal_id"] == "prop-1"
-        assert event_payload["reason"] == "Too risky"
+        mock_emit.assert_not_called()
+        assert chain.update.call_args[0][0]["rejection_reason"] == "Too risky"
 
-    @patch("engine.proposal.emit")
+    @patch("engine.events.emit")
     @patch("engine.proposal.supabase")
     def test_reason_defaults_to_empty_string(self, mock_sb, mock_emit):
         from engine.proposal import reject
@@ -542,10 +528,9 @@ class TestReject:
 
         reject("prop-1")
 
-        event_payload = mock_emit.call_args[0][1]
-        assert event_payload["reason"] == ""
+        assert chain.update.call_args[0][0]["rejection_reason"] == ""
 
-    @patch("engine.proposal.emit")
+    @patch("engine.events.emit")
     @patch("engine.proposal.supabase")
     def test_returns_fallback_when_no_result_data(self, mock_sb, mock_emit):
         from engine.proposal import reject
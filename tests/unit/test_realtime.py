@@ -0,0 +1,26 @@
+"""Tests for engine.realtime — subscriptions match the realtime publication."""
+
+import re
+from pathlib import Path
+
+MIGRATIONS = Path(__file__).resolve().parents[2] / "supabase" / "migrations"
+
+_PUBLISH_RE = re.compile(r"alter publication supabase_realtime add table (\w+)", re.IGNORECASE)
+
+
+def _published_tables() -> set[str]:
+    tables = set()
+    for path in sorted(MIGRATIONS.glob("*.sql")):
+        tables.update(_PUBLISH_RE.findall(path.read_text()))
+    return tables
+
+
+class TestPublication:
+
+    def test_every_subscribed_table_is_published(self):
+        import engine.poller  # noqa: F401 — imports every module that registers handlers
+        from engine import realtime
+
+        subscribed = set(realtime._handlers)
+        assert {"agent_memory", "agent_relationships"} <= subscribed
+        assert subscribed - _published_tables() == set()
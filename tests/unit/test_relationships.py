@@ -1,5 +1,6 @@
 """Tests for engine.relationships — Affinity and drift system."""
 
+import time
 from datetime import datetime, timezone
 from unittest.mock import MagicMock, patch, call
 
@@ -14,6 +15,16 @@ import pytest
 class TestGetAffinity:
     """Test affinity score retrieval between agents."""
 
+    def setup_method(self):
+        from engine.relationships import invalidate_affinity
+        invalidate_affinity()
+
+    def _relationships_chain(self, rows):
+        chain = MagicMock()
+        chain.select.return_value = chain
+        chain.execute.return_value = MagicMock(data=rows)
+        return chain
+
     def test_same_agent_returns_one(self):
         from engine.relationships import get_affinity
 
@@ -29,63 +40,40 @@ class TestGetAffinity:
     def test_finds_affinity_forward_direction(self, mock_sb):
         from engine.relationships import get_affinity
 
-        chain = MagicMock()
-        chain.table.return_value = chain
-        chain.select.return_value = chain
-        chain.eq.return_value = chain
-        chain.limit.return_value = chain
-        chain.execute.return_value = MagicMock(data=[{"affinity": 0.85}])
+        mock_sb.table.return_value = self._relationships_chain(
+            [{"agent_a": "ed", "agent_b": "light", "affinity": 0.85}]
+        )
 
-        mock_sb.table = chain.table
-        mock_sb.table.return_value = chain
-
-        result = get_affinity("ed", "light")
-        assert result == 0.85
+        assert get_affinity("ed", "light") == 0.85
 
     @patch("engine.relationships.supabase")
     def test_finds_affinity_reverse_direction(self, mock_sb):
         from engine.relationships import get_affinity
 
-        call_count = [0]
-        chain = MagicMock()
+        mock_sb.table.return_value = self._relationships_chain(
+            [{"agent_a": "light", "agent_b": "ed", "affinity": 0.72}]
+        )
 
-        def make_chain():
-            c = MagicMock()
-            c.select.return_value = c
-            c.eq.return_value = c
-            c.limit.return_value = c
-            return c
+        assert get_affinity("ed", "light") == 0.72
 
-        chain1 = make_chain()
-        chain1.execute.return_value = MagicMock(data=[])  # Forward: not found
-
-        chain2 = make_chain()
-        chain2.execute.return_value = MagicMock(data=[{"affinity": 0.72}])  # Reverse: found
+    @patch("engine.relationships.supabase")
+    def test_affinity_matrix_is_dense_and_symmetric(self, mock_sb):
+        from engine.relationships import affinity_matrix
 
-        chains = [chain1, chain2]
-        call_count = [0]
+        mock_sb.table.return_value = self._relationships_chain(
+            [{"agent_a": "ed", "agent_b": "light", "affinity": 0.8}]
+        )
 
-        def table_side_effect(name):
-            c = chains[call_count[0]] if call_count[0] < len(chains) else chains[-1]
-            call_count[0] += 1
-            return c
+        matrix = affinity_matrix(["light", "ed", "toji"])
 
-        mock_sb.table.side_effect = table_side_effect
-
-        result = get_affinity("ed", "light")
-        assert result == 0.72
+        assert matrix == [[0.0, 0.8, 0.5], [0.8, 0.0, 0.5], [0.5, 0.5, 0.0]]
+        mock_sb.table.assert_called_once()
 
     @patch("engine.relationships.supabase")
     def test_no_relationship_returns_default(self, mock_sb):
         from engine.relationships import get_affinity
 
-        chain = MagicMock()
-        chain.select.return_value = chain
-        chain.eq.return_value = chain
-        chain.limit.return_value = chain
-        chain.execute.return_value = MagicMock(data=[])
-
-        mock_sb.table.return_value = chain
+        mock_sb.table.return_value = self._relationships_chain([])
 
         result = get_affinity("ed", "power")
         assert result == 0.5
@@ -99,6 +87,137 @@ class TestGetAffinity:
         result = get_affinity("ed", "light")
         assert result == 0.5
 
+    @patch("engine.relationships.supabase")
+    def test_matrix_loaded_once_for_many_lookups(self, mock_sb):
+        from engine.relationships import get_affinity
+
+        chain = self._relationships_chain([
+            {"agent_a": "ed", "agent_b": "light", "affinity": 0.65},
+            {"agent_a": "ed", "agent_b": "toji", "affinity": 0.40},
+        ])
+        mock_sb.table.return_value = chain
+
+        for _ in range(10):
+            get_affinity("ed", "light")
+            get_affinity("toji", "ed")
+
+        assert chain.execute.call_count == 1
+
+    @patch("engine.relationships.supabase")
+    def test_reloads_after_ttl(self, mock_sb):
+        from engine import relationships
+
+        chain = self._relationships_chain([{"agent_a": "ed", "agent_b": "light", "affinity": 0.65}])
+        mock_sb.table.return_value = chain
+
+        relationships.get_affinity("ed", "light")
+        with patch("engine.relationships.time.monotonic", return_value=time.monotonic() + 10_000):
+            relationships.get_affinity("ed", "light")
+
+        assert chain.execute.call_count == 2
+
+
+class TestRelationshipChanges:
+    """Test realtime updates to the affinity matrix."""
+
+    def setup_method(self):
+        from engine.relationships import invalidate_affinity
+        invalidate_affinity()
+
+    @patch("engine.relationships.supabase")
+    def test_update_applies_locally(self, mock_sb):
+        from engine import realtime
+        from engine.relationships import get_affinity
+
+        chain = MagicMock()
+        chain.select.return_value = chain
+        chain.execute.return_value = MagicMock(data=[{"agent_a": "ed", "agent_b": "light", "affinity": 0.65}])
+        mock_sb.table.return_value = chain
+
+        get_affinity("ed", "light")
+        realtime.dispatch("agent_relationships", {"data": {
+            "type": "UPDATE",
+            "record": {"agent_a": "ed", "agent_b": "light", "affinity": 0.71},
+            "old_record": {"id": "rel-1"},
+        }})
+
+        assert get_affinity("light", "ed") == 0.71
+        assert chain.execute.call_count == 1
+
+    @patch("engine.relationships.supabase")
+    def test_delete_falls_back_to_default(self, mock_sb):
+        from engine.relationships import get_affinity, handle_relationship_change
+
+        chain = MagicMock()
+        chain.select.return_value = chain
+        chain.execute.return_value = MagicMock(data=[{"agent_a": "ed", "agent_b": "light", "affinity": 0.65}])
+        mock_sb.table.return_value = chain
+
+        get_affinity("ed", "light")
+        handle_relationship_change("DELETE", None, {"agent_a": "ed", "agent_b": "light"})
+
+        assert get_affinity("ed", "light") == 0.5
+
+
+# ---------------------------------------------------------------------------
+# canonical pairs + upsert_relationship
+# ---------------------------------------------------------------------------
+
+
+class TestCanonicalPair:
+    """Test canonical (least, greatest) relationship keys."""
+
+    def test_orders_pair(self):
+        from engine.relationships import canonical_pair
+
+        assert canonical_pair("light", "ed") == ("ed", "light")
+        assert canonical_pair("ed", "light") == ("ed", "light")
+
+
+class TestUpsertRelationship:
+    """Test writing one row per unordered pair."""
+
+    def setup_method(self):
+        from engine.relationships import invalidate_affinity
+        invalidate_affinity()
+
+    @patch("engine.relationships.supabase")
+    def test_upserts_canonical_pair(self, mock_sb):
+        from engine.relationships import upsert_relationship
+
+        chain = MagicMock()
+        chain.upsert.return_value = chain
+        chain.execute.return_value = MagicMock(data=[{"agent_a": "ed", "agent_b": "toji", "affinity": 0.6}])
+        mock_sb.table.return_value = chain
+
+        result = upsert_relationship("toji", "ed", 0.6)
+
+        row = chain.upsert.call_args[0][0]
+        assert (row["agent_a"], row["agent_b"]) == ("ed", "toji")
+        assert chain.upsert.call_args.kwargs["on_conflict"] == "agent_a,agent_b"
+        assert result["affinity"] == 0.6
+
+    @patch("engine.relationships.supabase")
+    def test_clamps_and_updates_matrix(self, mock_sb):
+        from engine.relationships import upsert_relationship, _matrix
+
+        chain = MagicMock()
+        chain.upsert.return_value = chain
+        chain.execute.return_value = MagicMock(data=[])
+        mock_sb.table.return_value = chain
+
+        upsert_relationship("ed", "light", 1.5)
+
+        assert chain.upsert.call_args[0][0]["affinity"] == 0.95
+        assert _matrix._affinity[("ed", "light")] == 0.95
+
+    @patch("engine.relationships.supabase")
+    def test_rejects_self_relationship(self, mock_sb):
+        from engine.relationships import upsert_relationship
+
+        with pytest.raises(ValueError):
+            upsert_relationship("ed", "ed", 0.5)
+
 
 # ---------------------------------------------------------------------------
 # get_best_collaborator
@@ -159,6 +278,10 @@ class TestGetBestCollaborator:
 class TestApplyDrift:
     """Test affinity drift after mission completion."""
 
+    def setup_method(self):
+        from engine.relationships import invalidate_affinity
+        invalidate_affinity()
+
     @patch("engine.relationships.supabase", None)
     def test_no_supabase_returns_empty(self):
         from engine.relationships import apply_drift
@@ -172,244 +295,124 @@ class TestApplyDrift:
 
         with patch("engine.relationships.supabase") as mock_sb:
             result = apply_drift([("ed", "ed")], success=True)
-            # Should not query supabase for same-agent pairs
+            # Should not call supabase for same-agent pairs
+            mock_sb.rpc.assert_not_called()
             mock_sb.table.assert_not_called()
+            assert result == []
 
     @patch("engine.relationships.supabase")
-    def test_success_increases_affinity_by_003(self, mock_sb):
+    def test_success_sends_positive_delta(self, mock_sb):
         from engine.relationships import apply_drift
 
-        # Setup: existing relationship at 0.50
-        rel_data = {
-            "id": "rel-001",
-            "agent_a": "ed",
-            "agent_b": "light",
-            "affinity": 0.50,
-            "drift_history": [],
-        }
-
-        select_chain = MagicMock()
-        select_chain.select.return_value = select_chain
-        select_chain.eq.return_value = select_chain
-        select_chain.limit.return_value = select_chain
-        select_chain.execute.return_value = MagicMock(data=[rel_data])
-
-        update_chain = MagicMock()
-        update_chain.update.return_value = update_chain
-        update_chain.eq.return_value = update_chain
-        updated_data = {**rel_data, "affinity": 0.53}
-        update_chain.execute.return_value = MagicMock(data=[updated_data])
-
-        call_count = [0]
-
-        def table_router(name):
-            call_count[0] += 1
-            if call_count[0] == 1:
-                return select_chain
-            return update_chain
-
-        mock_sb.table.side_effect = table_router
+        updated = {"id": "rel-001", "agent_a": "ed", "agent_b": "light", "affinity": 0.53}
+        mock_sb.rpc.return_value.execute.return_value = MagicMock(data=[updated])
 
         result = apply_drift([("ed", "light")], success=True)
 
-        assert len(result) == 1
-        # Verify update was called with new_affinity = 0.53
-        update_args = update_chain.update.call_args[0][0]
-        assert abs(update_args["affinity"] - 0.53) < 0.001
-        # Verify drift_history entry
-        assert len(update_args["drift_history"]) == 1
-        entry = update_args["drift_history"][0]
-        assert entry["delta"] == 0.03
-        assert entry["old"] == 0.50
-        assert abs(entry["new"] - 0.53) < 0.001
-        assert entry["reason"] == "mission_success"
+        assert result == [updated]
+        fn, params = mock_sb.rpc.call_args[0]
+        assert fn == "apply_drift"
+        assert params["delta"] == 0.03
+        assert params["reason"] == "mission_success"
 
     @patch("engine.relationships.supabase")
-    def test_failure_decreases_affinity_by_002(self, mock_sb):
+    def test_failure_sends_negative_delta(self, mock_sb):
         from engine.relationships import apply_drift
 
-        rel_data = {
-            "id": "rel-002",
-            "agent_a": "ed",
-            "agent_b": "toji",
-            "affinity": 0.60,
-            "drift_history": [],
-        }
-
-        select_chain = MagicMock()
-        select_chain.select.return_value = select_chain
-        select_chain.eq.return_value = select_chain
-        select_chain.limit.return_value = select_chain
-        select_chain.execute.return_value = MagicMock(data=[rel_data])
-
-        update_chain = MagicMock()
-        update_chain.update.return_value = update_chain
-        update_chain.eq.return_value = update_chain
-        updated_data = {**rel_data, "affinity": 0.58}
-        update_chain.execute.return_value = MagicMock(data=[updated_data])
-
-        call_count = [0]
-
-        def table_router(name):
-            call_count[0] += 1
-            if call_count[0] == 1:
-                return select_chain
-            return update_chain
-
-        mock_sb.table.side_effect = table_router
-
-        result = apply_drift([("ed", "toji")], success=False)
-
-        assert len(result) == 1
-        update_args = update_chain.update.call_args[0][0]
-        assert abs(update_args["affinity"] - 0.58) < 0.001
-        entry = update_args["drift_history"][0]
-        assert entry["delta"] == -0.02
-        assert entry["reason"] == "mission_failure"
+        mock_sb.rpc.return_value.execute.return_value = MagicMock(data=[])
+
+        apply_drift([("ed", "toji")], success=False)
+
+        params = mock_sb.rpc.call_args[0][1]
+        assert params["delta"] == -0.02
+        assert params["reason"] == "mission_failure"
 
     @patch("engine.relationships.supabase")
-    def test_affinity_capped_at_095(self, mock_sb):
+    def test_all_pairs_in_one_call(self, mock_sb):
         from engine.relationships import apply_drift
 
-        rel_data = {
-            "id": "rel-003",
-            "agent_a": "ed",
-            "agent_b": "light",
-            "affinity": 0.94,
-            "drift_history": [],
-        }
-
-        select_chain = MagicMock()
-        select_chain.select.return_value = select_chain
-        select_chain.eq.return_value = select_chain
-        select_chain.limit.return_value = select_chain
-        select_chain.execute.return_value = MagicMock(data=[rel_data])
+        mock_sb.rpc.return_value.execute.return_value = MagicMock(data=[])
+        daimyos = ["ed", "light", "toji", "power", "major"]
+        pairs = [(a, b) for i, a in enumerate(daimyos) for b in daimyos[i + 1:]]
 
-        update_chain = MagicMock()
-        update_chain.update.return_value = update_chain
-        update_chain.eq.return_value = update_chain
-        update_chain.execute.return_value = MagicMock(data=[{**rel_data, "affinity": 0.95}])
+        apply_drift(pairs, success=True)
 
-        call_count = [0]
+        mock_sb.rpc.assert_called_once()
+        mock_sb.table.assert_not_called()
+        assert len(mock_sb.rpc.call_args[0][1]["pairs"]) == 10
 
-        def table_router(name):
-            call_count[0] += 1
-            if call_count[0] == 1:
-                return select_chain
-            return update_chain
+    @patch("engine.relationships.supabase")
+    def test_normalizes_and_dedupes_pairs(self, mock_sb):
+        """Pairs are sent in canonical (least, greatest) order, once each."""
+        from engine.relationships import apply_drift
 
-        mock_sb.table.side_effect = table_router
+        mock_sb.rpc.return_value.execute.return_value = MagicMock(data=[])
 
-        apply_drift([("ed", "light")], success=True)
+        apply_drift([("light", "ed"), ("ed", "light"), ("toji", "toji")], success=True)
 
-        update_args = update_chain.update.call_args[0][0]
-        assert update_args["affinity"] == 0.95  # Capped, not 0.97
+        assert mock_sb.rpc.call_args[0][1]["pairs"] == [["ed", "light"]]
 
     @patch("engine.relationships.supabase")
-    def test_affinity_floored_at_010(self, mock_sb):
-        from engine.relationships import apply_drift
+    def test_updates_local_matrix(self, mock_sb):
+        from engine.relationships import apply_drift, _matrix
 
-        rel_data = {
-            "id": "rel-004",
-            "agent_a": "ed",
-            "agent_b": "toji",
-            "affinity": 0.11,
-            "drift_history": [],
-        }
+        mock_sb.rpc.return_value.execute.return_value = MagicMock(
+            data=[{"agent_a": "ed", "agent_b": "major", "affinity": 0.73}]
+        )
 
-        select_chain = MagicMock()
-        select_chain.select.return_value = select_chain
-        select_chain.eq.return_value = select_chain
-        select_chain.limit.return_value = select_chain
-        select_chain.execute.return_value = MagicMock(data=[rel_data])
+        apply_drift([("major", "ed")], success=True)
 
-        update_chain = MagicMock()
-        update_chain.update.return_value = update_chain
-        update_chain.eq.return_value = update_chain
-        update_chain.execute.return_value = MagicMock(data=[{**rel_data, "affinity": 0.10}])
+        assert _matrix._affinity[("ed", "major")] == 0.73
 
-        call_count = [0]
+    @patch("engine.relationships.supabase")
+    def test_exception_returns_empty(self, mock_sb):
+        from engine.relationships import apply_drift
 
-        def table_router(name):
-            call_count[0] += 1
-            if call_count[0] == 1:
-                return select_chain
-            return update_chain
+        mock_sb.rpc.side_effect = Exception("DB error")
 
-        mock_sb.table.side_effect = table_router
+        # Should not raise, should return empty
+        result = apply_drift([("ed", "light"), ("ed", "toji")], success=True)
+        assert result == []
 
-        apply_drift([("ed", "toji")], success=False)
 
-        update_args = update_chain.update.call_args[0][0]
-        # 0.11 - 0.02 = 0.09, floored to 0.10
-        assert update_args["affinity"] == 0.10
+# ---------------------------------------------------------------------------
+# Drift log
+# ---------------------------------------------------------------------------
+
+
+class TestDriftLog:
+    """Test drift log reads and rollups."""
 
     @patch("engine.relationships.supabase")
-    def test_no_relationship_found_skips(self, mock_sb):
-        from engine.relationships import apply_drift
+    def test_get_drift_log_queries_canonical_pair(self, mock_sb):
+        from engine.relationships import get_drift_log
 
-        # Both forward and reverse return empty
         chain = MagicMock()
         chain.select.return_value = chain
         chain.eq.return_value = chain
+        chain.order.return_value = chain
         chain.limit.return_value = chain
-        chain.execute.return_value = MagicMock(data=[])
-
+        chain.execute.return_value = MagicMock(data=[{"delta": 0.03}])
         mock_sb.table.return_value = chain
 
-        result = apply_drift([("ed", "unknown_agent")], success=True)
-        assert result == []
+        result = get_drift_log("light", "ed", limit=5)
+
+        mock_sb.table.assert_called_with("relationship_drift")
+        assert [c[0] for c in chain.eq.call_args_list] == [("agent_a", "ed"), ("agent_b", "light")]
+        chain.limit.assert_called_with(5)
+        assert result == [{"delta": 0.03}]
 
     @patch("engine.relationships.supabase")
-    def test_exception_continues_to_next_pair(self, mock_sb):
-        from engine.relationships import apply_drift
+    def test_rollup_calls_rpc(self, mock_sb):
+        from engine.relationships import rollup_drift
 
-        mock_sb.table.side_effect = Exception("DB error")
+        mock_sb.rpc.return_value.execute.return_value = MagicMock(data=42)
 
-        # Should not raise, should return empty
-        result = apply_drift([("ed", "light"), ("ed", "toji")], success=True)
-        assert result == []
+        assert rollup_drift(retain_days=7) == 42
+        mock_sb.rpc.assert_called_with("rollup_relationship_drift", {"retain": "7 days"})
 
-    @patch("engine.relationships.supabase")
-    def test_normalizes_pair_order(self, mock_sb):
-        """Pairs should be sorted alphabetically for consistency."""
-        from engine.relationships import apply_drift
+    @patch("engine.relationships.supabase", None)
+    def test_rollup_without_supabase(self):
+        from engine.relationships import rollup_drift
 
-        rel_data = {
-            "id": "rel-005",
-            "agent_a": "ed",
-            "agent_b": "light",
-            "affinity": 0.50,
-            "drift_history": [],
-        }
-
-        select_chain = MagicMock()
-        select_chain.select.return_value = select_chain
-        select_chain.eq.return_value = select_chain
-        select_chain.limit.return_value = select_chain
-        select_chain.execute.return_value = MagicMock(data=[rel_data])
-
-        update_chain = MagicMock()
-        update_chain.update.return_value = update_chain
-        update_chain.eq.return_value = update_chain
-        update_chain.execute.return_value = MagicMock(data=[{**rel_data, "affinity": 0.53}])
-
-        call_count = [0]
-
-        def table_router(name):
-            call_count[0] += 1
-            if call_count[0] == 1:
-                return select_chain
-            return update_chain
-
-        mock_sb.table.side_effect = table_router
-
-        # Pass in reverse order — should still query ("ed", "light") first
-        apply_drift([("light", "ed")], success=True)
-
-        # The first .eq call on select_chain should be for agent_a = "ed" (sorted first)
-        eq_calls = select_chain.eq.call_args_list
-        # First eq call should have "ed" somewhere (the sorted-first agent)
-        all_eq_args = [c[0] for c in eq_calls]
-        agent_a_call = all_eq_args[0]  # ("agent_a", "ed")
-        assert agent_a_call == ("agent_a", "ed")
+        assert rollup_drift() == 0
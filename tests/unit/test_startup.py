@@ -0,0 +1,68 @@
+"""Import-time budgets for the CLI and engine.
+
+Each check runs in a fresh interpreter with Supabase configured, so a
+regression that builds the client (or pulls a heavy dependency) at import
+time shows up here instead of as a slow `wr` command.
+"""
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+STARTUP_BUDGET_SECONDS = float(os.getenv("STARTUP_BUDGET_SECONDS", "0.5"))
+RUNS = 3
+
+_PROBE = """
+import json, runpy, sys, time
+target = sys.argv[1]
+t = time.perf_counter()
+if target == "cli":
+    sys.argv = ["cli.py", "--help"]
+    try:
+        runpy.run_path("cli.py", run_name="__main__")
+    except SystemExit:
+        pass
+else:
+    __import__(target)
+seconds = time.perf_counter() - t
+config = sys.modules.get("engine.config")
+sb = getattr(config, "supabase", None)
+print(json.dumps({
+    "seconds": seconds,
+    "client_built": bool(sb is not None and sb.built),
+    "modules": sorted(m for m in ("httpx", "postgrest", "asyncio", "http.server") if m in sys.modules),
+}))
+"""
+
+
+def _probe(target: str) -> dict:
+    env = dict(os.environ, SUPABASE_URL="http://127.0.0.1:9", SUPABASE_KEY="test-key")
+    runs = []
+    for _ in range(RUNS):
+        out = subprocess.run(
+            [sys.executable, "-c", _PROBE, target],
+            cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True,
+        ).stdout
+        runs.append(json.loads(out.splitlines()[-1]))
+    return min(runs, key=lambda r: r["seconds"])
+
+
+class TestStartupBudget:
+
+    def test_cli_help(self):
+        result = _probe("cli")
+        assert result["seconds"] < STARTUP_BUDGET_SECONDS
+        assert not result["client_built"]
+
+    def test_import_executor(self):
+        result = _probe("engine.executor")
+        assert result["seconds"] < STARTUP_BUDGET_SECONDS
+        assert not result["client_built"]
+        assert result["modules"] == []
+
+    def test_import_poller_does_not_build_client(self):
+        result = _probe("engine.poller")
+        assert not result["client_built"]
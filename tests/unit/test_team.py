@@ -0,0 +1,162 @@
+"""Tests for engine.team — Mission team selection."""
+
+import itertools
+import random
+from unittest.mock import patch
+
+import pytest
+
+
+REGISTRY = {
+    "ed": {"name": "Ed", "domain": "engineering"},
+    "light": {"name": "Light", "domain": "product"},
+    "toji": {"name": "Toji", "domain": "commerce"},
+    "power": {"name": "Makima", "domain": "influence"},
+    "major": {"name": "Major", "domain": "operations"},
+}
+
+
+def _matrix_from(affinity: dict[frozenset, float], default: float = 0.5):
+    """affinity_matrix replacement backed by a pair -> affinity dict."""
+    def matrix(agents):
+        return [
+            [0.0 if a == b else affinity.get(frozenset((a, b)), default) for b in agents]
+            for a in agents
+        ]
+    return matrix
+
+
+class TestSelectTeam:
+    """Test the team optimizer."""
+
+    def test_primary_only_when_k_is_one(self):
+        from engine.team import select_team
+
+        with patch("engine.team.affinity_matrix", _matrix_from({})):
+            assert select_team("ed", ["engineering"], k=1, registry=REGISTRY) == ["ed"]
+
+    def test_picks_highest_affinity_partners(self):
+        from engine.team import select_team
+
+        affinity = {
+            frozenset(("ed", "toji")): 0.9,
+            frozenset(("ed", "major")): 0.8,
+            frozenset(("toji", "major")): 0.85,
+        }
+        with patch("engine.team.affinity_matrix", _matrix_from(affinity, default=0.2)):
+            team = select_team("ed", ["engineering"], k=3, registry=REGISTRY)
+
+        assert team[0] == "ed"
+        assert set(team) == {"ed", "toji", "major"}
+
+    def test_covers_required_domains_over_affinity(self):
+        from engine.team import select_team
+
+        affinity = {frozenset(("ed", "toji")): 0.95, frozenset(("ed", "light")): 0.1}
+        with patch("engine.team.affinity_matrix", _matrix_from(affinity, default=0.3)):
+            team = select_team("ed", ["engineering", "product"], k=2, registry=REGISTRY)
+
+        assert team == ["ed", "light"]
+
+    def test_swaps_away_from_greedy_trap(self):
+        from engine.team import select_team
+
+        # Greedy takes toji (best with ed) but light + major are a far better pair
+        affinity = {
+            frozenset(("ed", "toji")): 0.6,
+            frozenset(("ed", "light")): 0.5,
+            frozenset(("ed", "major")): 0.5,
+            frozenset(("light", "major")): 0.95,
+        }
+        with patch("engine.team.affinity_matrix", _matrix_from(affinity, default=0.1)):
+            team = select_team("ed", [], k=3, registry=REGISTRY)
+
+        assert set(team) == {"ed", "light", "major"}
+
+    def test_load_penalty_avoids_busy_agents(self):
+        from engine.team import select_team
+
+        with patch("engine.team.affinity_matrix", _matrix_from({})):
+            team = select_team("ed", [], k=2, loads={"light": 9, "toji": 9, "power": 9}, registry=REGISTRY)
+
+        assert team == ["ed", "major"]
+
+    def test_load_cap_excludes_agents(self):
+        from engine.team import select_team
+
+        affinity = {frozenset(("ed", "light")): 0.95}
+        with patch("engine.team.affinity_matrix", _matrix_from(affinity)), \
+                patch("engine.team.MAX_AGENT_LOAD", 5):
+            team = select_team("ed", ["product"], k=2, loads={"light": 5}, registry=REGISTRY)
+
+        assert "light" not in team
+
+    @pytest.mark.parametrize("seed", [1, 2, 3])
+    def test_matches_exhaustive_search_on_small_registry(self, seed):
+        from engine.team import select_team
+
+        rng = random.Random(seed)
+        registry = {f"a{i}": {"domain": f"d{i % 4}"} for i in range(10)}
+        affinity = {
+            frozenset(pair): round(rng.uniform(0.1, 0.95), 2)
+            for pair in itertools.combinations(registry, 2)
+        }
+        matrix = _matrix_from(affinity)
+
+        def score(team):
+            return sum(affinity[frozenset(p)] for p in itertools.combinations(team, 2))
+
+        with patch("engine.team.affinity_matrix", matrix), \
+                patch("engine.team.TEAM_LOAD_WEIGHT", 0.0):
+            team = select_team("a0", [], k=3, registry=registry)
+
+        best = max(
+            score(("a0",) + rest)
+            for rest in itertools.combinations([a for a in registry if a != "a0"], 2)
+        )
+        # Local search is not guaranteed optimal, but should be close
+        assert score(team) >= best - 0.15
+
+    def test_scales_to_large_registry(self):
+        from engine.team import select_team
+
+        registry = {f"a{i}": {"domain": f"d{i % 12}"} for i in range(120)}
+        with patch("engine.team.affinity_matrix", _matrix_from({})):
+            team = select_team("a0", ["d1", "d2", "d3"], k=4, registry=registry)
+
+        assert len(set(team)) == 4
+        domains = {registry[a]["domain"] for a in team}
+        assert {"d1", "d2", "d3"} <= domains
+
+    @pytest.mark.parametrize("seed", [1, 2, 3])
+    def test_numpy_path_matches_pure_python(self, seed):
+        pytest.importorskip("numpy")
+        from engine.team import select_team
+
+        rng = random.Random(seed)
+        registry = {f"a{i}": {"domain": f"d{i % 5}"} for i in range(30)}
+        affinity = {
+            frozenset(pair): round(rng.uniform(0.1, 0.95), 2)
+            for pair in itertools.combinations(registry, 2)
+        }
+        loads = {agent: rng.randint(0, 3) for agent in registry}
+
+        with patch("engine.team.affinity_matrix", _matrix_from(affinity)):
+            fast = select_team("a0", ["d1", "d3"], k=5, loads=loads, registry=registry)
+            with patch("engine.team.np", None):
+                pure = select_team("a0", ["d1", "d3"], k=5, loads=loads, registry=registry)
+
+        assert fast == pure
+
+
+class TestTeamScore:
+    """Test team scoring."""
+
+    def test_sums_pairwise_affinity_minus_load(self):
+        from engine.team import team_score, TEAM_LOAD_WEIGHT
+
+        affinity = {frozenset(("ed", "light")): 0.8}
+        with patch("engine.team.affinity_matrix", _matrix_from(affinity)):
+            score = team_score(["ed", "light"], loads={"ed": 2})
+
+        assert score == pytest.approx(0.8 - 2 * TEAM_LOAD_WEIGHT)